@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+ONE_QUBIT = dict(R=2, Rx=1, Ry=1, Rz=1, Sx=0, Sy=0, Sz=0, Px=0, Py=0, Pz=0)
+TWO_QUBIT = dict(MS=2, XX=1, YY=1, ZZ=1, Sxx=0, Szz=0)
+
+
+def random_program(n_qubits, depth, seed=0):
+    """Generates the text of a Jaqal program applying depth random native gates."""
+    rng = np.random.default_rng(seed)
+    lines = [
+        "from qscout.v1.std usepulses *",
+        f"register q[{n_qubits}]",
+        "prepare_all",
+    ]
+    for _ in range(depth):
+        if n_qubits > 1 and rng.random() < 0.3:
+            name = rng.choice(list(TWO_QUBIT))
+            qubits = rng.choice(n_qubits, 2, replace=False)
+            n_args = TWO_QUBIT[name]
+        else:
+            name = rng.choice(list(ONE_QUBIT))
+            qubits = [rng.integers(n_qubits)]
+            n_args = ONE_QUBIT[name]
+        words = [name]
+        words.extend(f"q[{q}]" for q in qubits)
+        words.extend(f"{angle:.6f}" for angle in rng.uniform(-np.pi, np.pi, n_args))
+        lines.append(" ".join(words))
+    lines.append("measure_all")
+    return "\n".join(lines)
+
+
+@pytest.fixture
+def program():
+    return random_program
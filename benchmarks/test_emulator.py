@@ -0,0 +1,30 @@
+import pytest
+
+from jaqalpaq.parser import parse_jaqal_string
+from jaqalpaq.run import run_jaqal_circuit
+
+from qscout.v1.std.noisy import SNLToy1
+from qscout.v1.std.statevector import StatevectorEmulator
+
+SIZES = [(n_qubits, depth) for n_qubits in (1, 2, 3) for depth in (10, 100)]
+
+
+@pytest.mark.parametrize("n_qubits", [1, 2, 3])
+def test_construct_SNLToy1(benchmark, n_qubits):
+    benchmark.group = "SNLToy1 construction"
+    benchmark(SNLToy1, n_qubits)
+
+
+@pytest.mark.parametrize("n_qubits,depth", SIZES)
+def test_SNLToy1(benchmark, program, n_qubits, depth):
+    benchmark.group = f"SNLToy1 emulation ({n_qubits} qubits)"
+    circuit = parse_jaqal_string(program(n_qubits, depth))
+    backend = SNLToy1(n_qubits)
+    benchmark(run_jaqal_circuit, circuit, backend=backend)
+
+
+@pytest.mark.parametrize("n_qubits,depth", SIZES)
+def test_statevector(benchmark, program, n_qubits, depth):
+    benchmark.group = f"state vector emulation ({n_qubits} qubits)"
+    circuit = parse_jaqal_string(program(n_qubits, depth))
+    benchmark(run_jaqal_circuit, circuit, backend=StatevectorEmulator())
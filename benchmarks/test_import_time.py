@@ -0,0 +1,33 @@
+# Run with: pytest benchmarks
+#
+# Each round imports the module in a fresh interpreter, so the timings include the
+# (constant) startup time of Python itself.
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import qscout.v1
+
+
+def qscout_modules():
+    """Lists every module of the qscout.v1 namespace package."""
+    modules = set()
+    for root in qscout.v1.__path__:
+        for path in Path(root).rglob("*.py"):
+            parts = path.relative_to(root).with_suffix("").parts
+            if parts[-1] == "__init__":
+                parts = parts[:-1]
+            modules.add(".".join(("qscout", "v1") + parts))
+    return sorted(modules)
+
+
+def import_in_subprocess(module):
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+
+
+@pytest.mark.parametrize("module", qscout_modules())
+def test_import_time(benchmark, module):
+    benchmark.group = "import"
+    benchmark.pedantic(import_in_subprocess, args=(module,), rounds=5)
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from qscout.v1.std import jaqal_action
+
+GENERATORS = dict(
+    U_R=2, U_Rx=1, U_Ry=1, U_Rz=1, U_XX=1, U_YY=1, U_ZZ=1, U_MS=2, D_Rz=1, D_ZZ=1
+)
+
+
+@pytest.mark.parametrize("name", sorted(GENERATORS))
+def test_scalar(benchmark, name):
+    benchmark.group = "U_* scalar"
+    args = [0.3, 1.1][: GENERATORS[name]]
+    benchmark(getattr(jaqal_action, name), *args)
+
+
+@pytest.mark.parametrize("name", sorted(GENERATORS))
+def test_batched(benchmark, name):
+    benchmark.group = "U_* batched (1000 angles)"
+    angles = np.linspace(-np.pi, np.pi, 1000)
+    args = [angles, angles[::-1]][: GENERATORS[name]]
+    benchmark(getattr(jaqal_action, name), *args)
+
+
+@pytest.mark.parametrize("name", ["Sx", "Sxx", "Szz"])
+def test_fixed(benchmark, name):
+    benchmark.group = "fixed gates"
+    benchmark(jaqal_action.IDEAL_ACTION[name])
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from qscout.v1.std.noisy import SNLToy1Model
+
+MODEL = SNLToy1Model()
+GATES = sorted(name[5:] for name in dir(SNLToy1Model) if name.startswith("gate_"))
+
+
+def arguments(name):
+    gate = MODEL.jaqal_gates[name]
+    qubits = [None] * len(gate.quantum_parameters)
+    return qubits + [0.3, 1.1][: len(gate.classical_parameters)]
+
+
+@pytest.mark.parametrize("name", GATES)
+def test_gate(benchmark, name):
+    benchmark.group = "SNLToy1 gate_*"
+    benchmark(getattr(MODEL, f"gate_{name}"), *arguments(name))
+
+
+@pytest.mark.parametrize("name", GATES)
+def test_gateduration(benchmark, name):
+    benchmark.group = "SNLToy1 gateduration_*"
+    benchmark(getattr(MODEL, f"gateduration_{name}"), *arguments(name))
+
+
+def test_idle(benchmark):
+    benchmark.group = "SNLToy1 idle"
+    benchmark(MODEL.idle, None, 1.5)
+
+
+def test_idle_uncached(benchmark):
+    """Distinct durations, defeating the cache of idle matrices."""
+    benchmark.group = "SNLToy1 idle"
+    durations = iter(np.linspace(0, 1, 10**7))
+    benchmark(lambda: MODEL.idle(None, next(durations)))
+
+
+@pytest.mark.parametrize("name", ["R", "MS"])
+def test_batch_gate(benchmark, name):
+    benchmark.group = "SNLToy1 batch_gate (1000 angles)"
+    angles = np.linspace(-np.pi, np.pi, 1000)
+    benchmark(MODEL.batch_gate, name, angles, angles[::-1])
@@ -0,0 +1,39 @@
+import numpy as np
+
+from jaqalpaq.core.stretch import stretched_unitaries
+
+from qscout.v1.std.jaqal_action import IDEAL_ACTION
+from qscout.v1.std.noisy import SNLToy1Model
+from qscout.v1.std.stretched.jaqal_action import IDEAL_ACTION as STRETCHED_ACTION
+
+
+def test_stretched_unitaries(benchmark):
+    benchmark.group = "stretched_unitaries"
+    benchmark(stretched_unitaries, IDEAL_ACTION, suffix="_stretched")
+
+
+def test_stretched_call(benchmark):
+    benchmark.group = "stretched_unitaries"
+    benchmark(STRETCHED_ACTION["MS_stretched"], 0.3, 1.1, 1.5)
+
+
+STRETCHES = np.linspace(0.5, 2, 1000)
+
+
+def test_stretch_sweep_gates(benchmark):
+    benchmark.group = "stretch_sweep"
+    model = SNLToy1Model()
+    benchmark(
+        lambda: [model.gate_MS(None, None, 0.3, 1.1, stretch=s) for s in STRETCHES]
+    )
+
+
+def test_stretch_sweep_batch_gate(benchmark):
+    benchmark.group = "stretch_sweep"
+    benchmark(SNLToy1Model().batch_gate, "MS", 0.3, 1.1, stretch=STRETCHES)
+
+
+def test_stretch_sweep_family(benchmark):
+    benchmark.group = "stretch_sweep"
+    family = SNLToy1Model().stretch_family("MS", 0.3, 1.1)
+    benchmark(family, STRETCHES)
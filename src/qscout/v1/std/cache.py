@@ -0,0 +1,137 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+import numpy as np
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class GateCache:
+    """Bounded least-recently-used cache of gate matrices, keyed on gate parameters.
+
+    Gate matrices are looked up by the gate name and its (quantized) arguments, along
+    with any extra key material, such as the parameters of a noise model.  Matrices
+    are stored, and returned, read-only, so that callers cannot corrupt the cache.
+    """
+
+    def __init__(self, maxsize=4096, decimals=12):
+        """Builds an empty gate cache.
+
+        :param int maxsize: (default 4096) The number of matrices to retain.  When the
+          cache is full, the least recently used matrix is evicted.
+        :param int decimals: (default 12) The number of decimal places to which angles
+          (and all other numerical parameters) are rounded when constructing the keys.
+        """
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, value):
+        """Returns the representation of a gate parameter used in cache keys.
+
+        :param value: The gate parameter, which is either a number or None (standing in
+          for a qubit).
+        :raises TypeError: If value is not a scalar.
+        """
+        if value is None:
+            return None
+        if np.ndim(value) != 0:
+            raise TypeError(f"Cannot use {value} in a cache key")
+        return round(float(value), self.decimals)
+
+    def key(self, name, args, kwargs=None, extra=()):
+        """Returns the cache key of a particular gate application.
+
+        :param str name: The name of the gate.
+        :param args: The positional arguments to the gate function.
+        :param kwargs: (optional) A dictionary of keyword arguments to the gate function.
+        :param extra: (optional) Additional hashable data to distinguish the entry by.
+        """
+        quantized = tuple(self.quantize(arg) for arg in args)
+        if kwargs:
+            quantized += tuple((k, self.quantize(v)) for k, v in sorted(kwargs.items()))
+        return (name, quantized, extra)
+
+    def lookup(self, key, build):
+        """Returns the matrix stored under key, building and storing it if missing.
+
+        :param key: A key, as returned by the key method.
+        :param build: A function of no arguments that generates the matrix.
+        :returns: The read-only matrix.
+        :rtype: numpy.array
+        """
+        try:
+            matrix = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return matrix
+
+        self.misses += 1
+        matrix = np.asarray(build())
+        matrix.flags.writeable = False
+        self._entries[key] = matrix
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return matrix
+
+    def wrap(self, name, fun, extra=None):
+        """Returns a memoized version of a gate function.
+
+        :param str name: The name of the gate, used to distinguish the keys of functions
+          sharing the same cache.
+        :param fun: The function generating the gate matrix.
+        :param extra: (optional) A function of no arguments, returning additional
+          (hashable) key material.  It is evaluated on every call, so that, e.g.,
+          changes to the parameters of a noise model are respected.
+        :returns: The wrapped function.  Calls with array-valued parameters are passed
+          through to fun without caching.
+        """
+
+        @wraps(fun)
+        def cached(*args, **kwargs):
+            try:
+                key = self.key(
+                    name, args, kwargs, extra=() if extra is None else extra()
+                )
+            except TypeError:
+                return fun(*args, **kwargs)
+            return self.lookup(key, lambda: fun(*args, **kwargs))
+
+        return cached
+
+    def cache_info(self):
+        """Returns the hit and miss statistics of the cache.
+
+        :rtype: CacheInfo
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def cache_clear(self):
+        """Empties the cache and resets its statistics."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def cached_actions(action, cache):
+    """Wraps every gate of a dictionary of ideal actions with a cache.
+
+    :param dict action: A dictionary of gate functions, e.g., jaqal_action.IDEAL_ACTION.
+    :param GateCache cache: The cache to store the gate matrices in.
+    :returns: A new dictionary with the same keys, and memoized gate functions.  Gates
+      without a defined action (i.e., None) are left as they are.
+    :rtype: dict
+    """
+    return {
+        name: None if fun is None else cache.wrap(name, fun)
+        for name, fun in action.items()
+    }
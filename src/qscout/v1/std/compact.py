@@ -0,0 +1,222 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+import numpy as np
+
+from jaqalpaq.core import Macro
+from jaqalpaq.core.algorithm import expand_macros, expand_subcircuits
+from jaqalpaq.core.algorithm.visitor import Visitor
+from jaqalpaq.core.circuitbuilder import CircuitBuilder
+
+from . import jaqal_action
+from .opcodes import GATE_NAMES, GATES, N_ARGS, N_QUBITS, OPCODES, _is_modeled, _tables
+from .stretched import jaqal_action as stretched_action
+from .parallel import _evaluate, _portable_class
+from .statevector import StateVector
+
+# The record of one gate application of a compact circuit: its opcode, the indices of
+# the qubits it acts on (padded with -1), and its classical arguments (padded with 0)
+GATE_DTYPE = np.dtype(
+    [
+        ("opcode", np.uint8),
+        ("qubits", np.int16, (int(N_QUBITS.max()),)),
+        ("params", np.float64, (int(N_ARGS.max()),)),
+    ]
+)
+
+IDEAL_ACTION = {**jaqal_action.IDEAL_ACTION, **stretched_action.IDEAL_ACTION}
+DIAGONAL_ACTION = {**jaqal_action.DIAGONAL_ACTION, **stretched_action.DIAGONAL_ACTION}
+
+
+class _CompactVisitor(Visitor):
+    """Flattens a circuit (with expanded macros and subcircuits) into the records of its
+    gates, unrolling its loops."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def visit_default(self, obj):
+        raise NotImplementedError(f"Unsupported statement {type(obj).__name__}")
+
+    def visit_Circuit(self, obj):
+        self.visit(obj.body)
+
+    def visit_BlockStatement(self, obj):
+        # The gates of a parallel block act on distinct qubits, and commute.
+        for statement in obj.statements:
+            self.visit(statement)
+
+    def visit_LoopStatement(self, obj):
+        start = len(self.records)
+        self.visit(obj.statements)
+        self.records.extend(self.records[start:] * (int(obj.iterations) - 1))
+
+    def visit_GateStatement(self, obj):
+        if isinstance(obj.gate_def, Macro):
+            raise ValueError(f"Unexpanded macro {obj.name}")
+        try:
+            opcode = OPCODES[obj.name]
+        except KeyError:
+            raise ValueError(f"{obj.name} is not a QSCOUT native gate") from None
+        qubits = [-1] * GATE_DTYPE["qubits"].shape[0]
+        params = [0.0] * GATE_DTYPE["params"].shape[0]
+        n_qubits = n_args = 0
+        for value, param in obj.parameters_with_types:
+            if param.classical:
+                # Constants (from let statements) are resolved by float.
+                params[n_args] = float(value)
+                n_args += 1
+            else:
+                qubits[n_qubits] = value.alias_index
+                n_qubits += 1
+        self.records.append((opcode, qubits, params))
+
+
+def from_circuit(circuit):
+    """Converts a circuit of the QSCOUT native gates to its compact form.
+
+    Macros and subcircuits are expanded, and loops unrolled.  Parallel blocks are
+    serialized, their gates commuting.
+
+    :param Circuit circuit: The parsed Jaqal circuit.
+    :returns: The record of every gate applied, in order.
+    :rtype: numpy.array of GATE_DTYPE
+    """
+    registers = circuit.fundamental_registers()
+    if len(registers) > 1:
+        raise NotImplementedError("Multiple fundamental registers unsupported.")
+    visitor = _CompactVisitor()
+    visitor.visit(expand_subcircuits(expand_macros(circuit)))
+    return np.array(visitor.records, dtype=GATE_DTYPE)
+
+
+def count_qubits(records):
+    """Returns the number of qubits used by a compact circuit: one more than the largest
+    qubit index.
+
+    :param records: The compact circuit.
+    :rtype: int
+    """
+    return int(records["qubits"].max(initial=-1)) + 1
+
+
+def to_circuit(records, n_qubits=None):
+    """Converts a compact circuit to a sequential jaqalpaq Circuit.
+
+    :param records: The compact circuit.
+    :param int n_qubits: (optional) The size of the register q of the circuit.  By
+      default, the number of qubits used.
+    :rtype: Circuit
+    """
+    if n_qubits is None:
+        n_qubits = count_qubits(records)
+    builder = CircuitBuilder(native_gates=GATES)
+    builder.register("q", n_qubits)
+    for opcode, qubits, params in records.tolist():
+        builder.gate(
+            GATE_NAMES[opcode],
+            *[("array_item", "q", q) for q in qubits[: N_QUBITS[opcode]]],
+            *params[: N_ARGS[opcode]],
+        )
+    return builder.build()
+
+
+def _groups(records):
+    """Yields the opcodes of a compact circuit, the indices of their records, and the
+    arrays of each of their classical arguments."""
+    opcodes = records["opcode"]
+    order = np.argsort(opcodes, kind="stable")
+    bounds = np.flatnonzero(np.diff(opcodes[order])) + 1
+    for indices in np.split(order, bounds) if len(order) else ():
+        opcode = opcodes[indices[0]]
+        yield opcode, indices, list(records["params"][indices, : N_ARGS[opcode]].T)
+
+
+def unitaries(records, action=IDEAL_ACTION):
+    """Generates the unitaries of every gate of a compact circuit, with one (batched)
+    call of the gate's generator per distinct gate.
+
+    :param records: The compact circuit.
+    :param dict action: (default IDEAL_ACTION) The functions generating the unitaries
+      of the gates, keyed by gate name.
+    :returns: The stacked unitaries, of shape (N, 2, 2) and (N, 4, 4), keyed by number
+      of qubits, and for every record, the row of its unitary in the table of its number
+      of qubits (or -1 for gates without unitary, e.g., idle gates).
+    :rtype: tuple
+    """
+    stacks = {}
+    widths = {}
+    for opcode, indices, args in _groups(records):
+        fun = action.get(GATE_NAMES[opcode])
+        if fun is None:
+            continue
+        U = np.asarray(fun(*args))
+        stacks[opcode] = indices, np.broadcast_to(U, (len(indices),) + U.shape[-2:])
+        widths[opcode] = int(N_QUBITS[opcode])
+    return _tables(stacks, widths, len(records))
+
+
+def superoperators(records, model):
+    """Generates the superoperators of every gate of a compact circuit under a noise
+    model, with one call of the model's batch_gate per distinct gate, or, for models
+    declared by a NoiseSpec, one vectorized evaluation per kind of rotation (see
+    SpecifiedModel.superoperators).
+
+    :param records: The compact circuit.
+    :param model: The noise model, e.g., an SNLToy1 or SNLToy1Model instance.
+    :returns: The stacked superoperators, of shape (N, 4, 4) and (N, 16, 16), keyed by
+      number of qubits; for every record, the row of its superoperator in the table of
+      its number of qubits (or -1 for gates not modeled, e.g., prepare_all); and the
+      duration of every record.
+    :rtype: tuple
+    """
+    evaluate = getattr(model, "superoperators", None)
+    if evaluate is not None:
+        result = evaluate(records["opcode"], records["params"])
+        if result is not None:
+            return result
+
+    cls = _portable_class(model)
+    stacks = {}
+    widths = {}
+    durations = np.zeros(len(records))
+    for opcode, indices, args in _groups(records):
+        name = GATE_NAMES[opcode]
+        if not _is_modeled(cls, name):
+            continue
+        G, durations[indices] = _evaluate(model, name, args)
+        # Gates without arguments (e.g., Sx) are evaluated once.
+        stacks[opcode] = indices, np.broadcast_to(G, (len(indices),) + G.shape[-2:])
+        widths[opcode] = int(N_QUBITS[opcode])
+    tables, rows = _tables(stacks, widths, len(records))
+    return tables, rows, durations
+
+
+def simulate(records, n_qubits=None, precision=None):
+    """Emulates a compact circuit without noise, from the all-zero state.
+
+    :param records: The compact circuit.  Any prepare_all or measure_all it contains is
+      ignored.
+    :param int n_qubits: (optional) The number of qubits.  By default, the number of
+      qubits used.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the simulated state.  By default, double precision.
+    :rtype: StateVector
+    """
+    if n_qubits is None:
+        n_qubits = count_qubits(records)
+    state = StateVector(n_qubits, precision=precision)
+    tables, rows = unitaries(records)
+    diagonal = np.array([name in DIAGONAL_ACTION for name in GATE_NAMES])
+    for opcode, qubits, row in zip(records["opcode"], records["qubits"], rows):
+        if row < 0:
+            continue
+        width = N_QUBITS[opcode]
+        U = tables[width][row]
+        qubits = qubits[:width].tolist()
+        if diagonal[opcode]:
+            state.apply_diagonal(np.diagonal(U), qubits)
+        else:
+            state.apply_unitary(U, qubits)
+    return state
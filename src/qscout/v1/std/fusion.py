@@ -0,0 +1,254 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from collections import namedtuple
+
+import numpy as np
+
+from jaqalpaq.core.stretch import stretched_unitaries
+
+from . import jaqal_action
+from .cache import GateCache
+from .opcodes import _base_name
+from .pauli_transfer import depolarizing_channel
+
+
+FusedGate = namedtuple("FusedGate", ["qubits", "matrix", "diagonal"])
+FusedGate.__doc__ = """A run of native gates, merged into a single operator.
+
+:ivar tuple qubits: The one or two qubits the operator acts on.
+:ivar matrix: The product of the operators of the merged gates.
+:ivar bool diagonal: Whether every merged gate is diagonal (and so, the product is).
+"""
+
+
+class _Block:
+    """The gates merged so far into one FusedGate."""
+
+    def __init__(self, qubits):
+        self.qubits = qubits
+        self.members = []
+        self.diagonal = True
+
+    def relative_members(self):
+        """The merged gates, with their qubits replaced by their positions in the
+        block."""
+        for name, qubits, args in self.members:
+            yield name, tuple(self.qubits.index(q) for q in qubits), args
+
+
+class GateFuser:
+    """Merges runs of native gates into composite one- and two-qubit operators.
+
+    Consecutive one-qubit gates on the same qubit are merged, as are one-qubit gates
+    adjacent to a two-qubit gate on the same pair (both before and after it), and
+    consecutive two-qubit gates on the same pair.  The operators of merged runs are
+    memoized by the signature of the run: the names, relative qubits, and (quantized)
+    arguments of the gates.  Circuits repeating the same runs, e.g., the Rz/Sx/Rz
+    sequences produced by compilers, therefore only build their operators once.
+    """
+
+    def __init__(
+        self, generate, dim, little_endian, structure=None, cache=None, extra=None
+    ):
+        """Builds a gate fuser.
+
+        :param generate: A function taking a gate name and a tuple of its classical
+          arguments, and returning the matrix of the gate, or None if the gate should be
+          skipped.
+        :param int dim: The dimension of the matrices of one-qubit gates, i.e., 2 for
+          unitaries and 4 for superoperators.
+        :param bool little_endian: Whether the first qubit of a two-qubit matrix is the
+          least significant bit of its indices (as for jaqalpaq unitaries), rather than
+          the first tensor factor (as for pyGSTi superoperators).
+        :param dict structure: (optional) The GateStructure of the gates, by name.  Gates
+          not listed are considered not to be diagonal.
+        :param GateCache cache: (optional) The cache to memoize the merged operators in.
+          By default, a new cache is created.
+        :param extra: (optional) A function of no arguments, returning additional
+          (hashable) key material, e.g., the parameters of a noise model.
+        """
+        self.generate = generate
+        self.dim = dim
+        self.little_endian = little_endian
+        self.structure = {} if structure is None else structure
+        self.cache = GateCache() if cache is None else cache
+        self.extra = extra
+
+    def fuse(self, gates):
+        """Merges a sequence of gates.
+
+        :param gates: An iterable of (name, qubits, args) triples, in the order the gates
+          are applied.
+        :returns: The merged gates, in an order consistent with the original.
+        :rtype: list of FusedGate
+        """
+        blocks = []
+        # The most recent block acting on each qubit.
+        latest = {}
+        for name, qubits, args in gates:
+            qubits = tuple(qubits)
+            if len(qubits) == 1:
+                (q,) = qubits
+                block = latest.get(q)
+                if block is None:
+                    block = latest[q] = _Block(qubits)
+                    blocks.append(block)
+            elif len(qubits) == 2:
+                a, b = qubits
+                if a == b:
+                    raise ValueError("Two-qubit gates must act on distinct qubits")
+                block = latest.get(a)
+                if block is None or block is not latest.get(b):
+                    block = _Block(qubits)
+                    blocks.append(block)
+                    # Absorb the pending one-qubit runs on either qubit.
+                    for q in qubits:
+                        prior = latest.get(q)
+                        if prior is not None and len(prior.qubits) == 1:
+                            block.members.extend(prior.members)
+                            block.diagonal &= prior.diagonal
+                            blocks.remove(prior)
+                        latest[q] = block
+            else:
+                raise ValueError(f"Cannot fuse {name}, acting on {len(qubits)} qubits")
+
+            block.members.append((name, qubits, tuple(args)))
+            structure = self.structure.get(_base_name(name))
+            block.diagonal &= structure is not None and structure.diagonal
+
+        return [
+            FusedGate(block.qubits, self.matrix(block), block.diagonal)
+            for block in blocks
+        ]
+
+    def signature(self, block):
+        """Returns the key identifying the operator of a block of gates."""
+        members = tuple(
+            (name, positions, tuple(self.cache.quantize(arg) for arg in args))
+            for name, positions, args in block.relative_members()
+        )
+        extra = () if self.extra is None else self.extra()
+        return ("fused", self.little_endian, len(block.qubits), members, extra)
+
+    def matrix(self, block):
+        """Returns the product of the operators of a block of gates."""
+        try:
+            key = self.signature(block)
+        except TypeError:
+            # Array-valued arguments are not cached.
+            return self._build(block)
+        return self.cache.lookup(key, lambda: self._build(block))
+
+    def _build(self, block):
+        product = None
+        for name, positions, args in block.relative_members():
+            matrix = self.generate(name, args)
+            if matrix is None:
+                continue
+            matrix = self._embed(matrix, positions, len(block.qubits))
+            product = matrix if product is None else matrix @ product
+        if product is None:
+            # Only skipped gates, i.e., the identity.
+            product = np.eye(self.dim ** len(block.qubits))
+        return product
+
+    def _embed(self, matrix, positions, n_qubits):
+        """Expresses the matrix of a gate in the basis of its block."""
+        if n_qubits == 1:
+            return matrix
+        if len(positions) == 2:
+            if positions == (0, 1):
+                return matrix
+            # Exchange the tensor factors of both the rows and the columns.
+            d = self.dim
+            return (
+                matrix.reshape(d, d, d, d).transpose(1, 0, 3, 2).reshape(d * d, d * d)
+            )
+        identity = np.eye(self.dim, dtype=matrix.dtype)
+        if (positions[0] == 0) != self.little_endian:
+            return np.kron(matrix, identity)
+        return np.kron(identity, matrix)
+
+
+def unitary_fuser(action=None, cache=None, precision=None):
+    """Builds a GateFuser merging the ideal unitaries of the native gates.
+
+    :param dict action: (optional) The functions generating the unitaries, keyed by gate
+      name.  By default, the IDEAL_ACTION of both the standard and stretched gates.
+    :param GateCache cache: (optional) The cache to memoize the merged unitaries in.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the default unitaries (action must not be given).
+    :rtype: GateFuser
+    """
+    if action is None:
+        action = jaqal_action.IDEAL_ACTION
+        if precision is not None:
+            action = jaqal_action.with_precision(action, precision)
+        action = dict(action)
+        action.update(stretched_unitaries(action, suffix="_stretched"))
+    elif precision is not None:
+        raise TypeError("Only the default action accepts a precision")
+    # Distinguish cached unitaries of different precisions.
+    key = None if precision is None else np.dtype(precision).str
+
+    def generate(name, args):
+        fun = action[name]
+        if fun is None:
+            return None
+        return fun(*args)
+
+    return GateFuser(
+        generate,
+        2,
+        little_endian=True,
+        structure=jaqal_action.STRUCTURE,
+        cache=cache,
+        extra=None if key is None else lambda: key,
+    )
+
+
+def superoperator_fuser(model, cache=None):
+    """Builds a GateFuser merging the superoperators of a noise model, e.g., SNLToy1.
+
+    Idle gates (I_*) are modeled by the idle behavior of the model on each qubit, for
+    the duration of the gate.  The merged superoperators only include the listed gates:
+    the idling of other qubits in the circuit is not accounted for.
+
+    :param model: The noise model, providing gate_*, gateduration_*, and idle methods.
+    :param GateCache cache: (optional) The cache to memoize the merged superoperators in.
+    :rtype: GateFuser
+    """
+    stretch = model.stretched_gates
+    kwargs = {} if stretch in (None, "add") else dict(stretch=stretch)
+
+    def generate(name, args):
+        gate = model.jaqal_gates[name]
+        qubits = [None] * len(gate.quantum_parameters)
+        base = _base_name(name)
+        # Stretched gates pass their own stretch factor as their last argument.
+        stretch = {} if base != name else kwargs
+        if base.startswith("I_"):
+            duration = getattr(model, f"gateduration_{base[2:]}")(
+                *qubits, *args, **stretch
+            )
+            if getattr(model, "idle_decay", None) is not None:
+                # Idling only depolarizes: build the matrix from the decay factor.
+                return depolarizing_channel(
+                    model.idle_decay(None, duration),
+                    len(qubits),
+                    precision=getattr(model, "precision", None),
+                )
+            G = model.idle(None, duration)
+            return G if len(qubits) == 1 else np.kron(G, G)
+        return getattr(model, f"gate_{base}")(*qubits, *args, **stretch)
+
+    def extra():
+        return (
+            type(model).__name__,
+            model.noise_parameters(),
+            stretch,
+            getattr(model, "precision", None),
+        )
+
+    return GateFuser(generate, 4, little_endian=False, cache=cache, extra=extra)
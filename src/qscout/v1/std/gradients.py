@@ -0,0 +1,194 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from collections import Counter, namedtuple
+from functools import partial
+
+import numpy as np
+
+from jaqalpaq.emulator.pygsti.circuit import pyGSTiCircuitGeneratingVisitor
+
+from .streaming import _gate, _layers, _leaves, apply_superoperator, initial_state
+
+GateGradient = namedtuple("GateGradient", ["name", "qubits", "args", "gradient"])
+GateGradient.__doc__ = """The derivatives of an expectation value with respect to the
+parameters of one application of a gate.
+
+:ivar str name: The name of the gate, e.g., "MS" or "R_stretched".
+:ivar tuple qubits: The indices of the qubits the gate acts on.
+:ivar tuple args: The classical arguments of the gate.
+:ivar gradient: The derivatives with respect to the classical parameters of the gate (but
+  not the stretch factor of stretched gates), as an array.
+"""
+
+AdjointResult = namedtuple("AdjointResult", ["value", "gates"])
+AdjointResult.__doc__ = """The expectation value of a circuit, and its gradient.
+
+:ivar float value: The expectation value.
+:ivar list gates: The GateGradient of every gate applied, in order.  A gate in a loop
+  is listed once per iteration: the derivative with respect to a parameter shared by
+  several gates is the sum of theirs.
+"""
+
+
+def _derivatives(a, b, sign):
+    """Returns the derivatives of a + sign * b, either of which may be a _Duration."""
+    derivatives = dict(getattr(a, "derivatives", {}))
+    for key, derivative in getattr(b, "derivatives", {}).items():
+        derivatives[key] = derivatives.get(key, 0) + sign * derivative
+    return derivatives
+
+
+class _Duration(float):
+    """A duration, and its derivatives with respect to the classical parameters of the
+    gates it depends on, keyed by the id of their labels.  The pyGSTi emulator's
+    visitor adds, subtracts, takes the maximum of, and repeats durations to time the
+    idles, which thus carry their derivatives in their arguments."""
+
+    def __new__(cls, value, derivatives):
+        self = super().__new__(cls, value)
+        self.derivatives = derivatives
+        return self
+
+    def __add__(self, other):
+        return _Duration(float(self) + float(other), _derivatives(self, other, 1))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return _Duration(float(self) - float(other), _derivatives(self, other, -1))
+
+    def __rsub__(self, other):
+        return _Duration(float(other) - float(self), _derivatives(other, self, -1))
+
+    def __mul__(self, reps):
+        derivatives = {key: d * reps for key, d in self.derivatives.items()}
+        return _Duration(float(self) * reps, derivatives)
+
+    __rmul__ = __mul__
+
+
+class _DifferentiatingVisitor(pyGSTiCircuitGeneratingVisitor):
+    """Times gates as the pyGSTi emulator, by _Duration instances."""
+
+    def __init__(self, model, **kwargs):
+        self.model = model
+        super().__init__(**kwargs)
+
+    def visit_GateStatement(self, obj, context=None):
+        label, indices, duration = super().visit_GateStatement(obj, context=context)
+        if label is not None:
+            name, stretch, args = _gate(self.model, label)
+            derivatives = self.model.duration_gradient(name, *args, stretch=stretch)
+            duration = _Duration(duration, {id(label): derivatives})
+        return label, indices, duration
+
+
+def observable(weights, n_qubits):
+    """Converts weights of the measurement outcomes into the diagonal observable they
+    define, in the normalized Pauli basis.
+
+    :param weights: The weights of the computational basis states, indexed with qubit 0
+      as the least significant bit (as jaqalpaq's probability_by_int).  E.g., the
+      indicator of one outcome, to differentiate its probability.
+    :param int n_qubits: The number of qubits.
+    :returns: The observable O, as an array of shape (4,) * n_qubits, such that
+      numpy.vdot(O, state) is the weighted sum of the probabilities of the outcomes.
+    :rtype: numpy.array
+    """
+    weights = np.asarray(weights, dtype=float)
+    if weights.shape != (2**n_qubits,):
+        raise ValueError(f"Expected {2 ** n_qubits} weights")
+    # The components of the projectors on |0> and |1>, as in streaming.probabilities
+    projectors = np.array([[1, 0, 0, 1], [1, 0, 0, -1]]) / np.sqrt(2)
+    O = weights.reshape((2,) * n_qubits).transpose()
+    for q in range(n_qubits):
+        O = np.moveaxis(np.tensordot(projectors, O, axes=([0], [q])), 0, q)
+    return O
+
+
+def adjoint_gradient(model, circuit, weights, n_qubits=None):
+    """Evaluates an expectation value of a circuit under a noise model, and its
+    derivatives with respect to the classical parameters of every gate.
+
+    The state is evolved forward once, keeping the state before every gate, and the
+    observable is then evolved backward once (by the transposed superoperators).  The
+    derivative with respect to a parameter of a gate is the overlap of the backward
+    observable after the gate with the derivative of the gate applied to the forward
+    state before it, so that all the derivatives cost about two evaluations of the
+    circuit, rather than two per parameter for finite differences.  The memory used is
+    that of one state per gate.
+
+    The gates and the idles between them are laid out as by the pyGSTi emulator, and
+    their derivatives are generated by the model's gradient and idle_gradient methods
+    (see SNLToy1Model.gradient).  The durations of the idles depend on the rotation
+    angles of the gates setting them (e.g., the idles of the other qubits during a
+    gate, or of the qubits of a shorter gate in parallel with it), as given by the
+    model's duration_gradient method: the derivatives through the idles are added to
+    those of these gates.  Those of a gate repeated in a loop are split evenly among its
+    iterations.  The whole circuit is evaluated as one subcircuit: prepare_all and
+    measure_all are ignored, and the evaluation starts from the all-zero state.
+
+    :param model: The noise model, e.g., an SNLToy1 or SNLToy1Model instance.
+    :param Circuit circuit: The parsed Jaqal circuit.
+    :param weights: The weights of the measurement outcomes, whose weighted sum of
+      probabilities is differentiated (see observable).
+    :param int n_qubits: (optional) The number of qubits.  By default, the model's
+      n_qubits if it has one, and otherwise, the size of the circuit's register.
+    :rtype: AdjointResult
+    """
+    if n_qubits is None:
+        n_qubits = getattr(model, "n_qubits", None)
+    if n_qubits is None:
+        n_qubits = sum(register.size for register in circuit.fundamental_registers())
+
+    # Forward: the operations applied, and the states they were applied to
+    state = initial_state(n_qubits)
+    operations = []
+    cls = partial(_DifferentiatingVisitor, model)
+    for layer in _layers(model, circuit, n_qubits, cls):
+        for label in layer:
+            for leaf in _leaves(label):
+                qubits = list(leaf.sslbls)
+                if leaf.name == "Gidle":
+                    G, dG = model.idle_gradient(None, *leaf.args)
+                else:
+                    name, stretch, args = _gate(model, leaf)
+                    G, dG = model.gradient(name, *args, stretch=stretch)
+                operations.append((leaf, G, dG, state))
+                state = apply_superoperator(np.asarray(G), state, qubits)
+
+    # Backward
+    O = observable(weights, n_qubits)
+    value = float(np.vdot(O, state))
+    gates = []
+    # The derivatives through the durations of the idles, keyed by the id of the labels
+    # of the gates setting them
+    through_idles = {}
+    for leaf, G, dG, state in reversed(operations):
+        qubits = list(leaf.sslbls)
+        gradient = np.array(
+            [np.vdot(O, apply_superoperator(d, state, qubits)) for d in dG]
+        )
+        if leaf.name == "Gidle":
+            (duration,) = leaf.args
+            for key, derivative in getattr(duration, "derivatives", {}).items():
+                through_idles[key] = (
+                    through_idles.get(key, 0) + gradient[0] * derivative
+                )
+        else:
+            gates.append((leaf, gradient))
+        O = apply_superoperator(np.asarray(G).T, O, qubits)
+    gates.reverse()
+
+    iterations = Counter(id(leaf) for leaf, _ in gates)
+    gradients = []
+    for leaf, gradient in gates:
+        key = id(leaf)
+        if key in through_idles:
+            gradient = gradient + through_idles[key] / iterations[key]
+        name = leaf.name[len("GJ") :]
+        gradients.append(
+            GateGradient(name, tuple(leaf.sslbls), tuple(leaf.args), gradient)
+        )
+    return AdjointResult(value, gradients)
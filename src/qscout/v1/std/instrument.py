@@ -0,0 +1,222 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+
+import numpy as np
+
+
+# The methods, besides gate_* and gateduration_*, that are instrumented
+_METHODS = ("idle", "batch_gate", "superoperators")
+
+
+def _arrays(result):
+    """The arrays returned by a method, e.g., the tables returned by superoperators."""
+    if isinstance(result, np.ndarray):
+        yield result
+    elif isinstance(result, dict):
+        for value in result.values():
+            yield from _arrays(value)
+    elif isinstance(result, (tuple, list)):
+        for value in result:
+            yield from _arrays(value)
+
+
+class _Counters:
+    """The statistics of one instrumented method."""
+
+    __slots__ = ("calls", "time", "self_time", "allocations", "allocated_bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+        self.self_time = 0.0
+        self.allocations = 0
+        self.allocated_bytes = 0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Instrumentation:
+    """Records how often, and for how long, the methods of noise models are called.
+
+    Pass an instance to a noise model (e.g., ``SNLToy1(n, instrumentation=...)``) to
+    wrap its gate_*, gateduration_*, and idle methods, and those evaluating many gates at
+    once (batch_gate and superoperators, which include the evaluation of the compiled
+    spec).  Models built without one are not
+    modified in any way, and so carry no overhead.  For every method, the number of
+    calls, the cumulative wall time (with and without that of the instrumented methods it
+    calls), and the number (and size) of the newly allocated arrays returned are
+    recorded.  Arrays returned from caches are read-only, and are not counted: their
+    allocation shows up as a cache miss instead.  The hit rates of caches registered
+    with watch_cache are tracked as well, and arbitrary stages (e.g., running the
+    emulator) can be timed with section.
+    """
+
+    def __init__(self, enabled=True):
+        """Builds an empty recorder.
+
+        :param bool enabled: (default True) Whether to record calls.  See recording.
+        """
+        self.enabled = enabled
+        # The time spent in instrumented methods called by the current one.
+        self._nested_time = 0.0
+        self._methods = {}
+        self._caches = {}
+        self._sections = {}
+
+    def wrap(self, name, fun):
+        """Returns an instrumented version of a method.
+
+        :param str name: The name to record the calls under, e.g., "gate_R".
+        :param fun: The (bound) method.
+        """
+        counters = self._methods.setdefault(name, _Counters())
+
+        @wraps(fun)
+        def instrumented(*args, **kwargs):
+            if not self.enabled:
+                return fun(*args, **kwargs)
+            outer = self._nested_time
+            self._nested_time = 0.0
+            start = perf_counter()
+            try:
+                result = fun(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                counters.time += elapsed
+                counters.self_time += elapsed - self._nested_time
+                self._nested_time = outer + elapsed
+            counters.calls += 1
+            for array in _arrays(result):
+                # Shared (e.g., cached) arrays are read-only, and not counted.  Others
+                # may be views of a new allocation (e.g., a batch of one superoperator).
+                if array.flags.writeable:
+                    counters.allocations += 1
+                    counters.allocated_bytes += array.nbytes
+            return result
+
+        return instrumented
+
+    def instrument(self, model):
+        """Shadows the gate_*, gateduration_*, idle, batch_gate, and superoperators
+        methods of a model (those it has) by instance attributes recording their calls.
+
+        This must be done before the methods are handed to an emulator, i.e., in the
+        constructor of the model.
+        """
+        for name in dir(type(model)):
+            if name.startswith(("gate_", "gateduration_")) or name in _METHODS:
+                setattr(model, name, self.wrap(name, getattr(model, name)))
+
+    def watch_cache(self, name, cache):
+        """Includes the statistics of a cache in the report.
+
+        :param str name: The name to report the cache under.
+        :param cache: The cache, e.g., a GateCache or a functools.lru_cache, providing a
+          cache_info() method returning hits and misses.
+        """
+        info = cache.cache_info()
+        self._caches[name] = (cache, info.hits, info.misses)
+
+    @contextmanager
+    def recording(self):
+        """Context manager enabling the recording of calls (only) within its body."""
+        enabled = self.enabled
+        self.enabled = True
+        try:
+            yield self
+        finally:
+            self.enabled = enabled
+
+    @contextmanager
+    def section(self, name):
+        """Context manager adding the wall time of its body to a named section."""
+        start = perf_counter()
+        try:
+            yield self
+        finally:
+            self._sections[name] = self._sections.get(name, 0.0) + (
+                perf_counter() - start
+            )
+
+    def reset(self):
+        """Clears all the statistics recorded so far."""
+        for counters in self._methods.values():
+            counters.__init__()
+        for name, (cache, hits, misses) in list(self._caches.items()):
+            self.watch_cache(name, cache)
+        self._sections.clear()
+
+    def report(self):
+        """Returns the statistics recorded so far.
+
+        :returns: A dictionary with the entries:
+
+          - methods: For every method, a dictionary of its calls, time, self_time
+            (excluding the time of instrumented methods it called), allocations, and
+            allocated_bytes.
+          - gates: For every gate name, the calls and self_time of its gate_* and
+            gateduration_* methods combined.
+          - caches: For every watched cache, its hits, misses, and hit_rate (or None
+            if it was not used).
+          - sections: The time spent in every section.
+          - time: The time spent in all instrumented methods.
+        :rtype: dict
+        """
+        methods = {
+            name: counters.as_dict()
+            for name, counters in self._methods.items()
+            if counters.calls
+        }
+
+        gates = {}
+        for name, counters in methods.items():
+            if name.startswith(("gate_", "gateduration_")):
+                gate = name.split("_", 1)[1]
+            elif name == "idle":
+                gate = "idle"
+            else:
+                continue
+            totals = gates.setdefault(gate, dict(calls=0, self_time=0.0))
+            totals["calls"] += counters["calls"]
+            totals["self_time"] += counters["self_time"]
+
+        caches = {}
+        for name, (cache, hits, misses) in self._caches.items():
+            info = cache.cache_info()
+            hits = info.hits - hits
+            misses = info.misses - misses
+            total = hits + misses
+            caches[name] = dict(
+                hits=hits, misses=misses, hit_rate=hits / total if total else None
+            )
+
+        return dict(
+            methods=methods,
+            gates=gates,
+            caches=caches,
+            sections=dict(self._sections),
+            time=sum(counters["self_time"] for counters in methods.values()),
+        )
+
+    def __str__(self):
+        report = self.report()
+        lines = [f"{'method':<20} {'calls':>8} {'time (s)':>10} {'allocated':>10}"]
+        by_time = sorted(report["methods"].items(), key=lambda item: -item[1]["time"])
+        for name, counters in by_time:
+            lines.append(
+                f"{name:<20} {counters['calls']:>8} {counters['time']:>10.6f} "
+                f"{counters['allocations']:>10}"
+            )
+        for name, cache in report["caches"].items():
+            rate = "-" if cache["hit_rate"] is None else f"{cache['hit_rate']:.1%}"
+            lines.append(
+                f"cache {name}: {cache['hits']} hits, {cache['misses']} misses ({rate})"
+            )
+        for name, time in report["sections"].items():
+            lines.append(f"section {name}: {time:.6f} s")
+        return "\n".join(lines)
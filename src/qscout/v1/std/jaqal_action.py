@@ -1,104 +1,128 @@
+from collections import namedtuple
+from functools import partial
+
 from .jaqal_gates import ALL_GATES, ACTIVE_GATES
 
 import numpy as np
 
 
-def U_R(axis_angle, rotation_angle):
+def _at_precision(dtype, precision):
+    """Returns the floating point type of the same kind (real or complex) as dtype, at the
+    precision of the real floating point type precision (e.g., numpy.float32)."""
+    if np.issubdtype(dtype, np.complexfloating):
+        return np.result_type(precision, np.complex64)
+    return np.dtype(precision)
+
+
+def _stack(dim, *values, precision=None):
+    """Allocates the (zeroed) stack of dim x dim matrices filled in by the U_* generators,
+    broadcast over, and with the dtype promoted from, values.
+
+    Gates whose matrices used to be spelled out with integer zeros pass int among the
+    values, so that their dtype is unchanged from those literal constructions.  If
+    precision is given, the dtype is converted to that precision, and the values are
+    rounded to it as they are assigned.
+    """
+    shape = np.broadcast(*values).shape
+    dtype = np.result_type(*values)
+    if precision is not None:
+        dtype = _at_precision(dtype, precision)
+    return np.zeros(shape + (dim, dim), dtype=dtype)
+
+
+def U_R(axis_angle, rotation_angle, *, precision=None):
     """
     Generates the unitary matrix that describes the QSCOUT native R gate, which performs
     an arbitrary rotation around an axis in the X-Y plane.
 
     :param float axis_angle: The angle that sets the planar axis to rotate around.
     :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
     :returns: The unitary gate matrix.
     :rtype: numpy.array
+
+    Both angles may also be arrays, which are broadcast against each other; a stack of
+    matrices of shape ``(..., 2, 2)`` is then returned.
     """
-    return np.array(
-        [
-            [
-                np.cos(rotation_angle / 2.0),
-                (-1j * np.cos(axis_angle) - np.sin(axis_angle))
-                * np.sin(rotation_angle / 2.0),
-            ],
-            [
-                (-1j * np.cos(axis_angle) + np.sin(axis_angle))
-                * np.sin(rotation_angle / 2.0),
-                np.cos(rotation_angle / 2.0),
-            ],
-        ]
-    )
+    ca = np.cos(axis_angle)
+    sa = np.sin(axis_angle)
+    cr = np.cos(rotation_angle / 2.0)
+    sr = np.sin(rotation_angle / 2.0)
+    U = _stack(2, ca, cr, 1j, precision=precision)
+    U[..., 0, 0] = cr
+    U[..., 0, 1] = (-1j * ca - sa) * sr
+    U[..., 1, 0] = (-1j * ca + sa) * sr
+    U[..., 1, 1] = cr
+    return U
 
 
-def U_XX(rotation_angle):
+def U_XX(rotation_angle, *, precision=None):
     """
     Generates the unitary matrix that describes an XX gate.
 
     :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
     :returns: The unitary gate matrix.
     :rtype: numpy.array
+
+    An array of angles produces a stack of matrices of shape ``(..., 4, 4)``.
     """
 
     cr = np.cos(rotation_angle / 2.0)
     sr = np.sin(rotation_angle / 2.0) * 1j
-    # fmt: off
-    return np.array(
-        [
-            [  cr  ,   0  ,   0  ,  -sr  ],
-            [   0  ,  cr  ,  -sr ,   0   ],
-            [   0  ,  -sr ,  cr  ,   0   ],
-            [  -sr ,   0  ,   0  ,  cr   ],
-        ]
-    )
-    # fmt: on
+    U = _stack(4, cr, sr, int, precision=precision)
+    U[..., 0, 0] = U[..., 1, 1] = U[..., 2, 2] = U[..., 3, 3] = cr
+    U[..., 0, 3] = U[..., 3, 0] = -sr
+    U[..., 1, 2] = U[..., 2, 1] = -sr
+    return U
 
 
-def U_YY(rotation_angle):
+def U_YY(rotation_angle, *, precision=None):
     """
     Generates the unitary matrix that describes an YY gate.
 
     :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
     :returns: The unitary gate matrix.
     :rtype: numpy.array
+
+    An array of angles produces a stack of matrices of shape ``(..., 4, 4)``.
     """
 
     cr = np.cos(rotation_angle / 2.0)
     sr = np.sin(rotation_angle / 2.0) * 1j
-    # fmt: off
-    return np.array(
-        [
-            [  cr  ,   0  ,   0  ,   sr  ],
-            [   0  ,  cr  ,  -sr ,   0   ],
-            [   0  ,  -sr ,  cr  ,   0   ],
-            [   sr ,   0  ,   0  ,  cr   ],
-        ]
-    )
-    # fmt: on
+    U = _stack(4, cr, sr, int, precision=precision)
+    U[..., 0, 0] = U[..., 1, 1] = U[..., 2, 2] = U[..., 3, 3] = cr
+    U[..., 0, 3] = U[..., 3, 0] = sr
+    U[..., 1, 2] = U[..., 2, 1] = -sr
+    return U
 
 
-def U_ZZ(rotation_angle):
+def U_ZZ(rotation_angle, *, precision=None):
     """
     Generates the unitary matrix that describes the QSCOUT native ZZ gate.
 
     :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
     :returns: The unitary gate matrix.
     :rtype: numpy.array
+
+    An array of angles produces a stack of matrices of shape ``(..., 4, 4)``.
     """
 
     cr = np.cos(rotation_angle / 2.0)
     sr = np.sin(rotation_angle / 2.0) * 1j
-    # fmt: off
-    return np.array(
-        [
-            [ cr-sr,   0  ,   0  ,   0   ],
-            [   0  , cr+sr,   0  ,   0   ],
-            [   0  ,   0  , cr+sr,   0   ],
-            [   0  ,   0  ,   0  , cr-sr ],
-        ]
-    )
-    # fmt: on
+    U = _stack(4, cr, sr, int, precision=precision)
+    U[..., 0, 0] = U[..., 3, 3] = cr - sr
+    U[..., 1, 1] = U[..., 2, 2] = cr + sr
+    return U
 
 
-def U_MS(axis_angle, rotation_angle):
+def U_MS(axis_angle, rotation_angle, *, precision=None):
     """
     Generates the unitary matrix that describes the QSCOUT native Mølmer-Sørensen gate.
     This matrix is equivalent to ::
@@ -107,53 +131,306 @@ def U_MS(axis_angle, rotation_angle):
 
     :param float axis_angle: The phase angle determining the mix of XX and YY rotation.
     :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
     :returns: The unitary gate matrix.
     :rtype: numpy.array
+
+    Both angles may also be arrays, which are broadcast against each other; a stack of
+    matrices of shape ``(..., 4, 4)`` is then returned.
     """
-    return np.array(
-        [
-            [
-                np.cos(rotation_angle / 2.0),
-                0,
-                0,
-                -1j
-                * (np.cos(axis_angle * 2.0) - 1j * np.sin(axis_angle * 2.0))
-                * np.sin(rotation_angle / 2.0),
-            ],
-            [0, np.cos(rotation_angle / 2.0), -1j * np.sin(rotation_angle / 2.0), 0],
-            [0, -1j * np.sin(rotation_angle / 2.0), np.cos(rotation_angle / 2.0), 0],
-            [
-                -1j
-                * (np.cos(axis_angle * 2.0) + 1j * np.sin(axis_angle * 2.0))
-                * np.sin(rotation_angle / 2.0),
-                0,
-                0,
-                np.cos(rotation_angle / 2.0),
-            ],
-        ]
-    )
+    ca = np.cos(axis_angle * 2.0)
+    sa = np.sin(axis_angle * 2.0)
+    cr = np.cos(rotation_angle / 2.0)
+    sr = np.sin(rotation_angle / 2.0)
+    U = _stack(4, ca, cr, 1j, int, precision=precision)
+    U[..., 0, 0] = U[..., 1, 1] = U[..., 2, 2] = U[..., 3, 3] = cr
+    U[..., 0, 3] = -1j * (ca - 1j * sa) * sr
+    U[..., 1, 2] = U[..., 2, 1] = -1j * sr
+    U[..., 3, 0] = -1j * (ca + 1j * sa) * sr
+    return U
 
 
-def U_Rx(rotation_angle):
-    return np.array(
-        [
-            [np.cos(rotation_angle / 2), -1j * np.sin(rotation_angle / 2)],
-            [-1j * np.sin(rotation_angle / 2), np.cos(rotation_angle / 2)],
-        ]
-    )
+def U_Rx(rotation_angle, *, precision=None):
+    """
+    Generates the unitary matrix that describes a rotation around the X axis.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The unitary gate matrix.
+    :rtype: numpy.array
+
+    An array of angles produces a stack of matrices of shape ``(..., 2, 2)``.
+    """
+    cr = np.cos(rotation_angle / 2)
+    sr = np.sin(rotation_angle / 2)
+    U = _stack(2, cr, 1j, precision=precision)
+    U[..., 0, 0] = U[..., 1, 1] = cr
+    U[..., 0, 1] = U[..., 1, 0] = -1j * sr
+    return U
+
+
+def U_Ry(rotation_angle, *, precision=None):
+    """
+    Generates the (real) unitary matrix that describes a rotation around the Y axis.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The unitary gate matrix.
+    :rtype: numpy.array
+
+    An array of angles produces a stack of matrices of shape ``(..., 2, 2)``.
+    """
+    cr = np.cos(rotation_angle / 2)
+    sr = np.sin(rotation_angle / 2)
+    U = _stack(2, cr, sr, precision=precision)
+    U[..., 0, 0] = U[..., 1, 1] = cr
+    U[..., 0, 1] = -sr
+    U[..., 1, 0] = sr
+    return U
+
+
+def U_Rz(rotation_angle, *, precision=None):
+    """
+    Generates the unitary matrix that describes a rotation around the Z axis, up to a
+    global phase.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The unitary gate matrix.
+    :rtype: numpy.array
+
+    An array of angles produces a stack of matrices of shape ``(..., 2, 2)``.
+    """
+    phase = np.exp(1j * np.asarray(rotation_angle))
+    U = _stack(2, phase, int, precision=precision)
+    U[..., 0, 0] = 1
+    U[..., 1, 1] = phase
+    return U
+
+
+def D_Rz(rotation_angle, *, precision=None):
+    """
+    Generates the diagonal of the unitary matrix generated by U_Rz.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The phases on the diagonal of the unitary gate matrix.
+    :rtype: numpy.array
+
+    An array of angles produces a stack of diagonals of shape ``(..., 2)``.
+    """
+    phase = np.exp(1j * np.asarray(rotation_angle))
+    dtype = phase.dtype if precision is None else _at_precision(phase.dtype, precision)
+    D = np.ones(phase.shape + (2,), dtype=dtype)
+    D[..., 1] = phase
+    return D
+
+
+def D_ZZ(rotation_angle, *, precision=None):
+    """
+    Generates the diagonal of the unitary matrix generated by U_ZZ.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The phases on the diagonal of the unitary gate matrix.
+    :rtype: numpy.array
+
+    An array of angles produces a stack of diagonals of shape ``(..., 4)``.
+    """
+    cr = np.cos(rotation_angle / 2.0)
+    sr = np.sin(rotation_angle / 2.0) * 1j
+    dtype = np.result_type(cr, sr)
+    if precision is not None:
+        dtype = _at_precision(dtype, precision)
+    D = np.empty(np.broadcast(cr, sr).shape + (4,), dtype=dtype)
+    D[..., 0] = D[..., 3] = cr - sr
+    D[..., 1] = D[..., 2] = cr + sr
+    return D
+
+
+# Derivatives of the unitaries with respect to their classical parameters, stacked along
+# a leading axis in the order of the parameters.  Every gate but Rz is a rotation
+# exp(-i rotation_angle/2 G) with G**2 = 1, whose derivative with respect to the
+# rotation angle is -i/2 G U, i.e., half the gate rotated by a further pi.  The axis
+# angles of R and MS rotate G about Z, so that the derivatives with respect to them are
+# the commutator -i/2 [Z, U] (with Z summed over the qubits of MS, whose axis turns
+# twice as fast).
+
+
+def _axis_derivative(U, charges):
+    """Returns -i/2 [Z, U], where Z is the diagonal operator with entries charges."""
+    charges = np.asarray(charges)
+    return -0.5j * (charges[:, None] - charges[None, :]) * U
 
 
-def U_Ry(rotation_angle):
-    return np.array(
-        [
-            [np.cos(rotation_angle / 2), -np.sin(rotation_angle / 2)],
-            [np.sin(rotation_angle / 2), np.cos(rotation_angle / 2)],
-        ]
+def dU_R(axis_angle, rotation_angle, *, precision=None):
+    """
+    Generates the derivatives of the unitary matrix generated by U_R.
+
+    :param float axis_angle: The angle that sets the planar axis to rotate around.
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The derivatives with respect to axis_angle and rotation_angle, stacked in
+      an array of shape ``(2, ..., 2, 2)``.
+    :rtype: numpy.array
+    """
+    U = U_R(axis_angle, rotation_angle, precision=precision)
+    dU = U_R(axis_angle, np.add(rotation_angle, np.pi), precision=precision) / 2
+    return np.stack([_axis_derivative(U, [1, -1]), dU]).astype(U.dtype, copy=False)
+
+
+def dU_Rx(rotation_angle, *, precision=None):
+    """
+    Generates the derivative of the unitary matrix generated by U_Rx.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The derivative, in an array of shape ``(1, ..., 2, 2)``.
+    :rtype: numpy.array
+    """
+    return U_Rx(np.add(rotation_angle, np.pi), precision=precision)[None] / 2
+
+
+def dU_Ry(rotation_angle, *, precision=None):
+    """
+    Generates the derivative of the unitary matrix generated by U_Ry.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The derivative, in an array of shape ``(1, ..., 2, 2)``.
+    :rtype: numpy.array
+    """
+    return U_Ry(np.add(rotation_angle, np.pi), precision=precision)[None] / 2
+
+
+def dU_Rz(rotation_angle, *, precision=None):
+    """
+    Generates the derivative of the unitary matrix generated by U_Rz.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The derivative, in an array of shape ``(1, ..., 2, 2)``.
+    :rtype: numpy.array
+    """
+    U = U_Rz(rotation_angle, precision=precision)
+    U[..., 0, 0] = 0
+    U[..., 1, 1] *= 1j
+    return U[None]
+
+
+def dU_XX(rotation_angle, *, precision=None):
+    """
+    Generates the derivative of the unitary matrix generated by U_XX.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The derivative, in an array of shape ``(1, ..., 4, 4)``.
+    :rtype: numpy.array
+    """
+    return U_XX(np.add(rotation_angle, np.pi), precision=precision)[None] / 2
+
+
+def dU_YY(rotation_angle, *, precision=None):
+    """
+    Generates the derivative of the unitary matrix generated by U_YY.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The derivative, in an array of shape ``(1, ..., 4, 4)``.
+    :rtype: numpy.array
+    """
+    return U_YY(np.add(rotation_angle, np.pi), precision=precision)[None] / 2
+
+
+def dU_ZZ(rotation_angle, *, precision=None):
+    """
+    Generates the derivative of the unitary matrix generated by U_ZZ.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The derivative, in an array of shape ``(1, ..., 4, 4)``.
+    :rtype: numpy.array
+    """
+    return U_ZZ(np.add(rotation_angle, np.pi), precision=precision)[None] / 2
+
+
+def dU_MS(axis_angle, rotation_angle, *, precision=None):
+    """
+    Generates the derivatives of the unitary matrix generated by U_MS.
+
+    :param float axis_angle: The phase angle determining the mix of XX and YY rotation.
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the result.  By default, double precision.
+    :returns: The derivatives with respect to axis_angle and rotation_angle, stacked in
+      an array of shape ``(2, ..., 4, 4)``.
+    :rtype: numpy.array
+    """
+    U = U_MS(axis_angle, rotation_angle, precision=precision)
+    dU = U_MS(axis_angle, np.add(rotation_angle, np.pi), precision=precision) / 2
+    return np.stack([_axis_derivative(U, [2, 0, 0, -2]), dU]).astype(
+        U.dtype, copy=False
     )
 
 
-def U_Rz(rotation_angle):
-    return np.array([[1, 0], [0, np.exp(1j * rotation_angle)]])
+def _constant(generator, *args, **kwargs):
+    """
+    Wraps a fixed-angle gate as a function of no arguments.  The matrix is generated on
+    the first call, and the same read-only array is returned by every call thereafter.
+
+    :param generator: The U_* function generating the gate.
+    :param args: The fixed angles to pass to generator.
+    :param kwargs: Keyword arguments (e.g., precision) to pass to generator.
+    :returns: A function returning the (cached) unitary gate matrix.
+    """
+    matrix = None
+
+    def constant():
+        nonlocal matrix
+        if matrix is None:
+            matrix = generator(*args, **kwargs)
+            matrix.flags.writeable = False
+        return matrix
+
+    # Allows with_precision to regenerate the matrix.
+    constant.generator = generator
+    constant.args = args
+    return constant
+
+
+def with_precision(action, precision):
+    """
+    Returns a copy of a dictionary of gate generators (e.g., IDEAL_ACTION or
+    DIAGONAL_ACTION), generating their arrays at another precision.
+
+    :param dict action: The functions generating the gates, keyed by gate name.  They
+      must accept a precision keyword argument, as the U_* and D_* functions do.
+    :param precision: The real floating point type (e.g., numpy.float32) setting the
+      precision of the generated arrays.
+    :rtype: dict
+    """
+    converted = {}
+    for name, fun in action.items():
+        if fun is None:
+            converted[name] = None
+        elif hasattr(fun, "generator"):
+            converted[name] = _constant(fun.generator, *fun.args, precision=precision)
+        else:
+            converted[name] = partial(fun, precision=precision)
+    return converted
 
 
 IDEAL_ACTION = dict(
@@ -162,26 +439,125 @@ IDEAL_ACTION = dict(
     Rx=U_Rx,
     Ry=U_Ry,
     Rz=U_Rz,
-    Px=lambda: U_Rx(np.pi),
-    Py=lambda: U_Ry(np.pi),
-    Pz=lambda: U_Rz(np.pi),
-    Sx=lambda: U_Rx(np.pi / 2),
-    Sy=lambda: U_Ry(np.pi / 2),
-    Sz=lambda: U_Rz(np.pi / 2),
-    Sxd=lambda: U_Rx(-np.pi / 2),
-    Syd=lambda: U_Ry(-np.pi / 2),
-    Szd=lambda: U_Rz(-np.pi / 2),
+    Px=_constant(U_Rx, np.pi),
+    Py=_constant(U_Ry, np.pi),
+    Pz=_constant(U_Rz, np.pi),
+    Sx=_constant(U_Rx, np.pi / 2),
+    Sy=_constant(U_Ry, np.pi / 2),
+    Sz=_constant(U_Rz, np.pi / 2),
+    Sxd=_constant(U_Rx, -np.pi / 2),
+    Syd=_constant(U_Ry, -np.pi / 2),
+    Szd=_constant(U_Rz, -np.pi / 2),
     XX=U_XX,
     YY=U_YY,
     ZZ=U_ZZ,
     MS=U_MS,
-    Sxx=lambda: U_XX(np.pi / 2),
-    Sxxd=lambda: U_XX(-np.pi / 2),
-    Syy=lambda: U_YY(np.pi / 2),
-    Syyd=lambda: U_YY(-np.pi / 2),
-    Szz=lambda: U_ZZ(np.pi / 2),
-    Szzd=lambda: U_ZZ(-np.pi / 2),
+    Sxx=_constant(U_XX, np.pi / 2),
+    Sxxd=_constant(U_XX, -np.pi / 2),
+    Syy=_constant(U_YY, np.pi / 2),
+    Syyd=_constant(U_YY, -np.pi / 2),
+    Szz=_constant(U_ZZ, np.pi / 2),
+    Szzd=_constant(U_ZZ, -np.pi / 2),
+)
+
+# The derivatives of the gates with classical parameters (see dU_R).
+IDEAL_GRADIENTS = dict(
+    R=dU_R,
+    Rt=dU_R,
+    Rx=dU_Rx,
+    Ry=dU_Ry,
+    Rz=dU_Rz,
+    XX=dU_XX,
+    YY=dU_YY,
+    ZZ=dU_ZZ,
+    MS=dU_MS,
 )
 
 for name in list(ACTIVE_GATES.keys()):
     IDEAL_ACTION[f"I_{name}"] = None
+
+
+# Diagonal gates can be applied as a multiplication by phases, which are generated
+# directly (and exactly matching the diagonals of IDEAL_ACTION) by these functions.
+DIAGONAL_ACTION = dict(
+    Rz=D_Rz,
+    Pz=_constant(D_Rz, np.pi),
+    Sz=_constant(D_Rz, np.pi / 2),
+    Szd=_constant(D_Rz, -np.pi / 2),
+    ZZ=D_ZZ,
+    Szz=_constant(D_ZZ, np.pi / 2),
+    Szzd=_constant(D_ZZ, -np.pi / 2),
+)
+
+
+GateStructure = namedtuple(
+    "GateStructure", ["pattern", "diagonal", "permutation", "commutes_with_z"]
+)
+GateStructure.__doc__ = """The sparsity structure shared by a gate's unitaries, for all
+values of its parameters.
+
+:ivar pattern: A read-only boolean array, marking the entries of the unitary that may
+  be nonzero.  (Entries outside the pattern vanish up to rounding.)
+:ivar bool diagonal: Whether the unitary is diagonal.  Its diagonal is then generated
+  by DIAGONAL_ACTION.
+:ivar permutation: If the unitary is a permutation matrix times phases, the row of the
+  nonzero entry of each column, as a tuple.  Otherwise None.
+:ivar bool commutes_with_z: Whether the unitary commutes with the product of Z on every
+  qubit it acts on (Z for one-qubit gates, ZZ for two-qubit gates), i.e., whether it
+  preserves the parity of computational basis states.
+"""
+
+
+def _structure(pattern):
+    """Derives a GateStructure from the sparsity pattern of a gate."""
+    pattern = np.array(pattern, dtype=bool)
+    pattern.flags.writeable = False
+    dim = len(pattern)
+
+    if (pattern.sum(axis=0) == 1).all():
+        permutation = tuple(int(row) for row in pattern.argmax(axis=0))
+    else:
+        permutation = None
+
+    parity = np.array([bin(i).count("1") % 2 for i in range(dim)])
+    rows, columns = np.nonzero(pattern)
+    return GateStructure(
+        pattern=pattern,
+        diagonal=permutation == tuple(range(dim)),
+        permutation=permutation,
+        commutes_with_z=bool((parity[rows] == parity[columns]).all()),
+    )
+
+
+_DIAGONAL = _structure(np.eye(2))
+_FLIP = _structure(np.eye(2)[::-1])
+_DENSE = _structure(np.ones((2, 2)))
+_DIAGONAL2 = _structure(np.eye(4))
+_XX_LIKE = _structure(np.eye(4) + np.eye(4)[::-1])
+
+STRUCTURE = dict(
+    R=_DENSE,
+    Rt=_DENSE,
+    Rx=_DENSE,
+    Ry=_DENSE,
+    Rz=_DIAGONAL,
+    Px=_FLIP,
+    Py=_FLIP,
+    Pz=_DIAGONAL,
+    Sx=_DENSE,
+    Sy=_DENSE,
+    Sz=_DIAGONAL,
+    Sxd=_DENSE,
+    Syd=_DENSE,
+    Szd=_DIAGONAL,
+    XX=_XX_LIKE,
+    YY=_XX_LIKE,
+    ZZ=_DIAGONAL2,
+    MS=_XX_LIKE,
+    Sxx=_XX_LIKE,
+    Sxxd=_XX_LIKE,
+    Syy=_XX_LIKE,
+    Syyd=_XX_LIKE,
+    Szz=_DIAGONAL2,
+    Szzd=_DIAGONAL2,
+)
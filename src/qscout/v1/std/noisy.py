@@ -1,25 +1,164 @@
 # Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
 # Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
 # certain rights in this software.
-from numpy import abs, diag, pi, kron
+from collections import namedtuple
+from functools import lru_cache, wraps
 
-import pygsti
+from numpy import asarray, diag, pi
+from numpy import arange, log1p, sign, zeros
 
-from .jaqal_gates import ALL_GATES
 from .jaqal_action import U_R, U_Rz, U_MS, U_XX, U_YY, U_ZZ
+from .jaqal_gates import ALL_GATES
+from .pauli_transfer import depolarizing_channel, depolarizing_masks, rotation_terms
+from .pauli_transfer import depolarizing_weights
+from .pauli_transfer import dPTM_R, dPTM_Rz, dPTM_MS, dPTM_XX, dPTM_YY, dPTM_ZZ
+from .spec import ROTATIONS, GateLaw, NoiseSpec, SpecifiedModel
+from .stretch import StretchFamily
 from .stretched import jaqal_gates as stretched
-from jaqalpaq.emulator.pygsti import AbstractNoisyNativeEmulator
 
 
-class SNLToy1(AbstractNoisyNativeEmulator):
-    """Version 1 error model of the QSCOUT native gates."""
+# SNLToy1 derives from a pyGSTi-backed emulator, and importing pyGSTi is slow.  It is
+# therefore only created (importing pyGSTi) the first time it is accessed.
+def __getattr__(name):
+    if name != "SNLToy1":
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    return _define_SNLToy1()
+
+
+def _define_SNLToy1():
+    global SNLToy1
+    from jaqalpaq.emulator.pygsti import AbstractNoisyNativeEmulator
+    from jaqalpaq.emulator.pygsti.model import build_noisy_native_model
+
+    class SNLToy1(SNLToy1Model, AbstractNoisyNativeEmulator):
+        """Version 1 error model of the QSCOUT native gates."""
+
+        def build_model(self):
+            if self.precision is None:
+                return super().build_model()
+            # pyGSTi only evolves states in double precision: superoperators of other
+            # precisions are converted as they are handed over.
+            gate_models = {
+                name: (_in_double_precision(gate), duration)
+                for name, (gate, duration) in self.collect_gate_models().items()
+            }
+            return build_noisy_native_model(
+                self.jaqal_gates,
+                gate_models,
+                _in_double_precision(self.idle),
+                self.n_qubits,
+                stretched_gates=self.stretched_gates,
+            )
+
+    return SNLToy1
+
+
+def _in_double_precision(fun):
+    """Wraps a function returning arrays, converting them to double precision."""
+
+    @wraps(fun)
+    def in_double_precision(*args, **kwargs):
+        return asarray(fun(*args, **kwargs), dtype=float)
+
+    return in_double_precision
+
+
+# The version 1 error model: gates take 1 unit of time per pi/2 rotation (10 for the
+# two-qubit gates, and none for the Z rotations, which are performed in software),
+# during which they over-rotate by rotation_error and depolarize by depolarization.
+# Rotations about axes in the X-Y plane are also off by phase_error.  Rt has 3x the noise
+# of R.
+# fmt: off
+SNLTOY1_SPEC = NoiseSpec(
+    dict(
+        R=GateLaw("R"),
+        Rt=GateLaw("R", noise_factor=3),
+        Rx=GateLaw("R", (0.0, None)),
+        Ry=GateLaw("R", (pi / 2, None)),
+        Px=GateLaw("R", (0.0, pi)),
+        Py=GateLaw("R", (pi / 2, pi)),
+        Sx=GateLaw("R", (0.0, pi / 2)),
+        Sy=GateLaw("R", (pi / 2, pi / 2)),
+        Sxd=GateLaw("R", (0.0, -pi / 2)),
+        Syd=GateLaw("R", (pi / 2, -pi / 2)),
+        Rz=GateLaw("Rz", duration=0),
+        Pz=GateLaw("Rz", (pi,), duration=0),
+        Sz=GateLaw("Rz", (pi / 2,), duration=0),
+        Szd=GateLaw("Rz", (-pi / 2,), duration=0),
+        XX=GateLaw("XX", duration=10),
+        Sxx=GateLaw("XX", (pi / 2,), duration=10),
+        Sxxd=GateLaw("XX", (-pi / 2,), duration=10),
+        YY=GateLaw("YY", duration=10),
+        Syy=GateLaw("YY", (pi / 2,), duration=10),
+        Syyd=GateLaw("YY", (-pi / 2,), duration=10),
+        ZZ=GateLaw("ZZ", duration=10),
+        Szz=GateLaw("ZZ", (pi / 2,), duration=10),
+        Szzd=GateLaw("ZZ", (-pi / 2,), duration=10),
+        MS=GateLaw("MS", duration=10),
+    ),
+    dict(depolarization=1e-3, rotation_error=1e-2, phase_error=1e-2),
+)
+# fmt: on
+
+
+# The coherent parts of the rotations of the gate laws (see spec.ROTATIONS): the
+# functions generating their unitaries, and the derivatives of their Pauli transfer
+# matrices (from the axis angle, if any, and the rotation angle)
+_COHERENT = dict(
+    R=(U_R, dPTM_R),
+    Rz=(U_Rz, dPTM_Rz),
+    XX=(U_XX, dPTM_XX),
+    YY=(U_YY, dPTM_YY),
+    ZZ=(U_ZZ, dPTM_ZZ),
+    MS=(U_MS, dPTM_MS),
+)
+
+_Rotation = namedtuple(
+    "_Rotation", ["ptm", "unitary", "ptm_gradient", "has_axis", "params", "law"]
+)
+
+
+def _rotations(spec):
+    """Resolves the gates of a spec to the rotations they perform, for stretch_family,
+    coherent_gate, and gradient.
+
+    :returns: The functions generating the Pauli transfer matrices, unitaries, and
+      derivatives of the Pauli transfer matrices of the rotation of every gate, whether
+      it takes an axis angle, its angles (None marking those passed as arguments), and
+      the GateLaw of the gate, keyed by gate name.
+    :rtype: dict
+    """
+    rotations = {}
+    for name, law in spec.gates.items():
+        ptm, has_axis, _ = ROTATIONS[law.rotation]
+        params = (None,) * (1 + has_axis) if law.params is None else law.params
+        rotations[name] = _Rotation(
+            ptm, *_COHERENT[law.rotation], has_axis, params, law
+        )
+    return rotations
+
+
+class SNLToy1Model(SpecifiedModel):
+    """Version 1 error model of the QSCOUT native gates, without an emulator.
+
+    This provides the superoperators and durations of the gates (and the behavior when
+    idling) without depending on pyGSTi.  SNLToy1 combines it with the emulator.
+
+    The model is declared by SNLTOY1_SPEC, which generates its gate_* and gateduration_*
+    methods (see SpecifiedModel), and from which the superoperators of many gates are
+    evaluated at once (see batch_gate).
+    """
+
+    noise_spec = SNLTOY1_SPEC
 
     # This tells AbstractNoisyNativeEmulator what gate set we're modeling:
     jaqal_gates = ALL_GATES.copy()
     jaqal_gates.update(stretched.ALL_GATES)
 
     def __init__(self, *args, **kwargs):
-        """Builds a MyCustomEmulator instance for particular parameters
+        """Builds a SNLToy1 (or SNLToy1Model) instance for particular parameters.  In
+        particular, passes the number of qubits to emulate (in args) to SNLToy1.
 
         :param depolarization float: (default 1e-3) The depolarization during one pi/2
           gate.
@@ -27,165 +166,226 @@ class SNLToy1(AbstractNoisyNativeEmulator):
           pi/2 gate.
         :param phase_error: (default 1e-2) The error in the x-y angle for (non-Z)
           rotation gates.
+        :param cache GateCache: (default None) If given, memoize the superoperators
+          returned by the gate_* methods in this cache, keyed also on the parameters of
+          the noise model.
+        :param instrumentation Instrumentation: (default None) If given, record the calls
+          to the gate_*, gateduration_*, and idle methods, and the use of the caches.
+        :param precision: (default None) The real floating point type (e.g.,
+          numpy.float32) of the superoperators returned by the gate_* and idle methods.
+          By default, double precision.
         """
-        # Equivalent to
-        # self.depolarization = kwargs.pop('depolarization', 1e-3 )
-        # ...
-        self.set_defaults(
-            kwargs, depolarization=1e-3, rotation_error=1e-2, phase_error=1e-2
-        )
-
-        # Pass through the balance of the parameters to AbstractNoisyNativeEmulator
-        # In particular: passes the number of qubits to emulated (in args)
         super().__init__(*args, **kwargs)
 
-    # For every gate, we need to specify a superoperator and a duration:
-
-    # GJR
-    def gateduration_R(self, q, axis_angle, rotation_angle, stretch=1):
-        return stretch * abs(rotation_angle) / (pi / 2)
-
-    def gate_R(self, q, axis_angle, rotation_angle, stretch=1):
-        # We model the decoherence and over-rotation as a function of the gate duration:
-        duration = self.gateduration_R(q, axis_angle, rotation_angle, stretch)
-
-        # I.e., we scale the rotation and depolarization error by the time
-        scaled_rotation_error = self.rotation_error * duration
-        depolarization_term = (1 - self.depolarization) ** duration
-
-        # Combine these all, returning a superoperator in the Pauli basis
-        return pygsti.unitary_to_pauligate(
-            U_R(axis_angle + self.phase_error, rotation_angle + scaled_rotation_error)
-        ) @ diag([1, depolarization_term, depolarization_term, depolarization_term])
-
-    # GJRt
-    gateduration_Rt = gateduration_R
-
-    def gate_Rt(self, q, axis_angle, rotation_angle, stretch=1):
-        # We model the decoherence and over-rotation as a function of the gate duration:
-        duration = self.gateduration_Rt(q, axis_angle, rotation_angle, stretch)
-
-        # We increase the noise to model the behavior of the physical hardware
-        # Change noise model for Rt to be 2x worse (3x the noise)
-        duration *= 3
-
-        # I.e., we scale the rotation and depolarization error by the time
-        scaled_rotation_error = self.rotation_error * duration
-        depolarization_term = (1 - self.depolarization) ** duration
+    def _watch_caches(self, instrumentation):
+        instrumentation.watch_cache("idle_matrix", _idle_matrix)
 
-        # Combine these all, returning a superoperator in the Pauli basis
-        return pygsti.unitary_to_pauligate(
-            U_R(axis_angle + self.phase_error, rotation_angle + scaled_rotation_error)
-        ) @ diag([1, depolarization_term, depolarization_term, depolarization_term])
+    _rotations = _rotations(SNLTOY1_SPEC)
 
-    # GJXX
-    def gateduration_XX(self, q0, q1, rotation_angle, stretch=1):
-        # Assume XX pi/2 gate 10 times longer than Sx, Sy, Sz
-        return stretch * 10 * abs(rotation_angle) / (pi / 2)
+    def _noise(self, parameter):
+        """The value of a noise parameter named by a GateLaw, or 0 if it names none."""
+        return 0.0 if parameter is None else getattr(self, parameter)
 
-    def gate_XX(self, q0, q1, rotation_angle, stretch=1):
-        duration = self.gateduration_XX(q0, q1, rotation_angle, stretch=stretch)
+    def _rotation(self, name, args, stretch=1):
+        """Resolves a gate to the rotation it performs, for stretch_family and
+        coherent_gate.
 
-        scaled_rotation_error = self.rotation_error * duration
-        depolarization_term = (1 - self.depolarization) ** duration
-
-        return pygsti.unitary_to_pauligate(
-            U_XX(rotation_angle + scaled_rotation_error)
-        ) @ kron(
-            diag([1] + 3 * [depolarization_term]), diag([1] + 3 * [depolarization_term])
+        :returns: The entry of _rotations, the axis angles (including the phase error),
+          the rotation angle, and the duration scaling the noise.
+        """
+        gate = self.jaqal_gates[name]
+        if len(args) != len(gate.classical_parameters):
+            raise TypeError(
+                f"{name} takes {len(gate.classical_parameters)} classical parameters"
+            )
+        rotation = self._rotations.get(name)
+        # Subclasses may model the gates differently.
+        if rotation is None or not self._follows_spec(name):
+            raise NotImplementedError(f"{name} is not a rotation of SNLToy1Model")
+
+        qubits = [None] * len(gate.quantum_parameters)
+        duration = getattr(self, f"gateduration_{name}")(
+            *qubits, *args, stretch=stretch
+        )
+        passed = iter(args)
+        angles = [next(passed) if param is None else param for param in rotation.params]
+        *axis_angles, rotation_angle = angles
+        if rotation.has_axis:
+            axis_angles[0] += self._noise(rotation.law.axis_error)
+        return (
+            rotation,
+            axis_angles,
+            rotation_angle,
+            duration * rotation.law.noise_factor,
         )
 
-    # GJYY
-    def gateduration_YY(self, q0, q1, rotation_angle, stretch=1):
-        # Assume YY pi/2 gate 10 times longer than Sx, Sy, Sz
-        return stretch * 10 * abs(rotation_angle) / (pi / 2)
-
-    def gate_YY(self, q0, q1, rotation_angle, stretch=1):
-        duration = self.gateduration_YY(q0, q1, rotation_angle, stretch=stretch)
+    def stretch_family(self, name, *args):
+        """Returns the superoperators of a gate, as a function of its stretch factor.
 
-        scaled_rotation_error = self.rotation_error * duration
-        depolarization_term = (1 - self.depolarization) ** duration
+        :param str name: The name of the (unstretched) gate, e.g., "MS".
+        :param args: The classical parameters of the gate.
+        :rtype: StretchFamily
 
-        return pygsti.unitary_to_pauligate(
-            U_YY(rotation_angle + scaled_rotation_error)
-        ) @ kron(
-            diag([1] + 3 * [depolarization_term]), diag([1] + 3 * [depolarization_term])
+        Calling the result with a stretch factor (or an array of them) matches calling
+        gate_{name} with that stretch, but only the coefficients depending on the stretch
+        are evaluated anew.  The result does not follow later changes to the noise
+        parameters of the model.
+        """
+        rotation, axis_angles, rotation_angle, duration = self._rotation(name, args)
+        law = rotation.law
+        return StretchFamily(
+            rotation_terms(rotation.ptm, *axis_angles, precision=self.precision),
+            depolarizing_masks(len(self.jaqal_gates[name].quantum_parameters)),
+            rotation_angle,
+            over_rotation=self._noise(law.rotation_error) * duration,
+            decay=(1 - self._noise(law.depolarization)) ** duration,
         )
 
-    # GJZZ
-    def gateduration_ZZ(self, q0, q1, rotation_angle, stretch=1):
-        # Assume ZZ pi/2 gate 10 times longer than Sx, Sy, Sz
-        return stretch * 10 * abs(rotation_angle) / (pi / 2)
+    def coherent_gate(self, name, *args, stretch=1):
+        """Returns the unitary of the coherent part of a gate, and its depolarization.
 
-    def gate_ZZ(self, q0, q1, rotation_angle, stretch=1):
-        duration = self.gateduration_ZZ(q0, q1, rotation_angle, stretch=stretch)
+        :param str name: The name of the (unstretched) gate, e.g., "MS".
+        :param args: The classical parameters of the gate.
+        :param stretch: (default 1) The stretch factor of the gate.
+        :returns: The unitary U (with the over-rotation and phase error), and the factor
+          decay by which each qubit is depolarized before it: gate_{name} is the Pauli
+          transfer matrix of U, preceded by the contraction of the X, Y, and Z
+          components of every qubit by decay.
+        :rtype: tuple
 
-        scaled_rotation_error = self.rotation_error * duration
-        depolarization_term = (1 - self.depolarization) ** duration
-
-        return pygsti.unitary_to_pauligate(
-            U_ZZ(rotation_angle + scaled_rotation_error)
-        ) @ kron(
-            diag([1] + 3 * [depolarization_term]), diag([1] + 3 * [depolarization_term])
+        The depolarization of a qubit is equivalently a Pauli fault: X, Y, or Z, each with
+        probability (1 - decay) / 4.  See trajectories.sample_trajectories.
+        """
+        rotation, axis_angles, rotation_angle, duration = self._rotation(
+            name, args, stretch
         )
-
-    # GJMS
-    def gateduration_MS(self, q0, q1, axis_angle, rotation_angle, stretch=1):
-        # Assume MS pi/2 gate 10 times longer than Sx, Sy, Sz
-        return stretch * 10 * abs(rotation_angle) / (pi / 2)
-
-    def gate_MS(self, q0, q1, axis_angle, rotation_angle, stretch=1):
-        duration = self.gateduration_MS(
-            q0, q1, axis_angle, rotation_angle, stretch=stretch
+        law = rotation.law
+        U = rotation.unitary(
+            *axis_angles,
+            rotation_angle + self._noise(law.rotation_error) * duration,
+            precision=self.precision,
         )
-
-        scaled_rotation_error = self.rotation_error * duration
-        depolarization_term = (1 - self.depolarization) ** duration
-
-        return pygsti.unitary_to_pauligate(
-            U_MS(axis_angle + self.phase_error, rotation_angle + scaled_rotation_error)
-        ) @ kron(
-            diag([1] + 3 * [depolarization_term]), diag([1] + 3 * [depolarization_term])
+        return U, (1 - self._noise(law.depolarization)) ** duration
+
+    def gradient(self, name, *args, stretch=1):
+        """Returns the superoperator of a gate, and its derivatives with respect to the
+        classical parameters of the gate.
+
+        :param str name: The name of the (unstretched) gate, e.g., "MS".
+        :param args: The classical parameters of the gate.
+        :param stretch: (default 1) The stretch factor of the gate.
+        :returns: The superoperator G, as returned by gate_{name}, and its derivatives,
+          stacked in an array of shape (len(args), 4**n, 4**n).
+        :rtype: tuple
+
+        The over-rotation and depolarization of a gate scale with its duration, which
+        depends on the magnitude of its rotation angle, and are differentiated along
+        with the rotation.  At a rotation angle of 0, where the duration is not
+        differentiable, the average of the one-sided derivatives (holding the duration
+        fixed) is returned.
+        """
+        rotation, axis_angles, rotation_angle, duration = self._rotation(
+            name, args, stretch
         )
-
-    # Rz is performed entirely in software.
-    # GJRz
-    def gateduration_Rz(self, q, angle, stretch=1):
-        return 0
-
-    def gate_Rz(self, q, angle, stretch=1):
-        return pygsti.unitary_to_pauligate(U_Rz(angle))
-
-    # A process matrix for the idle behavior of a qubit.
+        law = rotation.law
+        n_qubits = len(self.jaqal_gates[name].quantum_parameters)
+        # The derivative of the duration with respect to the rotation angle
+        slope = (
+            law.noise_factor
+            * self.duration_gradient(name, *args, stretch=stretch)[-1:].sum()
+        )
+        rotation_error = self._noise(law.rotation_error)
+        depolarization = self._noise(law.depolarization)
+
+        angle = rotation_angle + rotation_error * duration
+        P = rotation.ptm(*axis_angles, angle)
+        dP = rotation.ptm_gradient(*axis_angles, angle)
+        weights = depolarizing_weights((1 - depolarization) ** duration, n_qubits)
+        # The weights are decay**(duration * b), for Pauli operators acting on b qubits.
+        b = depolarizing_masks(n_qubits).T @ arange(n_qubits + 1)
+        rate = log1p(-depolarization) if depolarization < 1 else 0.0
+
+        G = P * weights
+        dG = dP * weights
+        dG[-1] *= 1 + rotation_error * slope
+        dG[-1] += G * (b * rate * slope)
+
+        # Only keep the derivatives with respect to the parameters of the gate, e.g.,
+        # the rotation angle of Rx, but not its fixed axis angle.
+        dG = dG[[i for i, param in enumerate(rotation.params) if param is None]]
+
+        dtype = float if self.precision is None else self.precision
+        return G.astype(dtype), dG.astype(dtype)
+
+    def duration_gradient(self, name, *args, stretch=1):
+        """Returns the derivatives of the duration of a gate (as timed by the pyGSTi
+        emulator) with respect to the classical parameters of the gate.
+
+        :param str name: The name of the (unstretched) gate, e.g., "MS".
+        :param args: The classical parameters of the gate.
+        :param stretch: (default 1) The stretch factor of the gate.
+        :rtype: numpy.array
+
+        The duration grows with the magnitude of the rotation angle, which is the last
+        parameter of the gates taking it.  As in gradient, the derivative at a rotation
+        angle of 0 is the average of the one-sided derivatives, i.e., 0.
+        """
+        rotation, _, rotation_angle, _ = self._rotation(name, args, stretch)
+        derivatives = zeros(len(args))
+        if rotation.params[-1] is None:
+            derivatives[-1] = (
+                stretch * rotation.law.duration / (pi / 2) * sign(rotation_angle)
+            )
+        return derivatives
+
+    def idle_gradient(self, q, duration):
+        """Returns the superoperator of an idle, and its derivative with respect to the
+        duration.
+
+        :param q: The qubit idling (ignored).
+        :param float duration: The duration of the idle.
+        :returns: The superoperator G, as returned by idle, and its derivative, in an
+          array of shape (1, 4, 4).
+        :rtype: tuple
+        """
+        G = asarray(self.idle(q, duration))
+        depolarization = getattr(self, self.noise_spec.idle)
+        rate = log1p(-depolarization) if depolarization < 1 else 0.0
+        dG = G * rate
+        dG[0, 0] = 0
+        return G, dG[None]
+
+    # Idling only depolarizes, so that it is described by a single decay factor per
+    # qubit, and consecutive idles compose by adding their durations:
+    #   idle_decay(a + b) == idle_decay(a) * idle_decay(b)
+    # The evaluators of this package (e.g., streaming and parallel) therefore carry idles
+    # as decay factors, and only build matrices when they need them.
+    def idle_decay(self, q, duration):
+        """Returns the factor by which idling for duration contracts the X, Y, and Z
+        components of a qubit.  duration may be an array."""
+        return (1 - getattr(self, self.noise_spec.idle)) ** duration
+
+    # A process matrix for the idle behavior of a qubit, or a stack of them, of shape
+    # (..., 4, 4), for an array of durations.
     # Gidle
     def idle(self, q, duration):
-        depolarization_term = (1 - self.depolarization) ** duration
-
-        return diag(
-            [1.0, depolarization_term, depolarization_term, depolarization_term]
-        )  # WARNING: array must be of dtype=float
-
-    # Instead of copy-pasting the above definitions, use _curry to create new methods
-    # with some arguments.  None is a special argument that means: require an argument
-    # in the created function and pass it through.
-    C = AbstractNoisyNativeEmulator._curry
-
-    gateduration_Rx, gate_Rx = C((None, 0.0, None), gateduration_R, gate_R)
-    gateduration_Ry, gate_Ry = C((None, pi / 2, None), gateduration_R, gate_R)
-    gateduration_Px, gate_Px = C((None, 0.0, pi), gateduration_R, gate_R)
-    gateduration_Py, gate_Py = C((None, pi / 2, pi), gateduration_R, gate_R)
-    gateduration_Pz, gate_Pz = C((None, pi), gateduration_Rz, gate_Rz)
-    gateduration_Sx, gate_Sx = C((None, 0.0, pi / 2), gateduration_R, gate_R)
-    gateduration_Sy, gate_Sy = C((None, pi / 2, pi / 2), gateduration_R, gate_R)
-    gateduration_Sz, gate_Sz = C((None, pi / 2), gateduration_Rz, gate_Rz)
-    gateduration_Sxd, gate_Sxd = C((None, 0.0, -pi / 2), gateduration_R, gate_R)
-    gateduration_Syd, gate_Syd = C((None, pi / 2, -pi / 2), gateduration_R, gate_R)
-    gateduration_Szd, gate_Szd = C((None, -pi / 2), gateduration_Rz, gate_Rz)
-    gateduration_Sxx, gate_Sxx = C((None, None, pi / 2), gateduration_XX, gate_XX)
-    gateduration_Sxxd, gate_Sxxd = C((None, None, -pi / 2), gateduration_XX, gate_XX)
-    gateduration_Syy, gate_Syy = C((None, None, pi / 2), gateduration_YY, gate_YY)
-    gateduration_Syyd, gate_Syyd = C((None, None, -pi / 2), gateduration_YY, gate_YY)
-    gateduration_Szz, gate_Szz = C((None, None, pi / 2), gateduration_ZZ, gate_ZZ)
-    gateduration_Szzd, gate_Szzd = C((None, None, -pi / 2), gateduration_ZZ, gate_ZZ)
-
-    del C
+        depolarization_term = self.idle_decay(q, duration)
+
+        try:
+            return _idle_matrix(depolarization_term, self.precision)
+        except TypeError:
+            # Arrays are not hashable.
+            return depolarizing_channel(
+                depolarization_term, 1, precision=self.precision
+            )  # WARNING: array must be of dtype=float
+
+
+@lru_cache(maxsize=1024)
+def _idle_matrix(depolarization_term, precision=None):
+    """The (shared, and therefore read-only) process matrix of an idle with the given
+    decay factor."""
+    G = diag(
+        [1.0, depolarization_term, depolarization_term, depolarization_term],
+    ).astype(float if precision is None else precision)
+    G.flags.writeable = False
+    return G
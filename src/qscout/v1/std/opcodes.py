@@ -0,0 +1,49 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+import numpy as np
+
+from . import jaqal_gates
+from .stretched import jaqal_gates as stretched_gates
+
+# The gates of a compact circuit: the QSCOUT native gates (including the idle gates,
+# prepare_all, and measure_all), and their stretched versions.  A gate's opcode is its
+# position in GATE_NAMES, which is only ever appended to.
+GATES = {**jaqal_gates.ALL_GATES, **stretched_gates.ALL_GATES}
+GATE_NAMES = tuple(GATES)
+OPCODES = {name: opcode for opcode, name in enumerate(GATE_NAMES)}
+# The number of qubits, and of classical arguments, of every opcode
+N_QUBITS = np.array([len(GATES[name].quantum_parameters) for name in GATE_NAMES])
+N_ARGS = np.array([len(GATES[name].classical_parameters) for name in GATE_NAMES])
+
+
+def _tables(stacks, widths, n_records):
+    """Assembles stacks of matrices, keyed by opcode, into tables keyed by number of
+    qubits."""
+    tables = {}
+    rows = np.full(n_records, -1)
+    for width in sorted(set(widths.values())):
+        group = [opcode for opcode in stacks if widths[opcode] == width]
+        tables[width] = np.concatenate([stacks[opcode][1] for opcode in group])
+        row = 0
+        for opcode in group:
+            indices = stacks[opcode][0]
+            rows[indices] = np.arange(row, row + len(indices))
+            row += len(indices)
+    return tables, rows
+
+
+def _base_name(name):
+    """Strips the suffix of a stretched gate."""
+    if name.endswith("_stretched"):
+        return name[: -len("_stretched")]
+    return name
+
+
+def _is_modeled(cls, name):
+    """Whether a noise model class provides the superoperator of a gate."""
+    base = _base_name(name)
+    if base.startswith("I_"):
+        base = base[2:]
+        return hasattr(cls, f"gateduration_{base}")
+    return hasattr(cls, f"gate_{base}")
@@ -0,0 +1,376 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+import numpy as np
+
+from jaqalpaq.core import Macro
+from jaqalpaq.core.algorithm import expand_macros
+from jaqalpaq.core.algorithm.visitor import Visitor
+
+from .opcodes import _base_name, _is_modeled
+from .pauli_transfer import depolarizing_channel
+from .table_cache import TableCache
+
+
+class _GateInstanceVisitor(Visitor):
+    """Collects the distinct (name, classical arguments) pairs of the gates of a
+    circuit whose macros have been expanded."""
+
+    def __init__(self):
+        super().__init__()
+        self.instances = set()
+
+    def visit_default(self, obj):
+        pass
+
+    def visit_Circuit(self, obj):
+        self.visit(obj.body)
+
+    def visit_BlockStatement(self, obj):
+        for statement in obj.statements:
+            self.visit(statement)
+
+    def visit_LoopStatement(self, obj):
+        self.visit(obj.statements)
+
+    def visit_GateStatement(self, obj):
+        if isinstance(obj.gate_def, Macro):
+            raise ValueError(f"Unexpanded macro {obj.name}")
+        # Constants (from let statements) are resolved by float.
+        args = tuple(
+            float(value)
+            for value, param in obj.parameters_with_types
+            if param.classical
+        )
+        self.instances.add((obj.name, args))
+
+
+def gate_instances(circuit):
+    """Returns the distinct gate instances of a circuit.
+
+    :param Circuit circuit: The circuit to inspect.
+    :returns: The (name, classical arguments) pairs of every gate applied.
+    :rtype: set
+    """
+    visitor = _GateInstanceVisitor()
+    visitor.visit(expand_macros(circuit))
+    return visitor.instances
+
+
+def _portable_class(model):
+    """Returns the most basic class of a noise model providing the same gates, e.g.,
+    SNLToy1Model for SNLToy1.  Worker processes build their models from this class, so
+    that they do not need to import (or build) the emulator."""
+    cls = type(model)
+    names = [
+        name
+        for name in dir(cls)
+        if name.startswith(("gate_", "gateduration_"))
+        or name in ("idle", "batch_gate", "jaqal_gates")
+    ]
+    portable = cls
+    for base in cls.__mro__[1:]:
+        if any(getattr(base, name, None) is not getattr(cls, name) for name in names):
+            break
+        portable = base
+    return portable
+
+
+def _bare_model(cls, state):
+    """Builds a model without calling its constructor."""
+    model = object.__new__(cls)
+    model.__dict__.update(state)
+    return model
+
+
+def _idles(model, durations, n_qubits):
+    """Generates the superoperators of idle gates of n_qubits qubits, for every
+    duration.  Models providing idle_decay (e.g., SNLToy1Model) only depolarize idle
+    qubits, so that the matrices are built from the decay factors at once."""
+    if getattr(model, "idle_decay", None) is not None:
+        decay = model.idle_decay(None, np.asarray(durations))
+        precision = getattr(model, "precision", None)
+        return depolarizing_channel(decay, n_qubits, precision=precision)
+    superoperators = []
+    for d in durations:
+        G = model.idle(None, d)
+        superoperators.append(G if n_qubits == 1 else np.kron(G, G))
+    return np.array(superoperators)
+
+
+def _evaluate(model, name, args):
+    """Generates the superoperators and durations of a batch of instances of a gate.
+
+    :param model: The noise model.
+    :param str name: The name of the gate.
+    :param args: The arrays of each classical argument of the instances.
+    :returns: The superoperators, of shape (N, d, d), and durations, of shape (N,).
+    """
+    n = max((len(arg) for arg in args), default=1)
+    gate = model.jaqal_gates[name]
+    qubits = [None] * len(gate.quantum_parameters)
+    base = _base_name(name)
+    if base != name:
+        *args, stretch = args
+    elif model.stretched_gates in (None, "add"):
+        stretch = 1
+    else:
+        stretch = model.stretched_gates
+
+    if base.startswith("I_"):
+        base = base[2:]
+        duration = getattr(model, f"gateduration_{base}")(
+            *qubits, *args, stretch=stretch
+        )
+        duration = np.broadcast_to(duration, (n,))
+        return _idles(model, duration, len(qubits)), duration
+
+    duration = getattr(model, f"gateduration_{base}")(*qubits, *args, stretch=stretch)
+    G = model.batch_gate(base, *args, stretch=stretch)
+    return np.broadcast_to(G, (n,) + G.shape[-2:]), np.broadcast_to(duration, (n,))
+
+
+def _shared_memory():
+    """Returns multiprocessing.shared_memory.SharedMemory, imported only when a process
+    pool is used, as it takes a while to import, and requires Python 3.8."""
+    try:
+        from multiprocessing.shared_memory import SharedMemory
+    except ImportError:
+        raise RuntimeError(
+            "Evaluating in a process pool requires multiprocessing.shared_memory "
+            "(Python 3.8 or later): pass max_workers=1 instead"
+        ) from None
+    return SharedMemory
+
+
+def _evaluate_into(cls, state, name, args, shm_name, shape, dtype, start):
+    """Worker process entry point: writes a batch of superoperators into shared memory,
+    and returns their durations."""
+    model = _bare_model(cls, state)
+    superoperators, duration = _evaluate(model, name, args)
+    shm = _shared_memory()(name=shm_name)
+    try:
+        table = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        table[start : start + len(superoperators)] = superoperators
+        del table
+    finally:
+        shm.close()
+    return duration
+
+
+class SuperoperatorTable:
+    """The superoperators and durations of the distinct gate instances of a collection of
+    circuits, under one noise model.
+
+    Instances are identified by (name, args) pairs, args being the tuple of classical
+    arguments (as floats).  The superoperators of one- and two-qubit gates are stored in
+    separate stacked arrays, of shape (N, 4, 4) and (N, 16, 16) respectively, in tables.
+    They have the precision of the noise model.
+    """
+
+    def __init__(self, instances, tables, locations, durations, circuit_instances=()):
+        """Assembles a table of gate instances.  See build_superoperator_table.
+
+        :param instances: The (name, args) pairs of the instances.
+        :param dict tables: The stacked superoperators, keyed by number of qubits.
+        :param locations: For every instance, the (number of qubits, row) locating its
+          superoperator in tables.
+        :param durations: For every instance, its duration.
+        :param circuit_instances: (optional) For every circuit, the indices of its
+          instances.
+        """
+        self.instances = list(instances)
+        self.index = {instance: i for i, instance in enumerate(self.instances)}
+        self.tables = tables
+        self.locations = list(locations)
+        self.durations = durations
+        self.circuit_instances = list(circuit_instances)
+
+    def __len__(self):
+        return len(self.instances)
+
+    def _superoperator(self, i):
+        n_qubits, row = self.locations[i]
+        return self.tables[n_qubits][row]
+
+    def superoperator(self, name, args=()):
+        """Returns the superoperator of a gate instance.
+
+        :param str name: The name of the gate.
+        :param args: The classical arguments of the gate.
+        :rtype: numpy.array
+        """
+        return self._superoperator(self.index[name, tuple(args)])
+
+    def duration(self, name, args=()):
+        """Returns the duration of a gate instance.
+
+        :param str name: The name of the gate.
+        :param args: The classical arguments of the gate.
+        :rtype: float
+        """
+        return self.durations[self.index[name, tuple(args)]]
+
+    def circuit_model(self, i):
+        """Returns the superoperators and durations of the instances of one circuit.
+
+        :param int i: The position of the circuit, as passed to
+          build_superoperator_table.
+        :returns: A dictionary of (superoperator, duration) pairs, keyed by
+          (name, args) pairs.
+        :rtype: dict
+        """
+        return {
+            self.instances[j]: (self._superoperator(j), self.durations[j])
+            for j in self.circuit_instances[i]
+        }
+
+
+def build_superoperator_table(
+    model, circuits, *, max_workers=None, executor=None, chunksize=1024, disk_cache=None
+):
+    """Builds the superoperators of every distinct gate instance in a batch of circuits.
+
+    The instances are grouped by gate, and evaluated in chunks with the model's
+    batch_gate method.  Unless max_workers is 1, the chunks are evaluated in parallel in
+    a process pool, writing into shared memory (which requires Python 3.8).  The worker
+    processes rebuild the model from its class and its noise parameters
+    (noise_parameter_names), as well as its stretched_gates and precision settings; any
+    other state of the model is not available to them.
+
+    :param model: The noise model, e.g., an SNLToy1 or SNLToy1Model instance.
+    :param circuits: An iterable of jaqalpaq Circuits.
+    :param int max_workers: (optional) The number of worker processes.  If 1, evaluate
+      everything in this process.  By default, as many as the processors available.
+    :param executor: (optional) A concurrent.futures executor to use (and not shut down)
+      instead of creating a process pool.
+    :param int chunksize: (default 1024) The largest number of instances of a gate
+      evaluated by one task.
+    :param disk_cache: (optional) A TableCache, or the directory of one, to load the
+      table from if it was built before, or to store it into otherwise.  Loaded tables
+      are memory-mapped read-only, and shared by all the processes loading them.
+    :rtype: SuperoperatorTable
+    """
+    cls = _portable_class(model)
+    circuit_instances = [
+        # Skipping, e.g., prepare_all and measure_all
+        [
+            instance
+            for instance in gate_instances(circuit)
+            if _is_modeled(cls, instance[0])
+        ]
+        for circuit in circuits
+    ]
+    # In a canonical order, so that the layout of the table only depends on the
+    # instances, and not on the order of the circuits.
+    instances = sorted(set().union(*circuit_instances))
+    index = {instance: i for i, instance in enumerate(instances)}
+    circuit_instances = [
+        sorted(index[instance] for instance in circuit) for circuit in circuit_instances
+    ]
+
+    groups = {}
+    for i, (name, args) in enumerate(instances):
+        groups.setdefault(name, []).append(i)
+
+    # Split the groups into chunks, each of which is written to consecutive rows of the
+    # table of its number of qubits.
+    tasks = []
+    locations = [None] * len(instances)
+    counts = {}
+    for name, indices in groups.items():
+        n_qubits = len(model.jaqal_gates[name].quantum_parameters)
+        for start in range(0, len(indices), chunksize):
+            chunk = indices[start : start + chunksize]
+            args = np.array([instances[i][1] for i in chunk], dtype=float)
+            args = list(args.reshape(len(chunk), -1).T)
+            row = counts.get(n_qubits, 0)
+            counts[n_qubits] = row + len(chunk)
+            for offset, i in enumerate(chunk):
+                locations[i] = (n_qubits, row + offset)
+            tasks.append((name, chunk, args, n_qubits, row))
+    shapes = {n: (count, 4**n, 4**n) for n, count in counts.items()}
+
+    state = {name: getattr(model, name) for name in model.noise_parameter_names}
+    state["stretched_gates"] = model.stretched_gates
+    precision = state["precision"] = getattr(model, "precision", None)
+    dtype = np.dtype(float if precision is None else precision)
+
+    if disk_cache is not None:
+        if not isinstance(disk_cache, TableCache):
+            disk_cache = TableCache(disk_cache)
+        key = disk_cache.key(cls, state, instances)
+        cached = disk_cache.load(key, instances)
+        if cached is not None:
+            tables, durations = cached
+            return SuperoperatorTable(
+                instances, tables, locations, durations, circuit_instances
+            )
+
+    tables, durations = _evaluate_tasks(
+        cls, state, tasks, shapes, dtype, len(instances), max_workers, executor
+    )
+    if disk_cache is not None:
+        disk_cache.store(key, instances, tables, durations)
+    return SuperoperatorTable(
+        instances, tables, locations, durations, circuit_instances
+    )
+
+
+def _evaluate_tasks(
+    cls, state, tasks, shapes, dtype, n_instances, max_workers, executor
+):
+    """Evaluates the chunks of a table, see build_superoperator_table.
+
+    :returns: The tables, keyed by number of qubits, and the durations.
+    """
+    durations = np.empty(n_instances)
+    if max_workers == 1 and executor is None:
+        local = _bare_model(cls, state)
+        tables = {n: np.empty(shape, dtype=dtype) for n, shape in shapes.items()}
+        for name, chunk, args, n_qubits, row in tasks:
+            G, durations[chunk] = _evaluate(local, name, args)
+            tables[n_qubits][row : row + len(chunk)] = G
+        return tables, durations
+
+    SharedMemory = _shared_memory()
+    memories = {
+        n: SharedMemory(create=True, size=dtype.itemsize * int(np.prod(shape)))
+        for n, shape in shapes.items()
+    }
+    try:
+        own_executor = executor is None
+        if own_executor:
+            from concurrent.futures import ProcessPoolExecutor
+
+            executor = ProcessPoolExecutor(max_workers)
+        try:
+            futures = [
+                executor.submit(
+                    _evaluate_into,
+                    cls,
+                    state,
+                    name,
+                    args,
+                    memories[n_qubits].name,
+                    shapes[n_qubits],
+                    dtype,
+                    row,
+                )
+                for name, chunk, args, n_qubits, row in tasks
+            ]
+            for task, future in zip(tasks, futures):
+                durations[task[1]] = future.result()
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+        tables = {
+            n: np.ndarray(shape, dtype=dtype, buffer=memories[n].buf).copy()
+            for n, shape in shapes.items()
+        }
+    finally:
+        for memory in memories.values():
+            memory.close()
+            memory.unlink()
+    return tables, durations
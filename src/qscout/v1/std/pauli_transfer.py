@@ -0,0 +1,383 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from functools import lru_cache
+
+import numpy as np
+
+from .jaqal_action import _stack
+
+# Closed-form Pauli transfer matrices (superoperators in the normalized Pauli basis,
+# as generated by pygsti.unitary_to_pauligate) of the QSCOUT native gates.  Two-qubit
+# Pauli operators are indexed 4 * i + j, where i labels the Pauli on the first qubit.
+#
+# Every builder accepts arrays of angles, which are broadcast against each other, and
+# returns a stack of matrices of shape (..., 4, 4) or (..., 16, 16).  Every builder also
+# accepts a precision: the real floating point type (e.g., numpy.float32) of the result,
+# by default double precision.
+
+
+def PTM_R(axis_angle, rotation_angle, *, precision=None):
+    """
+    Generates the Pauli transfer matrix of the QSCOUT native R gate, i.e., the rotation
+    by rotation_angle around the axis (cos(axis_angle), sin(axis_angle), 0).
+
+    :param float axis_angle: The angle that sets the planar axis to rotate around.
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The Pauli transfer matrix.
+    :rtype: numpy.array
+    """
+    a = np.cos(axis_angle)
+    b = np.sin(axis_angle)
+    c = np.cos(rotation_angle)
+    s = np.sin(rotation_angle)
+    v = 1 - c
+    G = _stack(4, a, c, precision=precision)
+    # Rodrigues' rotation formula, for an axis with no Z component
+    G[..., 0, 0] = 1
+    G[..., 1, 1] = c + a * a * v
+    G[..., 1, 2] = G[..., 2, 1] = a * b * v
+    G[..., 2, 2] = c + b * b * v
+    G[..., 1, 3] = b * s
+    G[..., 3, 1] = -b * s
+    G[..., 2, 3] = -a * s
+    G[..., 3, 2] = a * s
+    G[..., 3, 3] = c
+    return G
+
+
+def PTM_Rz(rotation_angle, *, precision=None):
+    """
+    Generates the Pauli transfer matrix of a rotation around the Z axis.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The Pauli transfer matrix.
+    :rtype: numpy.array
+    """
+    c = np.cos(rotation_angle)
+    s = np.sin(rotation_angle)
+    G = _stack(4, c, precision=precision)
+    G[..., 0, 0] = G[..., 3, 3] = 1
+    G[..., 1, 1] = G[..., 2, 2] = c
+    G[..., 1, 2] = -s
+    G[..., 2, 1] = s
+    return G
+
+
+# Products of single-qubit Pauli matrices:
+#   sigma_i sigma_j = _PHASE[i, j] sigma_k, where k = _PRODUCT[i, j]
+# fmt: off
+_PRODUCT = np.array([
+    [0, 1, 2, 3],
+    [1, 0, 3, 2],
+    [2, 3, 0, 1],
+    [3, 2, 1, 0],
+])
+_PHASE = np.array([
+    [1, 1,   1,   1  ],
+    [1, 1,   1j,  -1j],
+    [1, -1j, 1,   1j ],
+    [1, 1j,  -1j, 1  ],
+])
+# fmt: on
+
+
+@lru_cache(maxsize=None)
+def _pauli_rotation_terms(first, second, dtype=np.dtype(float)):
+    """
+    Decomposes the Pauli transfer matrix of exp(-i theta/2 G), for a two-qubit Pauli
+    operator G, as fixed + cos(theta) cosine + sin(theta) sine.
+
+    :param int first: The index of the Pauli matrix of G on the first qubit.
+    :param int second: The index of the Pauli matrix of G on the second qubit.
+    :param dtype: (default float) The dtype of the terms.
+    :returns: The (read-only) fixed, cosine, and sine terms.
+    """
+    fixed = np.zeros((16, 16), dtype=dtype)
+    cosine = np.zeros((16, 16), dtype=dtype)
+    sine = np.zeros((16, 16), dtype=dtype)
+    for i in range(4):
+        for j in range(4):
+            phase = _PHASE[first, i] * _PHASE[second, j]
+            if phase.imag == 0:
+                # P commutes with G, and is left invariant.
+                fixed[4 * i + j, 4 * i + j] = 1
+            else:
+                # P is mapped to cos(theta) P - i sin(theta) G P
+                cosine[4 * i + j, 4 * i + j] = 1
+                k = 4 * _PRODUCT[first, i] + _PRODUCT[second, j]
+                sine[k, 4 * i + j] = (-1j * phase).real
+
+    for term in (fixed, cosine, sine):
+        term.flags.writeable = False
+    return fixed, cosine, sine
+
+
+def _pauli_rotation(first, second, rotation_angle, *, precision=None):
+    """Generates the Pauli transfer matrix of exp(-i rotation_angle/2 G), where G is the
+    two-qubit Pauli operator given by the indices first and second."""
+    c = np.cos(np.asarray(rotation_angle))[..., None, None]
+    s = np.sin(np.asarray(rotation_angle))[..., None, None]
+    if precision is None:
+        fixed, cosine, sine = _pauli_rotation_terms(first, second)
+    else:
+        dtype = np.dtype(precision)
+        fixed, cosine, sine = _pauli_rotation_terms(first, second, dtype)
+        c = c.astype(dtype)
+        s = s.astype(dtype)
+    return fixed + c * cosine + s * sine
+
+
+def PTM_XX(rotation_angle, *, precision=None):
+    """
+    Generates the Pauli transfer matrix of an XX gate.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The Pauli transfer matrix.
+    :rtype: numpy.array
+    """
+    return _pauli_rotation(1, 1, rotation_angle, precision=precision)
+
+
+def PTM_YY(rotation_angle, *, precision=None):
+    """
+    Generates the Pauli transfer matrix of a YY gate.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The Pauli transfer matrix.
+    :rtype: numpy.array
+    """
+    return _pauli_rotation(2, 2, rotation_angle, precision=precision)
+
+
+def PTM_ZZ(rotation_angle, *, precision=None):
+    """
+    Generates the Pauli transfer matrix of the QSCOUT native ZZ gate.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The Pauli transfer matrix.
+    :rtype: numpy.array
+    """
+    return _pauli_rotation(3, 3, rotation_angle, precision=precision)
+
+
+def PTM_MS(axis_angle, rotation_angle, *, precision=None):
+    """
+    Generates the Pauli transfer matrix of the QSCOUT native Mølmer-Sørensen gate.  This
+    is an XX gate, conjugated by a Z rotation by axis_angle on both qubits.
+
+    :param float axis_angle: The phase angle determining the mix of XX and YY rotation.
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The Pauli transfer matrix.
+    :rtype: numpy.array
+    """
+    k = PTM_Rz(axis_angle, precision=precision)
+    K = np.einsum("...ij,...kl->...ikjl", k, k).reshape(k.shape[:-2] + (16, 16))
+    return K @ PTM_XX(rotation_angle, precision=precision) @ K.swapaxes(-1, -2)
+
+
+# Derivatives of the Pauli transfer matrices with respect to their classical parameters,
+# stacked along a leading axis in the order of the parameters.  As functions of the
+# rotation angle phi, the matrices are fixed + cos(phi) cosine + sin(phi) sine (see
+# rotation_terms), so that their derivative is G(phi + pi/2) - (G(phi) + G(phi + pi))/2.
+# The axis angles of R and MS conjugate the rotation by Z rotations, whose Pauli
+# transfer matrices are generated by _AXIS_GENERATORS, so that the derivatives with
+# respect to them are commutators.
+
+# The derivative of PTM_Rz at 0, and its sum over the two qubits of PTM_MS
+_AXIS_GENERATORS = {4: np.zeros((4, 4))}
+_AXIS_GENERATORS[4][2, 1] = 1
+_AXIS_GENERATORS[4][1, 2] = -1
+_AXIS_GENERATORS[16] = np.kron(_AXIS_GENERATORS[4], np.eye(4)) + np.kron(
+    np.eye(4), _AXIS_GENERATORS[4]
+)
+for _generator in _AXIS_GENERATORS.values():
+    _generator.flags.writeable = False
+del _generator
+
+
+def _rotation_derivative(builder, *args, precision=None):
+    """Returns the derivative of builder(*args) with respect to its last argument, the
+    rotation angle."""
+    *axis_angles, rotation_angle = args
+    P = [
+        builder(*axis_angles, np.add(rotation_angle, shift), precision=precision)
+        for shift in (0, np.pi / 2, np.pi)
+    ]
+    return P[1] - (P[0] + P[2]) / 2
+
+
+def _axis_derivative(G):
+    """Returns the commutator of the generator of Z rotations with G."""
+    K = _AXIS_GENERATORS[G.shape[-1]].astype(G.dtype)
+    return K @ G - G @ K
+
+
+def dPTM_R(axis_angle, rotation_angle, *, precision=None):
+    """
+    Generates the derivatives of the Pauli transfer matrix generated by PTM_R.
+
+    :param float axis_angle: The angle that sets the planar axis to rotate around.
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The derivatives with respect to axis_angle and rotation_angle, stacked in
+      an array of shape (2, ..., 4, 4).
+    :rtype: numpy.array
+    """
+    G = PTM_R(axis_angle, rotation_angle, precision=precision)
+    dG = _rotation_derivative(PTM_R, axis_angle, rotation_angle, precision=precision)
+    return np.stack([_axis_derivative(G), dG])
+
+
+def dPTM_Rz(rotation_angle, *, precision=None):
+    """
+    Generates the derivative of the Pauli transfer matrix generated by PTM_Rz.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The derivative, in an array of shape (1, ..., 4, 4).
+    :rtype: numpy.array
+    """
+    return _rotation_derivative(PTM_Rz, rotation_angle, precision=precision)[None]
+
+
+def dPTM_XX(rotation_angle, *, precision=None):
+    """
+    Generates the derivative of the Pauli transfer matrix generated by PTM_XX.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The derivative, in an array of shape (1, ..., 16, 16).
+    :rtype: numpy.array
+    """
+    return _rotation_derivative(PTM_XX, rotation_angle, precision=precision)[None]
+
+
+def dPTM_YY(rotation_angle, *, precision=None):
+    """
+    Generates the derivative of the Pauli transfer matrix generated by PTM_YY.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The derivative, in an array of shape (1, ..., 16, 16).
+    :rtype: numpy.array
+    """
+    return _rotation_derivative(PTM_YY, rotation_angle, precision=precision)[None]
+
+
+def dPTM_ZZ(rotation_angle, *, precision=None):
+    """
+    Generates the derivative of the Pauli transfer matrix generated by PTM_ZZ.
+
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The derivative, in an array of shape (1, ..., 16, 16).
+    :rtype: numpy.array
+    """
+    return _rotation_derivative(PTM_ZZ, rotation_angle, precision=precision)[None]
+
+
+def dPTM_MS(axis_angle, rotation_angle, *, precision=None):
+    """
+    Generates the derivatives of the Pauli transfer matrix generated by PTM_MS.
+
+    :param float axis_angle: The phase angle determining the mix of XX and YY rotation.
+    :param float rotation_angle: The angle by which the gate rotates the state.
+    :returns: The derivatives with respect to axis_angle and rotation_angle, stacked in
+      an array of shape (2, ..., 16, 16).
+    :rtype: numpy.array
+    """
+    G = PTM_MS(axis_angle, rotation_angle, precision=precision)
+    dG = _rotation_derivative(PTM_MS, axis_angle, rotation_angle, precision=precision)
+    return np.stack([_axis_derivative(G), dG])
+
+
+def depolarizing_weights(depolarization_term, n_qubits, *, precision=None):
+    """
+    Generates the diagonal of the Pauli transfer matrix of independent depolarization of
+    every qubit, i.e., of the tensor product of diag([1, d, d, d]).
+
+    :param float depolarization_term: The factor d by which each Pauli component of a
+      qubit is contracted.
+    :param int n_qubits: The number of qubits.
+    :param precision: (optional) The real floating point type of the result.
+    :returns: The diagonal, of shape (..., 4**n_qubits).
+    :rtype: numpy.array
+    """
+    dtype = float if precision is None else precision
+    d = np.asarray(depolarization_term, dtype=dtype)[..., None]
+    single = np.concatenate([np.ones_like(d), d, d, d], axis=-1)
+    weights = single
+    for _ in range(n_qubits - 1):
+        weights = (weights[..., :, None] * single[..., None, :]).reshape(
+            d.shape[:-1] + (-1,)
+        )
+    return weights
+
+
+def depolarizing_channel(depolarization_term, n_qubits, *, precision=None):
+    """
+    Generates the Pauli transfer matrix of independent depolarization of every qubit,
+    i.e., the diagonal matrix of depolarizing_weights.
+
+    :param float depolarization_term: The factor d by which each Pauli component of a
+      qubit is contracted.  It may be an array, to generate a stack of matrices.
+    :param int n_qubits: The number of qubits.
+    :param precision: (optional) The real floating point type of the result.
+    :returns: The Pauli transfer matrices, of shape (..., 4**n_qubits, 4**n_qubits).
+    :rtype: numpy.array
+    """
+    weights = depolarizing_weights(depolarization_term, n_qubits, precision=precision)
+    return weights[..., :, None] * np.eye(4**n_qubits, dtype=weights.dtype)
+
+
+def depolarized(ptm, depolarization_term):
+    """
+    Precedes a gate by independent depolarization of each qubit it acts on.  This is
+    ptm @ diag(depolarizing_weights(...)), computed as a scaling of the columns of ptm.
+
+    :param ptm: The Pauli transfer matrix of the gate, of shape (..., 4**n, 4**n).
+    :param float depolarization_term: The factor by which each Pauli component of a
+      qubit is contracted.
+    :returns: The Pauli transfer matrix of the depolarized gate, of the same precision
+      as ptm.
+    :rtype: numpy.array
+    """
+    n_qubits = {4: 1, 16: 2}[ptm.shape[-1]]
+    weights = depolarizing_weights(depolarization_term, n_qubits, precision=ptm.dtype)
+    return ptm * weights[..., None, :]
+
+
+@lru_cache(maxsize=1024)
+def rotation_terms(builder, *axis_angles, precision=None):
+    """
+    Decomposes the Pauli transfer matrices of rotations about a fixed axis, as functions
+    of the rotation angle phi, as terms[0] + cos(phi) terms[1] + sin(phi) terms[2].
+
+    :param builder: The function generating the Pauli transfer matrices, e.g., PTM_R,
+      taking the axis angles (if any) followed by the rotation angle.
+    :param axis_angles: The angles fixing the axis, e.g., the axis_angle of PTM_R.
+    :param precision: (optional) The real floating point type of the terms.
+    :returns: The (read-only) terms, stacked in an array of shape (3, 4**n, 4**n).
+    :rtype: numpy.array
+    """
+    P = builder(*axis_angles, np.array([0, np.pi / 2, np.pi]))
+    fixed = (P[0] + P[2]) / 2
+    terms = np.stack([fixed, (P[0] - P[2]) / 2, P[1] - fixed])
+    if precision is not None:
+        terms = terms.astype(precision)
+    terms.flags.writeable = False
+    return terms
+
+
+@lru_cache(maxsize=None)
+def depolarizing_masks(n_qubits):
+    """
+    Decomposes the diagonal generated by depolarizing_weights as a polynomial in the
+    depolarization term d, i.e., as the sum of d**b masks[b].
+
+    :param int n_qubits: The number of qubits.
+    :returns: The (read-only) masks of the Pauli operators acting nontrivially on b
+      qubits, stacked in an array of shape (n_qubits + 1, 4**n_qubits).
+    :rtype: numpy.array
+    """
+    index = np.arange(4**n_qubits)
+    weight = sum(((index >> (2 * k)) & 3) != 0 for k in range(n_qubits))
+    masks = (weight == np.arange(n_qubits + 1)[:, None]).astype(float)
+    masks.flags.writeable = False
+    return masks
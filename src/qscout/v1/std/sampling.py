@@ -0,0 +1,240 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+import numpy as np
+
+
+def outcome_dtype(n_outcomes):
+    """Returns the smallest unsigned integer type that can index n_outcomes outcomes.
+
+    :param int n_outcomes: The number of outcomes, e.g., 2**n_qubits.
+    :rtype: numpy.dtype
+    """
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n_outcomes - 1 <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+def subcircuit_probabilities(result):
+    """Returns the outcome probabilities of every subcircuit of an emulated circuit.
+
+    :param result: The ExecutionResult of an emulator, e.g., returned by
+      jaqalpaq.run.run_jaqal_circuit.
+    :returns: An array of shape (subcircuits, 2**n_qubits), indexed with qubit 0 as the
+      least significant bit (as jaqalpaq's probability_by_int).
+    :rtype: numpy.array
+    """
+    return np.array(
+        [subcircuit.probability_by_int for subcircuit in result.subcircuits]
+    )
+
+
+def _normalized(probabilities):
+    """Returns probabilities as a 2-d array of rows summing to 1."""
+    P = np.array(probabilities, dtype=float, ndmin=2)
+    if P.ndim != 2:
+        raise ValueError("Probabilities must be a vector or a matrix")
+    if np.any(P < 0) or not np.all(np.isfinite(P)):
+        raise ValueError("Probabilities must be finite and nonnegative")
+    total = P.sum(axis=1, keepdims=True)
+    if np.any(total <= 0):
+        raise ValueError("Probabilities must not all be zero")
+    return P / total
+
+
+class AliasTable:
+    """Alias tables (Walker's method) of the outcomes of many circuits, sampling every
+    shot in constant time, independently of the number of outcomes.
+
+    Outcome k of a row is drawn by picking a column c uniformly, and keeping it with
+    probability threshold[c], or taking alias[c] otherwise.
+    """
+
+    def __init__(self, probabilities):
+        """Builds the alias tables.
+
+        :param probabilities: The probabilities of the outcomes of one circuit, or an
+          array of shape (circuits, outcomes).  Rows are normalized.
+        """
+        P = _normalized(probabilities)
+        self.squeeze = np.ndim(probabilities) == 1
+        rows, n = P.shape
+        self.threshold = np.ones((rows, n))
+        self.alias = np.empty((rows, n), dtype=np.intp)
+        self.alias[:] = np.arange(n)
+        for row in range(rows):
+            self._build(P[row] * n, self.threshold[row], self.alias[row])
+
+    @staticmethod
+    def _build(mass, threshold, alias):
+        """Fills one table from the outcome masses (averaging 1).
+
+        Every round, the deficits of all light columns (mass < 1) are filled at once from
+        the heavy ones, each light column taking from the heavy column whose excess spans
+        the start of its deficit.  Overfilling a heavy column leaves it light (but never
+        negative), to be filled in a later round.
+        """
+        light = np.flatnonzero(mass < 1)
+        heavy = np.flatnonzero(mass >= 1)
+        while len(light) and len(heavy):
+            deficit = 1 - mass[light]
+            start = np.cumsum(deficit) - deficit
+            excess = np.cumsum(mass[heavy] - 1)
+            donor = np.searchsorted(excess, start, side="right")
+            donor = heavy[np.minimum(donor, len(heavy) - 1)]
+            threshold[light] = mass[light]
+            alias[light] = donor
+            np.subtract.at(mass, donor, deficit)
+            drained = mass[heavy] < 1
+            light = heavy[drained]
+            heavy = heavy[~drained]
+        # Any remaining column is full, up to rounding errors.
+
+    @property
+    def n_outcomes(self):
+        return self.threshold.shape[1]
+
+    def sample(self, shots, rng):
+        """Draws shots outcomes of every circuit.
+
+        :param int shots: The number of shots per circuit.
+        :param numpy.random.Generator rng: The random number generator.
+        :returns: The outcomes, of shape (circuits, shots), or (shots,) if the table was
+          built from a vector.
+        """
+        rows, n = self.threshold.shape
+        draws = rng.random((rows, shots)) * n
+        column = np.minimum(draws.astype(np.intp), n - 1)
+        fraction = draws - column
+        index = np.arange(rows)[:, None]
+        keep = fraction < self.threshold[index, column]
+        outcomes = np.where(keep, column, self.alias[index, column])
+        outcomes = outcomes.astype(outcome_dtype(n))
+        return outcomes[0] if self.squeeze else outcomes
+
+
+class CDFTable:
+    """Cumulative distributions of the outcomes of many circuits, sampling every shot by
+    bisection.  Cheaper to build than an AliasTable, so preferable when drawing few shots
+    per circuit."""
+
+    def __init__(self, probabilities):
+        """Builds the cumulative distributions.
+
+        :param probabilities: The probabilities of the outcomes of one circuit, or an
+          array of shape (circuits, outcomes).  Rows are normalized.
+        """
+        P = _normalized(probabilities)
+        self.squeeze = np.ndim(probabilities) == 1
+        rows, n = P.shape
+        cdf = np.cumsum(P, axis=1)
+        cdf /= cdf[:, -1:]
+        # Offset every row by its index, to search all rows at once.
+        self.cdf = (cdf + np.arange(rows)[:, None]).ravel()
+        self.shape = rows, n
+
+    @property
+    def n_outcomes(self):
+        return self.shape[1]
+
+    def sample(self, shots, rng):
+        """Draws shots outcomes of every circuit.
+
+        :param int shots: The number of shots per circuit.
+        :param numpy.random.Generator rng: The random number generator.
+        :returns: The outcomes, of shape (circuits, shots), or (shots,) if the table was
+          built from a vector.
+        """
+        rows, n = self.shape
+        offsets = np.arange(rows)[:, None]
+        draws = rng.random((rows, shots)) + offsets
+        outcomes = np.searchsorted(self.cdf, draws.ravel(), side="right")
+        outcomes = outcomes.reshape(rows, shots) - offsets * n
+        outcomes = np.clip(outcomes, 0, n - 1).astype(outcome_dtype(n))
+        return outcomes[0] if self.squeeze else outcomes
+
+
+_METHODS = {"alias": AliasTable, "cdf": CDFTable}
+
+
+def _table(probabilities, method):
+    try:
+        return _METHODS[method](probabilities)
+    except KeyError:
+        raise ValueError(f"Unknown sampling method {method}") from None
+
+
+def iter_shots(probabilities, shots, chunk_size, *, seed=None, method="alias"):
+    """Generates the outcomes of shots of many circuits, in chunks, so that the memory
+    used does not depend on the number of shots.
+
+    For a given seed and chunk_size, the outcomes are reproducible.
+
+    :param probabilities: The probabilities of the outcomes of one circuit, or an array
+      of shape (circuits, outcomes), e.g., from subcircuit_probabilities.
+    :param int shots: The number of shots per circuit.
+    :param int chunk_size: The maximum number of shots per circuit in every chunk.
+    :param seed: (optional) The seed of the random number generator (or a
+      numpy.random.Generator).
+    :param str method: (default "alias") "alias" to sample with an AliasTable, or "cdf"
+      with a CDFTable.
+    :returns: A generator of outcome arrays, of shape (circuits, chunk), or (chunk,) if
+      probabilities is a vector, of the smallest unsigned integer type holding them.
+      Outcomes are indexed with qubit 0 as the least significant bit.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    rng = np.random.default_rng(seed)
+    table = _table(probabilities, method)
+    for start in range(0, shots, chunk_size):
+        yield table.sample(min(chunk_size, shots - start), rng)
+
+
+def sample_shots(probabilities, shots, *, seed=None, method="alias"):
+    """Returns the outcomes of shots of many circuits.
+
+    :param probabilities: The probabilities of the outcomes of one circuit, or an array
+      of shape (circuits, outcomes), e.g., from subcircuit_probabilities.
+    :param int shots: The number of shots per circuit.
+    :param seed: (optional) The seed of the random number generator (or a
+      numpy.random.Generator).
+    :param str method: (default "alias") "alias" to sample with an AliasTable, or "cdf"
+      with a CDFTable.
+    :returns: The outcomes, of shape (circuits, shots), or (shots,) if probabilities is a
+      vector, of the smallest unsigned integer type holding them.  Outcomes are indexed
+      with qubit 0 as the least significant bit.
+    :rtype: numpy.array
+    """
+    return _table(probabilities, method).sample(shots, np.random.default_rng(seed))
+
+
+def sample_counts(probabilities, shots, *, seed=None):
+    """Returns the number of shots measuring each outcome of many circuits, drawn from
+    multinomial distributions, without generating the individual shots.
+
+    :param probabilities: The probabilities of the outcomes of one circuit, or an array
+      of shape (circuits, outcomes).
+    :param int shots: The number of shots per circuit.
+    :param seed: (optional) The seed of the random number generator (or a
+      numpy.random.Generator).
+    :returns: The counts, of the same shape as probabilities.
+    :rtype: numpy.array
+    """
+    P = _normalized(probabilities)
+    counts = np.random.default_rng(seed).multinomial(shots, P)
+    return counts[0] if np.ndim(probabilities) == 1 else counts
+
+
+def to_bits(outcomes, n_qubits):
+    """Unpacks outcomes into the measurements of the individual qubits.
+
+    :param outcomes: The integer outcomes, e.g., from sample_shots.
+    :param int n_qubits: The number of qubits measured.
+    :returns: An array of 0 and 1, of the shape of outcomes with an extra last axis of
+      length n_qubits, indexed by qubit.
+    :rtype: numpy.array
+    """
+    outcomes = np.asarray(outcomes)
+    shifts = np.arange(n_qubits, dtype=outcomes.dtype)
+    return ((outcomes[..., None] >> shifts) & 1).astype(np.uint8)
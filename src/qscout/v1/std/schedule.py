@@ -0,0 +1,227 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from jaqalpaq.core import Macro
+from jaqalpaq.core.algorithm import expand_macros
+from jaqalpaq.core.algorithm.visitor import Visitor
+
+from .noisy import SNLToy1Model
+
+
+Schedule = namedtuple(
+    "Schedule", ["layer_durations", "total_duration", "busy_times", "idle_times"]
+)
+Schedule.__doc__ = """The timing of a circuit.
+
+:ivar layer_durations: The duration of every top-level statement of the circuit (a
+  loop counting all of its iterations), as an array.
+:ivar float total_duration: The duration of the whole circuit.
+:ivar busy_times: For every qubit, the total duration of the gates acting on it (not
+  counting idle gates), as an array.
+:ivar idle_times: For every qubit, the time it spends idling, as an array.
+"""
+
+
+class _TimingVisitor(Visitor):
+    """Flattens a circuit (with expanded macros) into its gates, and a tree of the
+    blocks they are arranged in.
+
+    Nodes of the tree are ("gate", i), ("sequential", children), ("parallel", children),
+    or ("loop", iterations, child), where i indexes the gates.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.names = []
+        self.qubits = []
+        self.args = []
+        self.multiplicities = []
+        self._multiplicity = 1
+
+    def visit_default(self, obj):
+        return None
+
+    def visit_Circuit(self, obj):
+        return self.visit(obj.body)
+
+    def visit_BlockStatement(self, obj):
+        children = [self.visit(statement) for statement in obj.statements]
+        children = [child for child in children if child is not None]
+        return ("parallel" if obj.parallel else "sequential", children)
+
+    def visit_LoopStatement(self, obj):
+        iterations = int(obj.iterations)
+        outer = self._multiplicity
+        self._multiplicity = outer * iterations
+        try:
+            child = self.visit(obj.statements)
+        finally:
+            self._multiplicity = outer
+        return ("loop", iterations, child)
+
+    def visit_GateStatement(self, obj):
+        if isinstance(obj.gate_def, Macro):
+            raise ValueError(f"Unexpanded macro {obj.name}")
+        if obj.name in ("prepare_all", "measure_all"):
+            return None
+        qubits = []
+        args = []
+        for value, param in obj.parameters_with_types:
+            if param.classical:
+                # Constants (from let statements) are resolved by float.
+                args.append(float(value))
+            else:
+                qubits.append(value.alias_index)
+        self.names.append(obj.name)
+        self.qubits.append(qubits)
+        self.args.append(args)
+        self.multiplicities.append(self._multiplicity)
+        return ("gate", len(self.names) - 1)
+
+
+class Scheduler:
+    """Computes (and caches) the timing of circuits of the QSCOUT native gates.
+
+    The durations of the gates are taken from the gateduration_* methods of a noise
+    model, evaluated once per gate name on arrays of the arguments of every occurrence
+    of the gate.  Statements of a sequential block follow each other, the branches of a
+    parallel block run simultaneously (the block lasting as long as its longest branch),
+    and loops repeat their body.  This is the timing used by the pyGSTi-backed
+    emulators to insert idles.  Idle gates (I_*) last as long as their parent gates.
+    """
+
+    def __init__(self, model=None, maxsize=4096):
+        """Builds a scheduler.
+
+        :param model: (default SNLToy1Model()) The model providing the gateduration_*
+          methods.  If its stretched_gates is a number, that stretch factor is applied
+          to all (unstretched) gates.
+        :param int maxsize: (default 4096) The number of schedules to cache.  When the
+          cache is full, the least recently used schedule is evicted.
+        """
+        self.model = SNLToy1Model() if model is None else model
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+
+    def schedule(self, circuit):
+        """Returns the timing of a circuit, which is cached.
+
+        :param Circuit circuit: The parsed Jaqal circuit.  It must not be modified while
+          its schedule is cached.
+        :rtype: Schedule
+        """
+        key = id(circuit)
+        try:
+            cached_circuit, schedule = self._cache[key]
+        except KeyError:
+            pass
+        else:
+            if cached_circuit is circuit:
+                self._cache.move_to_end(key)
+                return schedule
+
+        schedule = self._build(circuit)
+        # Keep a reference to the circuit, so that its id is not reused.
+        self._cache[key] = (circuit, schedule)
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return schedule
+
+    def total_durations(self, circuits):
+        """Returns the durations of many circuits.
+
+        :param circuits: An iterable of parsed Jaqal circuits.
+        :rtype: numpy.array
+        """
+        return np.array([self.schedule(circuit).total_duration for circuit in circuits])
+
+    def cache_clear(self):
+        """Empties the cache of schedules."""
+        self._cache.clear()
+
+    def gate_durations(self, names, args):
+        """Evaluates the durations of a list of gates, one call per distinct gate.
+
+        :param names: The name of every gate.
+        :param args: The classical arguments of every gate.
+        :returns: The durations of the gates.  Gates not modeled (e.g., prepare_all) take
+          no time.
+        :rtype: numpy.array
+        """
+        durations = np.zeros(len(names))
+        groups = {}
+        for i, name in enumerate(names):
+            groups.setdefault(name, []).append(i)
+
+        stretched_gates = self.model.stretched_gates
+        if stretched_gates in (None, "add"):
+            kwargs = {}
+        else:
+            kwargs = dict(stretch=stretched_gates)
+
+        for name, indices in groups.items():
+            base = name
+            if base.startswith("I_"):
+                base = base[2:]
+            stretched = base.endswith("_stretched")
+            if stretched:
+                # The stretch factor is passed as the last argument.
+                base = base[: -len("_stretched")]
+            fun = getattr(self.model, f"gateduration_{base}", None)
+            if fun is None:
+                continue
+            n_qubits = len(self.model.jaqal_gates[name].quantum_parameters)
+            columns = np.array([args[i] for i in indices], dtype=float)
+            columns = columns.reshape(len(indices), -1).T
+            durations[indices] = fun(
+                *[None] * n_qubits, *columns, **({} if stretched else kwargs)
+            )
+        return durations
+
+    def _build(self, circuit):
+        registers = circuit.fundamental_registers()
+        if len(registers) > 1:
+            raise NotImplementedError("Multiple fundamental registers unsupported.")
+        n_qubits = sum(register.size for register in registers)
+
+        visitor = _TimingVisitor()
+        tree = visitor.visit(expand_macros(circuit))
+        durations = self.gate_durations(visitor.names, visitor.args)
+
+        def duration(node):
+            kind = node[0]
+            if kind == "gate":
+                return durations[node[1]]
+            if kind == "loop":
+                return node[1] * duration(node[2])
+            children = [duration(child) for child in node[1]]
+            if not children:
+                return 0.0
+            return max(children) if kind == "parallel" else sum(children)
+
+        if tree[0] == "sequential":
+            layer_durations = np.array([duration(node) for node in tree[1]])
+        else:
+            layer_durations = np.array([duration(tree)])
+        total_duration = float(layer_durations.sum())
+
+        # Every gate occupies each of its qubits, for all iterations of its loops.
+        active = [not name.startswith("I_") for name in visitor.names]
+        times = np.array(visitor.multiplicities) * durations * active
+        widths = [len(qubits) for qubits in visitor.qubits]
+        qubits = np.fromiter(
+            (q for gate_qubits in visitor.qubits for q in gate_qubits),
+            dtype=int,
+            count=sum(widths),
+        )
+        busy_times = np.bincount(
+            qubits, weights=np.repeat(times, widths), minlength=n_qubits
+        )
+
+        return Schedule(
+            layer_durations, total_duration, busy_times, total_duration - busy_times
+        )
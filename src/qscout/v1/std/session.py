@@ -0,0 +1,247 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+import numpy as np
+
+from jaqalpaq.core.algorithm import expand_macros, fill_in_let
+from jaqalpaq.core.block import BlockStatement, LoopStatement
+from jaqalpaq.core.constant import Constant
+from jaqalpaq.core.gate import GateStatement
+from jaqalpaq.core.register import NamedQubit
+
+from .gradients import observable
+from .streaming import (
+    _Stream,
+    _layer,
+    _leaves,
+    _visitor,
+    apply_superoperator,
+    initial_state,
+)
+
+
+def _constants(statement, names):
+    """Returns the names of the let constants a statement depends on, among names."""
+    if isinstance(statement, GateStatement):
+        used = set()
+        for value in statement.parameters_by_name.values():
+            if isinstance(value, NamedQubit):
+                value = value.alias_index
+            if isinstance(value, Constant):
+                used.add(value.name)
+        return used
+    if isinstance(statement, BlockStatement):
+        used = set()
+        for child in statement.statements:
+            used |= _constants(child, names)
+        return used
+    if isinstance(statement, LoopStatement):
+        used = _constants(statement.statements, names)
+        if isinstance(statement.iterations, Constant):
+            used.add(statement.iterations.name)
+        return used
+    # Anything else might depend on any of them.
+    return set(names)
+
+
+class EmulationSession:
+    """Evaluates a circuit under a noise model again and again, as its let constants and
+    the noise parameters change, recomputing only what they invalidate.
+
+    The layers of the circuit are laid out as by stream: one per top-level statement,
+    with the idles inserted by the pyGSTi emulator.  The session keeps
+
+    - the pyGSTi labels of every layer, and the let constants it depends on;
+    - the superoperator of every distinct gate and idle, and the noise parameters it
+      depends on (see SpecifiedModel.noise_dependencies; all of them for other models);
+    - the prefix products: the state after each layer;
+    - the suffix products: the measurement after each layer, as the observables of the
+      outcomes evolved backward through the layers following it.
+
+    Updating a let constant revisits only the statements using it, and invalidates the
+    layers whose labels changed.  Updating a noise parameter invalidates the
+    superoperators depending on it, and the layers applying them.  The probabilities
+    are then the overlap of the prefix and suffix products on either side of the
+    invalidated layers, once the state is evolved through those, so that changing the
+    same few angles over and over costs the evaluation of their layers only.  The first
+    time a layer is invalidated, the suffix products are extended back to it, which
+    costs about 2**n_qubits evaluations of the layers after it.
+
+    As with stream, the whole circuit is evaluated as one subcircuit: prepare_all and
+    measure_all are ignored, and the evaluation starts from the all-zero state.  Gate
+    durations must not depend on the noise parameters (as is the case of SNLToy1).  The
+    memory used grows as the number of layers times 8**n_qubits.
+    """
+
+    def __init__(self, model, circuit, n_qubits=None):
+        """Lays out a circuit, without evaluating it yet.
+
+        :param model: The noise model, e.g., an SNLToy1 or SNLToy1Model instance.  The
+          session updates its noise parameters, and relies on no one else doing so.
+        :param Circuit circuit: The parsed Jaqal circuit.
+        :param int n_qubits: (optional) The number of qubits.  By default, the model's
+          n_qubits if it has one, and otherwise, the size of the circuit's register.
+        """
+        self._circuit = expand_macros(circuit)
+        filled = fill_in_let(self._circuit)
+        if n_qubits is None:
+            n_qubits = getattr(model, "n_qubits", None)
+        if n_qubits is None:
+            n_qubits = sum(register.size for register in filled.fundamental_registers())
+        self.model = model
+        self.n_qubits = n_qubits
+        self._gates = _Stream(model, None)
+
+        self._lets = {
+            name: constant.value for name, constant in circuit.constants.items()
+        }
+        statements = self._circuit.body.statements
+        self._uses = [_constants(s, self._lets) for s in statements]
+
+        L = len(statements)
+        self._prefix = [initial_state(n_qubits)] + [None] * L
+        projectors = [
+            observable(weights, n_qubits) for weights in np.eye(2**n_qubits)
+        ]
+        self._suffix = [None] * L + [np.stack(projectors, axis=-1)]
+        # prefix[k] is valid for k <= self._valid_prefix, suffix[k] for k >=
+        # self._valid_suffix, and layers below self._invalid_end may have changed since
+        # the last evaluation.
+        self._valid_prefix = 0
+        self._valid_suffix = L
+        self._invalid_end = L
+        self._probabilities = None
+
+        # The superoperators, and the layers applying them, keyed by label
+        self._operators = {}
+        self._users = {}
+        self._layers = [()] * L
+        self._visitor = _visitor(model, filled, n_qubits)
+        for k, statement in enumerate(filled.body.statements):
+            self._set_layer(k, statement)
+
+    @property
+    def lets(self):
+        """The current values of the let constants, keyed by name."""
+        return dict(self._lets)
+
+    def update(self, lets=None, noise=None):
+        """Changes let constants or noise parameters.  Nothing is evaluated until the
+        probabilities are requested.
+
+        :param dict lets: (optional) The new values of let constants, keyed by name.
+        :param dict noise: (optional) The new values of noise parameters of the model
+          (see noise_parameter_names), keyed by name.
+        """
+        lets = dict(lets or {})
+        noise = dict(noise or {})
+        for name in lets:
+            if name not in self._lets:
+                raise ValueError(f"Unknown let constant {name}")
+        names = getattr(self.model, "noise_parameter_names", ())
+        for name in noise:
+            if name not in names:
+                raise ValueError(f"Unknown noise parameter {name}")
+
+        changed = {k for k, v in noise.items() if getattr(self.model, k) != v}
+        for name in changed:
+            setattr(self.model, name, noise[name])
+        if changed:
+            for label in list(self._operators):
+                if self._dependencies(label) & changed:
+                    del self._operators[label]
+                    for k in self._users[label]:
+                        self._invalidate(k)
+
+        changed = {k for k, v in lets.items() if self._lets[k] != v}
+        if changed:
+            self._lets.update(lets)
+            filled = fill_in_let(self._circuit, self._lets).body.statements
+            for k, uses in enumerate(self._uses):
+                if uses & changed:
+                    self._set_layer(k, filled[k])
+
+    def probabilities(self):
+        """Returns the probabilities of measuring each computational basis state,
+        indexed with qubit 0 as the least significant bit (as jaqalpaq's
+        probability_by_int).
+
+        :rtype: numpy.array
+        """
+        if self._probabilities is None:
+            # Extend the suffix products back to the invalidated layers, and the prefix
+            # products forward through them.
+            while self._valid_suffix > max(self._invalid_end, self._valid_prefix):
+                k = self._valid_suffix - 1
+                self._suffix[k] = self._apply(k, self._suffix[k + 1], backward=True)
+                self._valid_suffix = k
+            while self._valid_prefix < self._valid_suffix:
+                k = self._valid_prefix
+                self._prefix[k + 1] = self._apply(k, self._prefix[k])
+                self._valid_prefix = k + 1
+            k = self._valid_suffix
+            self._probabilities = np.tensordot(
+                self._prefix[k], self._suffix[k], axes=self.n_qubits
+            )
+            self._invalid_end = 0
+        return self._probabilities.copy()
+
+    def state(self):
+        """Returns the final state, in the normalized Pauli basis, as an array of shape
+        (4,) * n_qubits, the first axis being qubit 0.  It is never modified in place.
+
+        :rtype: numpy.array
+        """
+        while self._valid_prefix < len(self._layers):
+            k = self._valid_prefix
+            self._prefix[k + 1] = self._apply(k, self._prefix[k])
+            self._valid_prefix = k + 1
+        return self._prefix[-1]
+
+    def _set_layer(self, k, statement):
+        """Lays out a (filled in) statement as layer k, invalidating it if it changed."""
+        layer = _layer(self._visitor, statement)
+        leaves = (
+            () if layer is None else tuple(leaf for x in layer for leaf in _leaves(x))
+        )
+        if leaves == self._layers[k]:
+            return
+        for label in set(self._layers[k]):
+            users = self._users[label]
+            users.discard(k)
+            if not users:
+                del self._users[label]
+                self._operators.pop(label, None)
+        for label in set(leaves):
+            self._users.setdefault(label, set()).add(k)
+        self._layers[k] = leaves
+        self._invalidate(k)
+
+    def _invalidate(self, k):
+        self._valid_prefix = min(self._valid_prefix, k)
+        self._valid_suffix = max(self._valid_suffix, k + 1)
+        self._invalid_end = max(self._invalid_end, k + 1)
+        self._probabilities = None
+
+    def _dependencies(self, label):
+        """Returns the names of the noise parameters the superoperator of a label depends
+        on."""
+        dependencies = getattr(self.model, "noise_dependencies", None)
+        if dependencies is None:
+            return frozenset(self.model.noise_parameter_names)
+        name = "idle" if label.name == "Gidle" else label.name[len("GJ") :]
+        return dependencies(name)
+
+    def _apply(self, k, state, backward=False):
+        """Applies layer k to a state, or its transpose to observables (whose last axis
+        indexes them)."""
+        leaves = reversed(self._layers[k]) if backward else self._layers[k]
+        for label in leaves:
+            G = self._operators.get(label)
+            if G is None:
+                G = np.asarray(self._gates.superoperator(label))
+                self._operators[label] = G
+            state = apply_superoperator(
+                G.T if backward else G, state, list(label.sslbls)
+            )
+        return state
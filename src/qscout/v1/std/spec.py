@@ -0,0 +1,570 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from collections import namedtuple
+
+import numpy as np
+
+from jaqalpaq.emulator.backend import ExtensibleBackend
+
+from .opcodes import GATE_NAMES, GATES, N_ARGS, N_QUBITS, OPCODES, _is_modeled, _tables
+from .pauli_transfer import PTM_R, PTM_Rz, PTM_MS, PTM_XX, PTM_YY, PTM_ZZ
+from .pauli_transfer import depolarizing_channel, depolarizing_weights
+
+# The rotations a gate may perform: the function generating their Pauli transfer
+# matrices, whether it takes an axis angle before the rotation angle, and the number of
+# qubits rotated.
+ROTATIONS = dict(
+    R=(PTM_R, True, 1),
+    Rz=(PTM_Rz, False, 1),
+    XX=(PTM_XX, False, 2),
+    YY=(PTM_YY, False, 2),
+    ZZ=(PTM_ZZ, False, 2),
+    MS=(PTM_MS, True, 2),
+)
+_FAMILIES = tuple(ROTATIONS)
+# The family of the idle gates (e.g., I_Sx), and of gates without a law
+_IDLE = len(_FAMILIES)
+_UNMODELED = -1
+
+GateLaw = namedtuple(
+    "GateLaw",
+    [
+        "rotation",
+        "params",
+        "duration",
+        "duration_offset",
+        "noise_factor",
+        "axis_error",
+        "rotation_error",
+        "depolarization",
+    ],
+    defaults=(None, 1.0, 0.0, 1.0, "phase_error", "rotation_error", "depolarization"),
+)
+GateLaw.__doc__ = """The declaration of how a gate is modeled by a NoiseSpec.
+
+The gate is a rotation by the angle phi about an axis, preceded by the depolarization of
+each of its qubits.  Its duration is
+
+    T = stretch * (duration_offset + duration * abs(phi) / (pi / 2)),
+
+and, with the noise factor f, the rotation angle is offset by rotation_error * f * T,
+the axis angle (if any) by axis_error, and the X, Y, and Z components of every qubit are
+contracted by (1 - depolarization) ** (f * T), where rotation_error, axis_error, and
+depolarization are parameters of the noise model.
+
+:ivar str rotation: The rotation performed, a key of ROTATIONS, e.g., "R".
+:ivar tuple params: (default None) The angles of the rotation (the axis angle, if any,
+  then the rotation angle), None marking those passed as the classical arguments of the
+  gate, in order, as with ExtensibleBackend._curry.  By default, all are passed.
+:ivar float duration: (default 1) The duration of a pi/2 rotation.
+:ivar float duration_offset: (default 0) The duration of a rotation by 0.
+:ivar float noise_factor: (default 1) The factor f by which the errors are increased.
+:ivar str axis_error: (default "phase_error") The name of the noise parameter offsetting
+  the axis angle, or None.
+:ivar str rotation_error: (default "rotation_error") The name of the noise parameter
+  setting the over-rotation per unit duration, or None.
+:ivar str depolarization: (default "depolarization") The name of the noise parameter
+  setting the depolarization per unit duration, or None.
+"""
+
+
+class NoiseSpec:
+    """A declarative noise model of the QSCOUT native gates: the law of every gate, and
+    the parameters they depend on.
+
+    The idle gates (e.g., I_Sx) and stretched gates (e.g., Sx_stretched) follow from the
+    law of their gate.  Idling depolarizes every qubit by (1 - p) ** T, for a duration T
+    and the noise parameter p named by idle.
+
+    The spec is compiled once (see compile) into tables indexed by the opcodes of the
+    compact circuits, so that any number of gates, of any kinds, are evaluated by a few
+    vectorized calls.  Models declare a spec by deriving from SpecifiedModel.
+    """
+
+    def __init__(self, gates, parameters, idle="depolarization"):
+        """Declares a noise model.
+
+        :param dict gates: The GateLaw of every gate modeled, keyed by gate name.
+        :param dict parameters: The default values of the parameters of the model, keyed
+          by name.
+        :param str idle: (default "depolarization") The name of the parameter setting
+          the depolarization of idle qubits per unit duration.
+        """
+        self.gates = dict(gates)
+        self.parameters = dict(parameters)
+        self.idle = idle
+        self._compiled = None
+
+        for name, law in self.gates.items():
+            if (
+                name not in GATES
+                or name.startswith("I_")
+                or name.endswith("_stretched")
+            ):
+                raise ValueError(f"Cannot declare a law of {name}")
+            if law.rotation not in ROTATIONS:
+                raise ValueError(f"Unknown rotation {law.rotation} of {name}")
+            _, has_axis, n_qubits = ROTATIONS[law.rotation]
+            params = (None,) * (1 + has_axis) if law.params is None else law.params
+            if (
+                len(params) != 1 + has_axis
+                or params.count(None) != N_ARGS[OPCODES[name]]
+            ):
+                raise ValueError(f"The parameters of {name} do not match its rotation")
+            if n_qubits != N_QUBITS[OPCODES[name]]:
+                raise ValueError(f"{name} does not act on {n_qubits} qubits")
+            for parameter in law[-3:]:
+                if parameter is not None and parameter not in self.parameters:
+                    raise ValueError(f"Unknown noise parameter {parameter} of {name}")
+        if idle not in self.parameters:
+            raise ValueError(f"Unknown noise parameter {idle}")
+
+    @property
+    def parameter_names(self):
+        """The names of the parameters of the model, as a tuple."""
+        return tuple(self.parameters)
+
+    def compile(self):
+        """Returns the tables evaluating the spec, building them on the first call.
+
+        :rtype: CompiledSpec
+        """
+        if self._compiled is None:
+            self._compiled = CompiledSpec(self)
+        return self._compiled
+
+
+def _padded(params, N):
+    """Returns the classical arguments of N gates as an array of shape (N, k), with at
+    least one column."""
+    params = np.asarray(params, dtype=float).reshape(N, -1)
+    if params.shape[1] == 0:
+        params = np.zeros((N, 1))
+    return params
+
+
+class CompiledSpec:
+    """The laws of a NoiseSpec, as tables indexed by the opcodes of compact circuits."""
+
+    def __init__(self, spec):
+        """Compiles a spec.  See NoiseSpec.compile."""
+        n = len(GATE_NAMES)
+        names = spec.parameter_names
+        self.parameter_names = names
+        self.family = np.full(n, _UNMODELED)
+        # The angles of the rotations (axis, then rotation angle): fixed values, or the
+        # indices of the classical arguments passing them (-1 if fixed)
+        self.fixed = np.zeros((n, 2))
+        self.source = np.full((n, 2), -1)
+        self.duration = np.zeros(n)
+        self.duration_offset = np.zeros(n)
+        self.noise_factor = np.zeros(n)
+        # The index of the stretch factor among the classical arguments, or -1
+        self.stretch_source = np.full(n, -1)
+        # The indices of the noise parameters, len(names) standing for none
+        self.errors = np.full((n, 3), len(names))
+        self.idle = names.index(spec.idle)
+        self.n_qubits = N_QUBITS
+
+        for opcode, name in enumerate(GATE_NAMES):
+            base = name
+            if base.endswith("_stretched"):
+                base = base[: -len("_stretched")]
+                self.stretch_source[opcode] = N_ARGS[opcode] - 1
+            idle = base.startswith("I_")
+            if idle:
+                base = base[2:]
+            law = spec.gates.get(base)
+            if law is None:
+                continue
+
+            _, has_axis, _ = ROTATIONS[law.rotation]
+            self.family[opcode] = _IDLE if idle else _FAMILIES.index(law.rotation)
+            params = (None,) * (1 + has_axis) if law.params is None else law.params
+            passed = 0
+            for slot, param in zip(range(2 - len(params), 2), params):
+                if param is None:
+                    self.source[opcode, slot] = passed
+                    passed += 1
+                else:
+                    self.fixed[opcode, slot] = param
+            self.duration[opcode] = law.duration
+            self.duration_offset[opcode] = law.duration_offset
+            self.noise_factor[opcode] = law.noise_factor
+            for i, parameter in enumerate(law[-3:]):
+                if parameter is not None:
+                    self.errors[opcode, i] = names.index(parameter)
+
+    def modeled(self, opcodes):
+        """Returns whether gates are modeled (including the idle gates).
+
+        :param opcodes: The opcodes of the gates.
+        :rtype: numpy.array
+        """
+        return self.family[opcodes] != _UNMODELED
+
+    def _angles(self, opcodes, params):
+        """Returns the axis and rotation angles of gates, as stated by their laws."""
+        source = self.source[opcodes]
+        passed = np.take_along_axis(params, np.maximum(source, 0), axis=1)
+        angles = np.where(source >= 0, passed, self.fixed[opcodes])
+        return angles[:, 0], angles[:, 1]
+
+    def durations(self, opcodes, params, stretch=1):
+        """Evaluates the durations of gates.
+
+        :param opcodes: The opcodes of the gates, as an array of shape (N,).
+        :param params: The classical arguments of the gates (padded), as an array of
+          shape (N, k), e.g., the params of compact records.
+        :param stretch: (default 1) The stretch factor of the gates other than the
+          stretched gates, which pass their own.
+        :returns: The durations, of shape (N,).  Gates without a law have duration 0.
+        :rtype: numpy.array
+        """
+        opcodes = np.asarray(opcodes)
+        params = _padded(params, len(opcodes))
+        _, angle = self._angles(opcodes, params)
+        source = self.stretch_source[opcodes]
+        passed = np.take_along_axis(params, np.maximum(source, 0)[:, None], axis=1)
+        stretch = np.where(source >= 0, passed[:, 0], stretch)
+        # In the order of evaluation of SNLToy1's gateduration_* methods
+        duration = stretch * self.duration[opcodes] * abs(angle) / (np.pi / 2)
+        duration += stretch * self.duration_offset[opcodes]
+        return np.where(self.modeled(opcodes), duration, 0.0)
+
+    def evaluate(self, opcodes, params, noise, stretch=1, precision=None):
+        """Evaluates the superoperators of gates, with one vectorized evaluation per kind
+        of rotation.
+
+        :param opcodes: The opcodes of the gates, as an array of shape (N,).
+        :param params: The classical arguments of the gates (padded), as an array of
+          shape (N, k), e.g., the params of compact records.
+        :param noise: The values of the noise parameters, in the order of the spec's
+          parameter_names, each a scalar or an array of shape (N,).
+        :param stretch: (default 1) The stretch factor of the gates other than the
+          stretched gates, which pass their own.  It may be an array of shape (N,).
+        :param precision: (optional) The real floating point type of the results.  By
+          default, double precision.
+        :returns: The stacked superoperators, of shape (M, 4, 4) and (M, 16, 16), keyed
+          by number of qubits; for every gate, the row of its superoperator in the table
+          of its number of qubits (or -1 for gates without a law, e.g., prepare_all);
+          and the duration of every gate.
+        :rtype: tuple
+        """
+        opcodes = np.asarray(opcodes)
+        N = len(opcodes)
+        params = _padded(params, N)
+        durations = self.durations(opcodes, params, stretch)
+        # One column per parameter, and a column of zeros for the errors not modeled
+        noise = np.stack(
+            [np.broadcast_to(np.asarray(v, dtype=float), (N,)) for v in noise]
+            + [np.zeros(N)],
+            axis=1,
+        )
+
+        axis, angle = self._angles(opcodes, params)
+        rows = np.arange(N)
+        errors = self.errors[opcodes]
+        scaled = durations * self.noise_factor[opcodes]
+        axis = axis + noise[rows, errors[:, 0]]
+        angle = angle + noise[rows, errors[:, 1]] * scaled
+        decay = (1 - noise[rows, errors[:, 2]]) ** scaled
+        idle_decay = (1 - noise[:, self.idle]) ** durations
+
+        stacks = {}
+        widths = {}
+        family = self.family[opcodes]
+        for f in np.unique(family[family != _UNMODELED]):
+            indices = np.flatnonzero(family == f)
+            if f == _IDLE:
+                for n_qubits in np.unique(self.n_qubits[opcodes[indices]]):
+                    group = indices[self.n_qubits[opcodes[indices]] == n_qubits]
+                    weights = depolarizing_weights(idle_decay[group], n_qubits)
+                    G = weights[:, :, None] * np.eye(4**n_qubits)
+                    stacks[(f, n_qubits)] = group, G
+                    widths[(f, n_qubits)] = int(n_qubits)
+                continue
+            builder, has_axis, n_qubits = ROTATIONS[_FAMILIES[f]]
+            args = (axis[indices],) if has_axis else ()
+            G = builder(*args, angle[indices])
+            G = G * depolarizing_weights(decay[indices], n_qubits)[:, None, :]
+            stacks[f] = indices, G
+            widths[f] = n_qubits
+
+        tables, table_rows = _tables(stacks, widths, N)
+        if precision is not None:
+            tables = {width: table.astype(precision) for width, table in tables.items()}
+        return tables, table_rows, durations
+
+
+class SpecifiedModel(ExtensibleBackend):
+    """Base class of the noise models declared by a NoiseSpec.
+
+    A subclass sets noise_spec, and obtains the gate_* and gateduration_* methods of all
+    the gates the spec declares (and idle), unless it defines them itself, as well as
+    the noise parameters (with their defaults) as constructor arguments, the caching of
+    the superoperators, and the batched evaluation by the compiled spec (see batch_gate
+    and superoperators).
+
+    Methods defined by the class declaring the spec must agree with it.  Subclasses that
+    override the gate_* or gateduration_* methods of a gate are evaluated by calling
+    them instead, for that gate.
+    """
+
+    # The NoiseSpec of the model, and the gates it may declare laws of
+    noise_spec = None
+    jaqal_gates = GATES.copy()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        spec = cls.__dict__.get("noise_spec")
+        if spec is None:
+            return
+        for name in spec.gates:
+            if f"gate_{name}" not in cls.__dict__:
+                setattr(cls, f"gate_{name}", _spec_gate(name))
+            if f"gateduration_{name}" not in cls.__dict__:
+                setattr(cls, f"gateduration_{name}", _spec_duration(name))
+        if "idle" not in cls.__dict__:
+            cls.idle = _spec_idle
+        if "noise_parameter_names" not in cls.__dict__:
+            cls.noise_parameter_names = spec.parameter_names
+        # The methods described by the spec, to detect those overridden by subclasses
+        cls._spec_methods = {
+            name: (cls.__dict__[f"gate_{name}"], cls.__dict__[f"gateduration_{name}"])
+            for name in spec.gates
+        }
+        cls._spec_idle_method = cls.__dict__["idle"]
+
+    def __init__(self, *args, **kwargs):
+        """Builds a model for particular parameters
+
+        :param kwargs: The values of the noise parameters of the spec, by default those
+          of the spec.
+        :param cache GateCache: (default None) If given, memoize the superoperators
+          returned by the gate_* methods in this cache, keyed also on the parameters of
+          the noise model.
+        :param instrumentation Instrumentation: (default None) If given, record the calls
+          to the gate_*, gateduration_*, and idle methods, and the use of the caches.
+        :param precision: (default None) The real floating point type (e.g.,
+          numpy.float32) of the superoperators returned by the gate_* and idle methods.
+          By default, double precision.
+        """
+        self.set_defaults(
+            kwargs,
+            **self.noise_spec.parameters,
+            cache=None,
+            instrumentation=None,
+            precision=None,
+        )
+        if self.precision is not None:
+            self.precision = np.dtype(self.precision)
+
+        if self.cache is not None:
+            # Shadow the gate_* methods by cached versions before the model is built.
+            for gate_name in dir(type(self)):
+                if gate_name.startswith("gate_"):
+                    fun = self.cache.wrap(
+                        gate_name[5:], getattr(self, gate_name), self._cache_key
+                    )
+                    setattr(self, gate_name, fun)
+
+        if self.instrumentation is not None:
+            # Wraps the (possibly cached) methods, so that cache hits are timed too.
+            self.instrumentation.instrument(self)
+            if self.cache is not None:
+                self.instrumentation.watch_cache("gates", self.cache)
+            self._watch_caches(self.instrumentation)
+
+        # Pass through the balance of the parameters (e.g., to an emulator)
+        stretched_gates = kwargs.get("stretched_gates")
+        super().__init__(*args, **kwargs)
+        # An emulator may build its model with stretched_gates, and then
+        # ExtensibleBackend resets it (to None); keep it for what else reads it.
+        self.stretched_gates = stretched_gates
+
+    def _watch_caches(self, instrumentation):
+        """Registers the other caches of the model with instrumentation."""
+
+    def noise_parameters(self):
+        """Returns the parameters of the noise model, as a tuple."""
+        return tuple(getattr(self, name) for name in self.noise_parameter_names)
+
+    def _cache_key(self):
+        """The parameters of the model distinguishing its cached superoperators."""
+        return self.noise_parameters() + (self.precision,)
+
+    def _follows_spec(self, name):
+        """Whether a gate (or its idle or stretched version) is modeled by the spec,
+        rather than by methods overriding it."""
+        if name.endswith("_stretched"):
+            name = name[: -len("_stretched")]
+        if name.startswith("I_"):
+            name = name[2:]
+        methods = self._spec_methods.get(name)
+        cls = type(self)
+        return methods is not None and methods == (
+            getattr(cls, f"gate_{name}"),
+            getattr(cls, f"gateduration_{name}"),
+        )
+
+    def noise_dependencies(self, name):
+        """Returns the names of the noise parameters that the superoperators of a gate
+        depend on, as stated by its law.  Gates modeled by methods overriding the spec
+        may depend on all of them.
+
+        :param str name: The name of the gate, e.g., "Sx" or "I_MS_stretched", or
+          "idle" for idling.
+        :rtype: frozenset
+        """
+        spec = self.noise_spec
+        cls = type(self)
+        if name == "idle":
+            if cls.idle is cls._spec_idle_method:
+                return frozenset([spec.idle])
+        elif self._follows_spec(name):
+            if name.endswith("_stretched"):
+                name = name[: -len("_stretched")]
+            if name.startswith("I_"):
+                return frozenset([spec.idle])
+            law = spec.gates[name]
+            _, has_axis, _ = ROTATIONS[law.rotation]
+            errors = law[-3:] if has_axis else law[-2:]
+            return frozenset(e for e in errors if e is not None)
+        return frozenset(self.noise_parameter_names)
+
+    def batch_gate(self, name, *args, stretch=1, **noise):
+        """Generates the superoperators of a gate for a whole batch of parameters at once.
+
+        :param str name: The name of the gate, e.g., "MS".
+        :param args: The classical parameters of the gate (i.e., omitting the qubits).
+        :param stretch: (default 1) The stretch factor of the gate.
+        :param noise: Values overriding the parameters of the noise model (see
+          noise_parameter_names).
+        :returns: The stacked superoperators, of shape (N, 4, 4) or (N, 16, 16).
+        :rtype: numpy.array
+
+        All of args, stretch, and the noise parameters may be arrays, which are broadcast
+        against each other, and flattened into the batch dimension N.  The result matches
+        calling gate_{name} for each element in turn, on a model with those parameters.
+        """
+        unknown = set(noise) - set(self.noise_parameter_names)
+        if unknown:
+            raise TypeError(f"Unknown noise parameters {', '.join(sorted(unknown))}")
+
+        gate = self.jaqal_gates[name]
+        if len(args) != len(gate.classical_parameters):
+            raise TypeError(
+                f"{name} takes {len(gate.classical_parameters)} classical parameters"
+            )
+
+        *arrays, stretch = np.broadcast_arrays(*args, *noise.values(), stretch)
+        arrays = [array.ravel() for array in arrays]
+        stretch = stretch.ravel()
+        args = arrays[: len(args)]
+        noise = dict(zip(noise, arrays[len(args) :]))
+
+        if not self._follows_spec(name):
+            return self._batch_by_calls(name, args, stretch, noise)
+
+        N = len(stretch)
+        opcodes = np.full(N, OPCODES[name])
+        params = np.zeros((N, max(len(args), 1)))
+        for i, arg in enumerate(args):
+            params[:, i] = arg
+        values = [noise.get(k, getattr(self, k)) for k in self.noise_parameter_names]
+        tables, _, _ = self.noise_spec.compile().evaluate(
+            opcodes, params, values, stretch, self.precision
+        )
+        return tables[len(gate.quantum_parameters)]
+
+    def _batch_by_calls(self, name, args, stretch, noise):
+        """Generates a batch of superoperators by calling gate_{name} with arrays of
+        parameters, for gates not modeled by the spec."""
+        # A copy of this model, but with the noise parameters replaced by the arrays.
+        # Instance attributes that are callable (e.g., cached gate_* methods) are bound
+        # to the original, and are therefore dropped.
+        batch = object.__new__(type(self))
+        batch.__dict__.update((k, v) for k, v in vars(self).items() if not callable(v))
+        batch.__dict__.update(noise)
+
+        qubits = [None] * len(self.jaqal_gates[name].quantum_parameters)
+        fun = getattr(type(self), f"gate_{name}")
+        G = fun(batch, *qubits, *args, stretch=stretch)
+        return np.broadcast_to(G, stretch.shape + G.shape[-2:]).copy()
+
+    def superoperators(self, opcodes, params):
+        """Evaluates the superoperators and durations of many gates at once, by the
+        compiled spec.
+
+        :param opcodes: The opcodes of the gates (see opcodes.GATE_NAMES), of shape (N,).
+        :param params: The classical arguments of the gates (padded), of shape (N, k).
+        :returns: As CompiledSpec.evaluate, or None if some of the gates are modeled by
+          methods overriding the spec.
+        :rtype: tuple
+        """
+        compiled = self.noise_spec.compile()
+        opcodes = np.asarray(opcodes)
+        cls = type(self)
+        for opcode in np.unique(opcodes):
+            name = GATE_NAMES[opcode]
+            if compiled.modeled(opcode):
+                if not self._follows_spec(name):
+                    return None
+            elif _is_modeled(cls, name):
+                return None
+        stretch = self.stretched_gates
+        if stretch in (None, "add"):
+            stretch = 1
+        return compiled.evaluate(
+            opcodes, params, self.noise_parameters(), stretch, self.precision
+        )
+
+
+def _spec_gate(name):
+    """Generates the gate_{name} method of a gate declared by a spec."""
+    n_qubits = N_QUBITS[OPCODES[name]]
+    n_params = n_qubits + N_ARGS[OPCODES[name]]
+
+    def gate(self, *args, stretch=1):
+        if len(args) > n_params:
+            *args, stretch = args
+        args = args[n_qubits:]
+        G = self.batch_gate(name, *args, stretch=stretch)
+        shape = np.broadcast(*args, stretch).shape
+        return G[0] if shape == () else G.reshape(shape + G.shape[-2:])
+
+    gate.__name__ = f"gate_{name}"
+    return gate
+
+
+def _spec_duration(name):
+    """Generates the gateduration_{name} method of a gate declared by a spec."""
+    opcode = OPCODES[name]
+    n_qubits = N_QUBITS[opcode]
+    n_params = n_qubits + N_ARGS[opcode]
+
+    def gateduration(self, *args, stretch=1):
+        if len(args) > n_params:
+            *args, stretch = args
+        *columns, stretch = np.broadcast_arrays(*args[n_qubits:], stretch)
+        shape = stretch.shape
+        stretch = stretch.ravel()
+        N = len(stretch)
+        params = np.zeros((N, len(columns)))
+        for i, column in enumerate(columns):
+            params[:, i] = column.ravel()
+        compiled = self.noise_spec.compile()
+        durations = compiled.durations(np.full(N, opcode), params, stretch)
+        return float(durations[0]) if shape == () else durations.reshape(shape)
+
+    gateduration.__name__ = f"gateduration_{name}"
+    return gateduration
+
+
+def _spec_idle(self, q, duration):
+    """Idling depolarizes the qubit.  duration may be an array, giving a stack of
+    matrices."""
+    d = (1 - getattr(self, self.noise_spec.idle)) ** np.asarray(duration)
+    return depolarizing_channel(d, 1, precision=self.precision)
@@ -0,0 +1,247 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+import numpy as np
+
+from jaqalpaq.run.cursor import SubcircuitCursor, State
+from jaqalpaq.run import result
+from jaqalpaq.emulator.backend import EmulatedIndependentSubcircuitsBackend
+from jaqalpaq.emulator._import import get_ideal_action
+from jaqalpaq._import import jaqal_import
+
+from .jaqal_action import IDEAL_ACTION, DIAGONAL_ACTION, _at_precision
+
+
+def get_diagonal_action(gate):
+    """Returns the function generating the diagonal of a gate's unitary, if the gate is
+    diagonal, and its originating module provides a DIAGONAL_ACTION.  Otherwise None.
+
+    :param GateDefinition gate: The definition of the gate.
+    """
+    origin = getattr(gate, "origin", None)
+    if origin is None or hasattr(gate, "_ideal_unitary"):
+        return None
+    jg = jaqal_import(origin, "jaqal_action")
+    return getattr(jg, "DIAGONAL_ACTION", {}).get(gate.name)
+
+
+class StateVector:
+    """The state of a register of qubits, evolved (in place) by gate unitaries.
+
+    The amplitudes are stored in a vector of length 2**n_qubits, in which qubit k is bit k
+    of the index of a computational basis state.  Unitaries acting on several qubits
+    follow the same convention: the first qubit they act on is the least significant bit
+    of the row and column indices.  This matches jaqalpaq's UnitarySerializedEmulator.
+
+    Gates are applied by contracting their (small) unitary with the state, reshaped to
+    expose the affected qubits, into a preallocated buffer.  Diagonal gates are applied
+    as a multiplication by phases.  Each gate therefore costs time and memory
+    proportional to 2**n_qubits.
+
+    The amplitudes may be stored in single precision, halving the memory of the state.
+    Unitaries of any precision are accepted, and are rounded to that of the state as they
+    are applied.  (E.g., single-precision unitaries, as generated by the actions of
+    jaqal_action.with_precision, may be applied to a double-precision state.)
+    """
+
+    def __init__(
+        self,
+        n_qubits,
+        action=IDEAL_ACTION,
+        diagonal_action=DIAGONAL_ACTION,
+        precision=None,
+    ):
+        """Prepares a register in the all-zero state.
+
+        :param int n_qubits: The number of qubits in the register.
+        :param dict action: (default IDEAL_ACTION) The functions generating the unitaries
+          of the gates, keyed by gate name.
+        :param dict diagonal_action: (default DIAGONAL_ACTION) The functions generating
+          the diagonals of the diagonal gates, keyed by gate name.
+        :param precision: (optional) The real floating point type (e.g., numpy.float32)
+          setting the precision of the amplitudes.  By default, double precision.
+        """
+        self.n_qubits = n_qubits
+        self.action = action
+        self.diagonal_action = diagonal_action
+        dtype = complex if precision is None else _at_precision(complex, precision)
+        self.vector = np.zeros(2**n_qubits, dtype=dtype)
+        self._scratch = np.empty_like(self.vector)
+        self.reset()
+
+    def reset(self):
+        """Returns the register to the all-zero state."""
+        self.vector[:] = 0
+        self.vector[0] = 1
+
+    @property
+    def probabilities(self):
+        """The probabilities of measuring each computational basis state."""
+        return np.abs(self.vector) ** 2
+
+    def apply(self, name, qubits, *args):
+        """Applies a native gate.
+
+        :param str name: The name of the gate.
+        :param qubits: The indices of the qubits the gate acts on.
+        :param args: The classical parameters of the gate.
+        """
+        diagonal = self.diagonal_action.get(name)
+        if diagonal is not None:
+            self.apply_diagonal(diagonal(*args), qubits)
+            return
+        fun = self.action[name]
+        if fun is None:
+            # E.g., idle gates, which have no action on an ideal state.
+            return
+        self.apply_unitary(fun(*args), qubits)
+
+    def _view(self, vector, qubits):
+        """Reshapes vector, such that each qubit gets its own axis, with the qubits in
+        descending order."""
+        n = self.n_qubits
+        if len(qubits) == 1:
+            (q,) = qubits
+            return vector.reshape(2 ** (n - 1 - q), 2, 2**q)
+        lo, hi = sorted(qubits)
+        if lo == hi:
+            raise ValueError("Two-qubit gates must act on distinct qubits")
+        return vector.reshape(2 ** (n - 1 - hi), 2, 2 ** (hi - lo - 1), 2, 2**lo)
+
+    def apply_unitary(self, matrix, qubits):
+        """Applies a unitary acting on one or two qubits.
+
+        :param matrix: The 2x2 or 4x4 unitary.
+        :param qubits: The indices of the qubits the unitary acts on.
+        """
+        state = self._view(self.vector, qubits)
+        out = self._view(self._scratch, qubits)
+        if len(qubits) == 1:
+            np.matmul(matrix, state, out=out, casting="same_kind")
+        else:
+            a, b = qubits
+            # Rows and columns are indexed by (bit b, bit a), the rows being primed.
+            G = matrix.reshape(2, 2, 2, 2)
+            if a < b:
+                np.einsum("BAba,xbyaz->xByAz", G, state, out=out, casting="same_kind")
+            else:
+                np.einsum("BAba,xaybz->xAyBz", G, state, out=out, casting="same_kind")
+        self.vector, self._scratch = self._scratch, self.vector
+
+    def apply_diagonal(self, phases, qubits):
+        """Applies a diagonal unitary acting on one or two qubits.
+
+        :param phases: The diagonal of the unitary.
+        :param qubits: The indices of the qubits the unitary acts on.
+        """
+        state = self._view(self.vector, qubits)
+        if len(qubits) == 1:
+            state *= phases[:, None]
+        else:
+            a, b = qubits
+            # Indexed by (bit b, bit a)
+            P = phases.reshape(2, 2)
+            if a > b:
+                P = P.T
+            state *= P[:, None, :, None]
+
+
+class StatevectorEmulator(EmulatedIndependentSubcircuitsBackend):
+    """Serialized emulator using StateVector to apply the gates
+
+    This object should be treated as an opaque symbol to be passed to run_jaqal_circuit.
+    It produces the same results as jaqalpaq's UnitarySerializedEmulator.
+    """
+
+    def __init__(self, *args, fuser=None, precision=None, **kwargs):
+        """Builds a state-vector emulator.
+
+        :param GateFuser fuser: (optional) If given, e.g., by fusion.unitary_fuser(),
+          merge runs of gates before applying them to the state.
+        :param precision: (optional) The real floating point type (e.g., numpy.float32)
+          setting the precision of the simulated states.  By default, double precision.
+        """
+        super().__init__(*args, **kwargs)
+        self.fuser = fuser
+        self.precision = precision
+        self._states = {}
+
+    def _get_state(self, n_qubits):
+        """Returns a StateVector in the all-zero state, reusing allocated memory."""
+        try:
+            state = self._states[n_qubits]
+        except KeyError:
+            state = self._states[n_qubits] = StateVector(
+                n_qubits, precision=self.precision
+            )
+        else:
+            state.reset()
+        return state
+
+    def _simulate_subcircuit(self, job, subcirc):
+        """Generate the ProbabilisticSubcircuit associated with the trace of circuit
+            being process in job.
+
+        :param job: the job object controlling the emulation
+        :param SubcircuitResult subcirc: Data-carrying object of ExecutionResults
+        """
+        circ = subcirc.filled_circuit
+        gatedefs = circ.native_gates
+        cursor = SubcircuitCursor(subcirc.start, subcirc.end)
+        state = self._get_state(self.get_n_qubits(circ))
+        pending = []
+
+        while cursor.state == State.gate:
+            gate = cursor.next_gate()
+            cursor.report_gate_executed()
+
+            gatedef = gatedefs[gate.name]
+            ideal_unitary = get_ideal_action(gatedef)
+            if ideal_unitary is None:
+                continue
+            diagonal = get_diagonal_action(gatedef)
+
+            argv = []
+            qind = []
+            for val, param in gate.parameters_with_types:
+                if param.classical:
+                    argv.append(val)
+                else:
+                    qind.append(val.alias_index)
+
+            if self.fuser is not None:
+                pending.append((gate.name, qind, argv))
+            elif diagonal is not None:
+                state.apply_diagonal(diagonal(*argv), qind)
+            else:
+                state.apply_unitary(ideal_unitary(*argv), qind)
+
+        # Whether rounding errors of single precision (of about 1e-7) are expected.
+        single = state.vector.dtype != complex
+        for fused in self.fuser.fuse(pending) if pending else ():
+            single = single or np.finfo(fused.matrix.dtype).bits < 64
+            if fused.diagonal:
+                state.apply_diagonal(np.diagonal(fused.matrix), fused.qubits)
+            else:
+                state.apply_unitary(fused.matrix, fused.qubits)
+
+        if cursor.state != State.final_measurement:
+            raise NotImplementedError()
+
+        node = subcirc.tree
+        P = state.probabilities
+        if single:
+            # They exceed the tolerance of validate_probabilities, and are normalized
+            # away here.
+            P = P.astype(float)
+            P /= P.sum()
+        P = result.validate_probabilities(P)
+        for i, prob in enumerate(P):
+            if prob <= result.CUTOFF_ZERO:
+                continue
+            meas_cursor = cursor.copy()
+            meas_cursor.next_measure()
+            assert meas_cursor.state == State.shutdown
+            sub = node.force_get(i, meas_cursor)
+            sub.simulated_probability = prob
+        node.state_vector = state.vector.copy()
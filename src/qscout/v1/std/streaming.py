@@ -0,0 +1,276 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from collections import namedtuple
+
+import numpy as np
+
+from pygsti.baseobjs import CircuitLabel
+
+from jaqalpaq.core.algorithm import expand_macros, fill_in_let
+from jaqalpaq.emulator.pygsti.circuit import pyGSTiCircuitGeneratingVisitor
+
+from .opcodes import _base_name
+from .pauli_transfer import depolarizing_weights
+
+Checkpoint = namedtuple("Checkpoint", ["layer", "state"])
+Checkpoint.__doc__ = """The state of a circuit being streamed, after one of its layers.
+
+:ivar int layer: The number of layers applied.
+:ivar state: The density matrix, in the normalized Pauli basis, as an array of shape
+  (4,) * n_qubits, the first axis being qubit 0.  It is never modified in place.
+"""
+
+
+def initial_state(n_qubits):
+    """Returns the all-zero state, in the normalized Pauli basis.
+
+    :param int n_qubits: The number of qubits.
+    :rtype: numpy.array
+    """
+    zero = np.array([1, 0, 0, 1]) / np.sqrt(2)
+    state = np.ones(())
+    for _ in range(n_qubits):
+        state = np.multiply.outer(state, zero)
+    return state
+
+
+def probabilities(state):
+    """Returns the probabilities of measuring each computational basis state, indexed
+    with qubit 0 as the least significant bit (as jaqalpaq's probability_by_int).
+
+    :param state: The density matrix, in the normalized Pauli basis.
+    :rtype: numpy.array
+    """
+    # The components of the projectors on |0> and |1>
+    projectors = np.array([[1, 0, 0, 1], [1, 0, 0, -1]]) / np.sqrt(2)
+    P = state
+    for q in range(state.ndim):
+        P = np.moveaxis(np.tensordot(projectors, P, axes=([1], [q])), 0, q)
+    return P.transpose().reshape(-1)
+
+
+def fidelity(state, reference):
+    """Returns the overlap Tr(rho sigma) of two states, in the normalized Pauli basis.
+    This is the fidelity of rho to sigma if sigma is pure, e.g., the state of a noiseless
+    model.
+
+    :param state: The density matrix rho.
+    :param reference: The density matrix sigma.
+    :rtype: float
+    """
+    return float(np.vdot(reference, state))
+
+
+def apply_superoperator(G, state, qubits):
+    """Applies the superoperator of a gate to some of the qubits of a state.
+
+    :param G: The superoperator, in the normalized Pauli basis, of shape (4**k, 4**k).
+    :param state: The density matrix, in the normalized Pauli basis, as an array of shape
+      (4,) * n_qubits.  It is not modified.
+    :param list qubits: The k qubits the gate acts on, the first being the most
+      significant in the indices of G (as in the pyGSTi labels).
+    :returns: The new state.
+    :rtype: numpy.array
+    """
+    k = len(qubits)
+    G = G.reshape((4,) * (2 * k))
+    state = np.tensordot(G, state, axes=(list(range(k, 2 * k)), qubits))
+    return np.moveaxis(state, list(range(k)), qubits)
+
+
+def _durations(model):
+    """Returns the gate durations, keyed by gate name, as used by the pyGSTi emulator."""
+    stretched_gates = model.stretched_gates
+    durations = {}
+    for attribute in dir(type(model)):
+        if not attribute.startswith("gateduration_"):
+            continue
+        name = attribute[len("gateduration_") :]
+        fun = getattr(model, attribute)
+        if stretched_gates not in (None, "add"):
+            fun = _stretched(fun, stretched_gates)
+        durations[name] = fun
+        if stretched_gates == "add":
+            durations[f"{name}_stretched"] = fun
+    return durations
+
+
+def _stretched(fun, stretch):
+    return lambda *args: fun(*args, stretch=stretch)
+
+
+def _visitor(model, circuit, n_qubits, cls=pyGSTiCircuitGeneratingVisitor):
+    """Returns a visitor generating the pyGSTi labels of the statements of a circuit (with
+    its macros expanded and let constants filled in), timed as by the pyGSTi emulator.
+    It is an instance of cls, called with the durations of the gates."""
+    visitor = cls(durations=_durations(model))
+    visitor.llbls = list(range(n_qubits))
+    # As set by the visitor's visit_Circuit, which would build the whole pyGSTi circuit
+    visitor.all_qubits = {
+        register.name: set(range(register.size))
+        for register in circuit.fundamental_registers()
+    }
+    return visitor
+
+
+def _layer(visitor, statement):
+    """Returns the pyGSTi labels of a top-level statement, and of the idles of the other
+    qubits, or None for statements taking no time (e.g., prepare_all and
+    measure_all)."""
+    op, indices, duration = visitor.visit(statement)
+    if op is None and duration == 0:
+        return None
+    idle = {name: qubits - indices[name] for name, qubits in visitor.all_qubits.items()}
+    return ([] if op is None else [op]) + list(visitor.idle_gates(idle, duration))
+
+
+def _layers(model, circuit, n_qubits, cls=pyGSTiCircuitGeneratingVisitor):
+    """Generates the layers of a circuit: for every top-level statement, the pyGSTi
+    labels of its gates, and of the idles of the other qubits, timed as by the pyGSTi
+    emulator (or a subclass cls of its visitor)."""
+    circuit = fill_in_let(expand_macros(circuit))
+    visitor = _visitor(model, circuit, n_qubits, cls)
+    for statement in circuit.body.statements:
+        layer = _layer(visitor, statement)
+        if layer is not None:
+            yield layer
+
+
+def _leaves(label):
+    """Generates the gate and idle labels of a pyGSTi label, in order: the label
+    itself, the components of a parallel layer, or those of a (repeated) sequence."""
+    if isinstance(label, CircuitLabel):
+        for _ in range(label.reps):
+            for component in label.components:
+                yield from _leaves(component)
+    elif label.name == "COMPOUND":
+        for component in label.components:
+            yield from _leaves(component)
+    else:
+        yield label
+
+
+def _gate(model, label):
+    """Returns the name (of the unstretched gate), stretch factor, and classical
+    arguments of a gate label."""
+    name = label.name[len("GJ") :]
+    base = _base_name(name)
+    args = label.args
+    stretch = model.stretched_gates
+    if base != name:
+        # The stretch factor is passed as the last argument.
+        *args, stretch = args
+    elif stretch in (None, "add"):
+        stretch = 1
+    return base, stretch, args
+
+
+class _Stream:
+    """Applies the superoperators of pyGSTi labels to a state, generating them as
+    needed.
+
+    Models providing idle_decay (e.g., SNLToy1Model) idle by depolarizing only, so that
+    consecutive idles of a qubit compose by adding their durations.  Their total is held
+    back until the next gate on the qubit (or flush), and then applied as a contraction
+    of the axis of the qubit, without generating any matrix.
+    """
+
+    def __init__(self, model, state):
+        self.model = model
+        self.state = state
+        stretched_gates = model.stretched_gates
+        if stretched_gates in (None, "add"):
+            self.kwargs = {}
+        else:
+            self.kwargs = dict(stretch=stretched_gates)
+        self.idle_decay = getattr(model, "idle_decay", None)
+        # The total duration of the idles not yet applied, keyed by qubit
+        self.pending = {}
+
+    def superoperator(self, label):
+        """Returns the superoperator of a gate or idle label."""
+        model = self.model
+        if label.name == "Gidle":
+            return model.idle(None, *label.args)
+        # The stretch factor of a stretched gate is passed as its last argument.
+        name = _base_name(label.name[len("GJ") :])
+        fun = getattr(model, f"gate_{name}")
+        return fun(*[None] * len(label.sslbls), *label.args, **self.kwargs)
+
+    def apply(self, label):
+        """Applies a label: a gate or idle, a parallel layer, or a (repeated)
+        sequence of labels."""
+        for leaf in _leaves(label):
+            self._apply(leaf)
+
+    def _apply(self, label):
+        qubits = list(label.sslbls)
+        if label.name == "Gidle" and self.idle_decay is not None:
+            (q,) = qubits
+            (duration,) = label.args
+            self.pending[q] = self.pending.get(q, 0) + duration
+            return
+        self.flush(qubits)
+        G = np.asarray(self.superoperator(label))
+        self.state = apply_superoperator(G, self.state, qubits)
+
+    def flush(self, qubits=None):
+        """Applies the pending idles of some qubits, by default all of them."""
+        if qubits is None:
+            qubits = list(self.pending)
+        pending = {q: self.pending.pop(q) for q in qubits if q in self.pending}
+        self.state = self._idled(self.state, pending)
+
+    def current(self):
+        """Returns the state with the pending idles applied, leaving them pending, so
+        that the evolution does not depend on when states are taken."""
+        return self._idled(self.state, self.pending)
+
+    def _idled(self, state, durations):
+        """Applies idles, keyed by qubit, to a state."""
+        precision = getattr(self.model, "precision", None)
+        for q, duration in durations.items():
+            weights = depolarizing_weights(
+                self.idle_decay(None, duration), 1, precision=precision
+            )
+            shape = [1] * state.ndim
+            shape[q] = 4
+            state = state * weights.reshape(shape)
+        return state
+
+
+def stream(model, circuit, n_qubits=None, every=1):
+    """Evaluates a circuit under a noise model, layer by layer, yielding checkpoints of
+    its state.
+
+    The superoperators of each layer are generated as the layer is applied, and then
+    discarded (unless the model caches them), so that the memory used does not depend on
+    the depth of the circuit.  The layers are the top-level statements of the circuit
+    (e.g., a gate, a block, or a whole loop), with the idles inserted by the pyGSTi
+    emulator.  For models providing idle_decay, the idles of a qubit between its gates
+    are merged, and applied as decay factors.  The whole circuit is
+    evaluated as one subcircuit: prepare_all and measure_all are ignored, and the
+    evaluation starts from the all-zero state.
+
+    :param model: The noise model, e.g., an SNLToy1 or SNLToy1Model instance.
+    :param Circuit circuit: The parsed Jaqal circuit.
+    :param int n_qubits: (optional) The number of qubits.  By default, the model's
+      n_qubits if it has one, and otherwise, the size of the circuit's register.
+    :param int every: (default 1) The number of layers between checkpoints.  If None,
+      only yield the final state.  The final state is always yielded.
+    :returns: A generator of Checkpoint.
+    """
+    if n_qubits is None:
+        n_qubits = getattr(model, "n_qubits", None)
+    if n_qubits is None:
+        n_qubits = sum(register.size for register in circuit.fundamental_registers())
+    running = _Stream(model, initial_state(n_qubits))
+    count = 0
+    for count, layer in enumerate(_layers(model, circuit, n_qubits), 1):
+        for label in layer:
+            running.apply(label)
+        if every is not None and count % every == 0:
+            yield Checkpoint(count, running.current())
+    if every is None or count % every != 0:
+        yield Checkpoint(count, running.current())
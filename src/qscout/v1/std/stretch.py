@@ -0,0 +1,84 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+import numpy as np
+
+from .cache import GateCache
+
+
+class StretchFamily:
+    """The superoperators of one gate instance of a noise model, as a function of the
+    stretch factor s of the gate.
+
+    The gate is a rotation by phi(s) = rotation_angle + over_rotation * s about a fixed
+    axis, preceded by the depolarization of each of its qubits by the term decay**s.
+    (This is how SNLToy1 scales its noise with the duration of the gate, which is
+    proportional to the stretch factor.)  Decomposing the rotation with rotation_terms
+    and the depolarization with depolarizing_masks,
+
+        G(s) = sum over a, b of f_a(phi(s)) decay**(b * s) (terms[a] * masks[b]),
+
+    where f = (1, cos, sin).  The products of terms and masks are computed once, so that
+    evaluating G for any number of stretch factors only takes a linear combination of
+    them.  Equivalently, G(s) = base @ noise_factor(s): the ideal, unstretched rotation
+    base is shared by all stretch factors, and the noise factor (the over-rotation and
+    depolarization) is cached by stretch factor.
+    """
+
+    def __init__(self, terms, masks, rotation_angle, over_rotation, decay):
+        """Builds the family of superoperators of a gate.  See, e.g.,
+        SNLToy1Model.stretch_family.
+
+        :param terms: The terms of the rotation, as returned by rotation_terms.
+        :param masks: The masks of the depolarization, as returned by
+          depolarizing_masks.
+        :param float rotation_angle: The angle of the rotation.
+        :param float over_rotation: The over-rotation angle per unit stretch.
+        :param float decay: The depolarization term for unit stretch.
+        """
+        self._dim = dim = terms.shape[-1]
+        self.rotation_angle = rotation_angle
+        self.over_rotation = over_rotation
+        self.decay = decay
+        # The noise factors, keyed by stretch factor
+        self.cache = GateCache()
+        self._powers = np.arange(len(masks))
+        # Indexed by (a, b), flattened, and the flattened superoperator
+        basis = terms[:, None] * masks[None, :, None, :].astype(terms.dtype)
+        self._basis = basis.reshape(-1, dim * dim)
+        self.base = self._combine(rotation_angle, 0.0)
+        self.base.flags.writeable = False
+
+    def _combine(self, angle, stretch):
+        """Evaluates the rotation by angle + over_rotation * stretch, preceded by the
+        depolarization by decay**stretch."""
+        stretch = np.asarray(stretch, dtype=float)
+        phi = angle + self.over_rotation * stretch
+        rotation = np.stack([np.ones_like(phi), np.cos(phi), np.sin(phi)], axis=-1)
+        depolarization = (self.decay**stretch)[..., None] ** self._powers
+        coefficients = rotation[..., :, None] * depolarization[..., None, :]
+        coefficients = coefficients.reshape(stretch.shape + (-1,))
+        G = coefficients.astype(self._basis.dtype) @ self._basis
+        return G.reshape(stretch.shape + (self._dim, self._dim))
+
+    def __call__(self, stretch=1):
+        """Generates the superoperators of the gate.
+
+        :param stretch: (default 1) The stretch factor, or an array of them.
+        :returns: The superoperator, or a stack of them, of shape (..., d, d).
+        :rtype: numpy.array
+        """
+        return self._combine(self.rotation_angle, stretch)
+
+    def noise_factor(self, stretch=1):
+        """Returns the superoperator N such that the gate is base @ N.
+
+        :param stretch: (default 1) The stretch factor, or an array of them.  The noise
+          factors of single stretch factors are cached, and returned read-only.
+        :rtype: numpy.array
+        """
+        try:
+            key = self.cache.key("noise_factor", (stretch,))
+        except TypeError:
+            return self._combine(0.0, stretch)
+        return self.cache.lookup(key, lambda: self._combine(0.0, stretch))
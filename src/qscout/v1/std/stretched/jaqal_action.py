@@ -3,3 +3,7 @@ from jaqalpaq.core.stretch import stretched_unitaries
 from .. import jaqal_action
 
 IDEAL_ACTION = stretched_unitaries(jaqal_action.IDEAL_ACTION, suffix="_stretched")
+DIAGONAL_ACTION = stretched_unitaries(jaqal_action.DIAGONAL_ACTION, suffix="_stretched")
+STRUCTURE = {
+    f"{name}_stretched": structure for name, structure in jaqal_action.STRUCTURE.items()
+}
@@ -0,0 +1,148 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from . import pauli_transfer
+
+try:
+    from importlib.metadata import (
+        version as _distribution_version,
+        PackageNotFoundError,
+    )
+except ImportError:  # Python < 3.8
+    _distribution_version = None
+
+
+def _package_version():
+    if _distribution_version is None:
+        return None
+    try:
+        return _distribution_version("QSCOUT-gatemodels")
+    except PackageNotFoundError:
+        return None
+
+
+def fingerprint(cls):
+    """Returns the identification of the code generating the superoperators of a class
+    of noise models: the versions of this package, Python, and NumPy, and the source
+    files of the class (and its bases) and of the Pauli transfer matrices, by their
+    SHA-256 digests.  Any change to these (e.g., an upgrade, or an edited model)
+    invalidates the tables cached for the class.
+
+    :param type cls: The class of noise models, e.g., SNLToy1Model.
+    """
+    # parallel.py evaluates the gates into the tables.
+    paths = {
+        pauli_transfer.__file__,
+        os.path.join(os.path.dirname(__file__), "parallel.py"),
+    }
+    for base in cls.__mro__:
+        path = getattr(sys.modules.get(base.__module__), "__file__", None)
+        if path is not None:
+            paths.add(path)
+    # The contents of the files, rather than their modification times: the version of
+    # this package is unknown where it is not installed (e.g., in a source tree).
+    digests = []
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            digests.append((path, hashlib.sha256(f.read()).hexdigest()))
+    return (_package_version(), sys.version_info[:2], np.__version__, tuple(digests))
+
+
+class TableCache:
+    """Persistent cache of the superoperator tables built by build_superoperator_table.
+
+    Every table is stored in its own subdirectory of directory, as .npy files, which
+    are memory-mapped (read-only) when loaded.  Processes loading the same table
+    therefore share one copy of it in memory, through the page cache of the operating
+    system.  Tables are keyed by the fingerprint of the code of the noise model, its
+    class, its noise parameters, stretched_gates, and precision, and the gate
+    instances.  Only point this at a directory you trust.
+    """
+
+    def __init__(self, directory):
+        """Opens (and, if needed, creates) a cache of tables.
+
+        :param str directory: The directory to store the tables in.
+        """
+        self.directory = os.fspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, cls, state, instances):
+        """Returns the key (a hexadecimal string) identifying a table.
+
+        :param type cls: The class of the noise model evaluating the table.
+        :param dict state: The noise parameters, stretched_gates, and precision of the
+          noise model.
+        :param instances: The (name, args) pairs of the gate instances, in order.
+        """
+        description = (
+            fingerprint(cls),
+            f"{cls.__module__}.{cls.__qualname__}",
+            sorted((name, repr(value)) for name, value in state.items()),
+            tuple(instances),
+        )
+        return hashlib.sha256(repr(description).encode()).hexdigest()
+
+    def load(self, key, instances):
+        """Returns a cached table, memory-mapped read-only.
+
+        :param str key: The key of the table.
+        :param instances: The (name, args) pairs of the gate instances, in order.
+        :returns: The tables, keyed by number of qubits, and the durations, or None if
+          the table is not (or not entirely) cached.
+        """
+        path = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(path, "instances.json")) as f:
+                stored = json.load(f)
+            if [(name, tuple(args)) for name, args in stored] != list(instances):
+                return None
+            durations = np.load(os.path.join(path, "durations.npy"), mmap_mode="r")
+            tables = {}
+            for entry in os.listdir(path):
+                if entry.startswith("table"):
+                    n_qubits = int(entry[len("table") : -len(".npy")])
+                    tables[n_qubits] = np.load(os.path.join(path, entry), mmap_mode="r")
+        except Exception:
+            # A missing, truncated, or otherwise unreadable table is simply rebuilt.
+            # Tables are stored atomically, so remove an unreadable one to make room.
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        return tables, durations
+
+    def store(self, key, instances, tables, durations):
+        """Writes a table to the cache.
+
+        :param str key: The key of the table.
+        :param instances: The (name, args) pairs of the gate instances, in order.
+        :param dict tables: The superoperators, keyed by number of qubits.
+        :param durations: The duration of every instance.
+        """
+        path = os.path.join(self.directory, key)
+        # Write atomically, as many processes may be building the same table at once.
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(temporary, exist_ok=True)
+            for n_qubits, table in tables.items():
+                np.save(os.path.join(temporary, f"table{n_qubits}.npy"), table)
+            np.save(os.path.join(temporary, "durations.npy"), durations)
+            with open(os.path.join(temporary, "instances.json"), "w") as f:
+                json.dump([(name, list(args)) for name, args in instances], f)
+            os.replace(temporary, path)
+        except OSError:
+            # E.g., another process stored it first.  The cache is only an
+            # optimization: proceed without it.
+            shutil.rmtree(temporary, ignore_errors=True)
+
+    def clear(self):
+        """Deletes every cached table, including those of outdated code."""
+        for entry in os.listdir(self.directory):
+            shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
@@ -0,0 +1,176 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from collections import namedtuple
+
+import numpy as np
+
+from .jaqal_action import _at_precision
+from .sampling import CDFTable
+from .streaming import _gate, _layers, _leaves
+
+TrajectoryResult = namedtuple(
+    "TrajectoryResult", ["counts", "probabilities", "trajectories"]
+)
+TrajectoryResult.__doc__ = """The measurements of sampled trajectories of a circuit.
+
+:ivar counts: The number of shots measuring each computational basis state (indexed
+  with qubit 0 as the least significant bit, as jaqalpaq's probability_by_int), as an
+  integer array.
+:ivar probabilities: The probabilities of measuring each computational basis state,
+  averaged over the trajectories.  This estimates the probabilities of the noise model
+  with less variance than counts.
+:ivar int trajectories: The number of trajectories sampled.
+"""
+
+
+class _Trajectories:
+    """A batch of state vectors, each evolved by the coherent part of the gates, and
+    random Pauli faults.
+
+    The amplitudes are stored in an array of shape (batch, 2**n_qubits), with the
+    convention of StateVector: qubit k is bit k of the index of a basis state, and the
+    first qubit a two-qubit unitary acts on is the least significant bit of its row and
+    column indices.
+    """
+
+    def __init__(self, n_qubits, batch, rng, dtype=complex):
+        self.n_qubits = n_qubits
+        self.rng = rng
+        self.vectors = np.zeros((batch, 2**n_qubits), dtype=dtype)
+        self.vectors[:, 0] = 1
+
+    def _view(self, vectors, qubits):
+        """Reshapes vectors, such that each qubit gets its own axis, with the qubits in
+        descending order, after the batch axis."""
+        n = self.n_qubits
+        batch = len(vectors)
+        if len(qubits) == 1:
+            (q,) = qubits
+            return vectors.reshape(batch, 2 ** (n - 1 - q), 2, 2**q)
+        lo, hi = sorted(qubits)
+        if lo == hi:
+            raise ValueError("Two-qubit gates must act on distinct qubits")
+        return vectors.reshape(
+            batch, 2 ** (n - 1 - hi), 2, 2 ** (hi - lo - 1), 2, 2**lo
+        )
+
+    def apply_unitary(self, U, qubits):
+        """Applies a one- or two-qubit unitary to every trajectory."""
+        state = self._view(self.vectors, qubits)
+        if len(qubits) == 1:
+            out = np.einsum("Aa,zyax->zyAx", U, state)
+        else:
+            # Indexed by (row, column) bits, the first qubit's being the last
+            U = U.reshape(2, 2, 2, 2)
+            if qubits[0] > qubits[1]:
+                U = U.transpose(1, 0, 3, 2)
+            out = np.einsum("HLhl,zyhwlx->zyHwLx", U, state)
+        self.vectors = out.reshape(self.vectors.shape).astype(
+            self.vectors.dtype, copy=False
+        )
+
+    def depolarize(self, decay, qubits):
+        """Samples a Pauli fault on each qubit of every trajectory: X, Y, or Z, each with
+        probability (1 - decay) / 4.  Averaged over the faults, this contracts the X,
+        Y, and Z components of the qubits by decay."""
+        if decay == 1:
+            return
+        fault = 0.75 * (1 - decay)
+        for q in qubits:
+            draws = self.rng.random(len(self.vectors))
+            # X with draws < fault / 3, Y below 2 * fault / 3, and Z below fault.  Y is
+            # applied as Z then X, up to a global phase.
+            flip = np.flatnonzero(draws < 2 * fault / 3)
+            phase = np.flatnonzero((draws >= fault / 3) & (draws < fault))
+            state = self._view(self.vectors, [q])
+            if len(phase):
+                state[phase, :, 1, :] *= -1
+            if len(flip):
+                state[flip] = state[flip, :, ::-1, :]
+
+    def sample(self, shots):
+        """Measures every trajectory shots times.
+
+        :returns: The outcomes, as an integer array of shape (batch, shots), and the
+          probabilities of every trajectory, of shape (batch, 2**n_qubits).
+        """
+        P = np.abs(self.vectors) ** 2
+        outcomes = CDFTable(P).sample(shots, self.rng)
+        return outcomes, P
+
+
+def sample_trajectories(
+    model,
+    circuit,
+    trajectories,
+    *,
+    shots=1,
+    batch_size=64,
+    seed=None,
+    n_qubits=None,
+    precision=None,
+):
+    """Estimates the measurement outcomes of a circuit under an SNLToy1-style noise
+    model by sampling trajectories of state vectors.
+
+    The gates of SNLToy1 are unitaries (the rotations, with over-rotation and phase
+    errors) preceded by the depolarization of their qubits, and idling only depolarizes.
+    Every depolarization is unravelled into a random Pauli fault on each qubit (see
+    SNLToy1Model.coherent_gate), so that every trajectory is a pure state, using memory
+    proportional to 2**n_qubits rather than the 4**n_qubits of a density matrix.  The
+    gates, and the idles between them, are laid out as by the pyGSTi emulator.  The
+    whole circuit is evaluated as one subcircuit: prepare_all and measure_all are
+    ignored, and every trajectory starts from the all-zero state.
+
+    :param model: The noise model, e.g., an SNLToy1 or SNLToy1Model instance, providing
+      coherent_gate and idle_decay.
+    :param Circuit circuit: The parsed Jaqal circuit.
+    :param int trajectories: The number of trajectories to sample.
+    :param int shots: (default 1) The number of measurements of every trajectory.
+    :param int batch_size: (default 64) The number of trajectories evolved at once.
+      Memory grows as batch_size * 2**n_qubits.
+    :param seed: (optional) The seed of the random number generator (or a
+      numpy.random.Generator).  For a given seed and batch_size, the result is
+      reproducible.
+    :param int n_qubits: (optional) The number of qubits.  By default, the model's
+      n_qubits if it has one, and otherwise, the size of the circuit's register.
+    :param precision: (optional) The real floating point type (e.g., numpy.float32)
+      setting the precision of the state vectors.  By default, double precision.
+    :rtype: TrajectoryResult
+    """
+    rng = np.random.default_rng(seed)
+    if n_qubits is None:
+        n_qubits = getattr(model, "n_qubits", None)
+    if n_qubits is None:
+        n_qubits = sum(register.size for register in circuit.fundamental_registers())
+    dtype = complex if precision is None else _at_precision(complex, precision)
+
+    # The faults and unitaries to apply, in order, shared by all batches
+    operations = []
+    for layer in _layers(model, circuit, n_qubits):
+        for label in layer:
+            for leaf in _leaves(label):
+                qubits = list(leaf.sslbls)
+                if leaf.name == "Gidle":
+                    operations.append(
+                        (None, model.idle_decay(None, *leaf.args), qubits)
+                    )
+                else:
+                    name, stretch, args = _gate(model, leaf)
+                    U, decay = model.coherent_gate(name, *args, stretch=stretch)
+                    operations.append((U, decay, qubits))
+
+    counts = np.zeros(2**n_qubits, dtype=np.int64)
+    probabilities = np.zeros(2**n_qubits)
+    for start in range(0, trajectories, batch_size):
+        batch = min(batch_size, trajectories - start)
+        state = _Trajectories(n_qubits, batch, rng, dtype)
+        for U, decay, qubits in operations:
+            state.depolarize(decay, qubits)
+            if U is not None:
+                state.apply_unitary(U, qubits)
+        outcomes, P = state.sample(shots)
+        counts += np.bincount(outcomes.ravel(), minlength=len(counts))
+        probabilities += P.sum(axis=0)
+    return TrajectoryResult(counts, probabilities / max(trajectories, 1), trajectories)
@@ -0,0 +1,47 @@
+from jaqalpaq.core.algorithm import fill_in_let
+from jaqalpaq.parser import parse_jaqal_string
+from jaqalpaq.run import run_jaqal_circuit
+
+from qscout.v1.std.noisy import SNLToy1
+
+# A circuit exercising the layout of the pyGSTi emulator: macros, let constants,
+# parallel blocks of gates of different durations, loops, and idle gates.  Further
+# statements can be inserted before measure_all.
+PROGRAM = """
+from qscout.v1.std usepulses *
+from qscout.v1.std.stretched usepulses *
+
+let a 0.3
+let b 0.2
+let n 2
+register q[3]
+
+macro foo x { R q[0] x 0.2 }
+
+prepare_all
+Sx q[0]
+foo a
+< Sy q[1] | MS q[0] q[2] 0.1 b >
+loop n { R q[2] 0.1 0.3 ; Sz q[1] }
+I_Sx q[0]
+Sxx q[2] q[0]
+< Rz q[0] 0.4 | { Px q[1] ; Sy q[1] } >
+%s
+measure_all
+"""
+
+NOISE = dict(depolarization=1e-2, rotation_error=2e-2, phase_error=3e-2)
+
+
+def circuit(extra=""):
+    """Returns the parsed PROGRAM, with extra statements appended."""
+    return parse_jaqal_string(PROGRAM % extra)
+
+
+def emulate(circuit, lets=None, stretched_gates=None, **noise):
+    """Returns the probabilities of the outcomes of a circuit, as run by the pyGSTi
+    emulator of SNLToy1, with the given let constants and noise parameters."""
+    n_qubits = sum(register.size for register in circuit.fundamental_registers())
+    backend = SNLToy1(n_qubits, stretched_gates=stretched_gates, **noise)
+    result = run_jaqal_circuit(fill_in_let(circuit, lets), backend=backend)
+    return result.subcircuits[0].probability_by_int
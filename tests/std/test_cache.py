@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+import numpy as np
+
+from qscout.v1.std.cache import GateCache, cached_actions
+from qscout.v1.std.jaqal_action import IDEAL_ACTION, U_R
+from qscout.v1.std.noisy import SNLToy1
+
+
+class GateCacheTester(TestCase):
+    def test_hits_and_misses(self):
+        """Test that repeated (and nearly repeated) angles are served from the cache."""
+        cache = GateCache()
+        R = cached_actions(IDEAL_ACTION, cache)["R"]
+        U = R(0.0, np.pi / 2)
+        self.assertIs(R(0.0, np.pi / 2), U)
+        self.assertIs(R(-0.0, np.pi / 2 + 1e-15), U)
+        self.assertIsNot(R(0.0, np.pi), U)
+        self.assertEqual(cache.cache_info(), (2, 2, 4096, 2))
+        np.testing.assert_array_equal(U, U_R(0.0, np.pi / 2))
+        cache.cache_clear()
+        self.assertEqual(cache.cache_info(), (0, 0, 4096, 0))
+
+    def test_read_only(self):
+        """Test that cached matrices cannot be modified."""
+        R = cached_actions(IDEAL_ACTION, GateCache())["R"]
+        with self.assertRaises(ValueError):
+            R(0.0, 1.0)[0, 0] = 0
+
+    def test_eviction(self):
+        """Test that the least recently used entry is evicted when full."""
+        cache = GateCache(maxsize=2)
+        Rx = cached_actions(IDEAL_ACTION, cache)["Rx"]
+        U0 = Rx(0.0)
+        Rx(1.0)
+        self.assertIs(Rx(0.0), U0)
+        Rx(2.0)
+        self.assertIs(Rx(0.0), U0)
+        Rx(1.0)
+        self.assertEqual(cache.cache_info(), (2, 4, 2, 2))
+
+    def test_arrays_bypass(self):
+        """Test that array-valued parameters are computed without caching."""
+        cache = GateCache()
+        Rx = cached_actions(IDEAL_ACTION, cache)["Rx"]
+        self.assertEqual(Rx(np.zeros(3)).shape, (3, 2, 2))
+        self.assertEqual(cache.cache_info().currsize, 0)
+
+    def test_noise_model(self):
+        """Test that SNLToy1 gates are cached per noise model parameters."""
+        cache = GateCache()
+        emulator = SNLToy1(1, cache=cache)
+        reference = SNLToy1(1)
+        G = emulator.gate_R(None, 0.1, 0.2)
+        self.assertFalse(G.flags.writeable)
+        np.testing.assert_array_equal(G, reference.gate_R(None, 0.1, 0.2))
+        self.assertIs(SNLToy1(1, cache=cache).gate_R(None, 0.1, 0.2), G)
+        noisier = SNLToy1(1, cache=cache, depolarization=1e-2)
+        self.assertIsNot(noisier.gate_R(None, 0.1, 0.2), G)
+        self.assertIsNot(emulator.gate_R(None, 0.1, 0.2, stretch=2), G)
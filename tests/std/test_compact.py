@@ -0,0 +1,188 @@
+from unittest import TestCase
+
+import numpy as np
+
+from jaqalpaq.core import GateDefinition, Parameter, ParamType
+from jaqalpaq.core.circuitbuilder import CircuitBuilder
+from jaqalpaq.generator import generate_jaqal_program
+from jaqalpaq.parser import parse_jaqal_string
+from jaqalpaq.run import run_jaqal_circuit, run_jaqal_string
+from jaqalpaq.emulator.unitary import UnitarySerializedEmulator
+
+from qscout.v1.std import compact
+from qscout.v1.std.noisy import SNLToy1Model
+
+PROGRAM = """
+from qscout.v1.std usepulses *
+from qscout.v1.std.stretched usepulses *
+
+let a 0.5
+register q[3]
+
+macro foo x y { R q[0] x y }
+
+prepare_all
+foo a 0.25
+< Sx q[0] | Rz q[1] a | Py q[2] >
+loop 2 { MS q[0] q[1] a 1 }
+R_stretched q[2] 0.1 0.4 1.5
+I_Sy q[1]
+Szzd q[2] q[0]
+XX q[1] q[2] 0.7
+measure_all
+"""
+
+
+class CompactTester(TestCase):
+    def setUp(self):
+        self.circuit = parse_jaqal_string(PROGRAM)
+        self.records = compact.from_circuit(self.circuit)
+
+    def test_from_circuit(self):
+        records = self.records
+        self.assertEqual(records.dtype, compact.GATE_DTYPE)
+        names = [compact.GATE_NAMES[opcode] for opcode in records["opcode"]]
+        self.assertEqual(
+            names,
+            ["prepare_all", "R", "Sx", "Rz", "Py", "MS", "MS"]
+            + ["R_stretched", "I_Sy", "Szzd", "XX", "measure_all"],
+        )
+        np.testing.assert_array_equal(records[1]["params"], [0.5, 0.25, 0])
+        np.testing.assert_array_equal(records[5]["qubits"], [0, 1])
+        np.testing.assert_array_equal(records[5]["params"], [0.5, 1, 0])
+        np.testing.assert_array_equal(records[7]["params"], [0.1, 0.4, 1.5])
+        np.testing.assert_array_equal(records[9]["qubits"], [2, 0])
+        np.testing.assert_array_equal(records[8]["qubits"], [1, -1])
+        self.assertEqual(compact.count_qubits(records), 3)
+
+    def test_round_trip(self):
+        circuit = compact.to_circuit(self.records)
+        np.testing.assert_array_equal(compact.from_circuit(circuit), self.records)
+        # The circuit can be regenerated, and reparsed.
+        parsed = parse_jaqal_string(
+            "from qscout.v1.std usepulses *\n"
+            "from qscout.v1.std.stretched usepulses *\n"
+            + generate_jaqal_program(circuit)
+        )
+        np.testing.assert_array_equal(compact.from_circuit(parsed), self.records)
+        self.assertEqual(len(compact.to_circuit(self.records, 5).registers["q"]), 5)
+
+    def test_subcircuits(self):
+        records = compact.from_circuit(
+            parse_jaqal_string(
+                "from qscout.v1.std usepulses *\n"
+                "register q[1]\n"
+                "subcircuit 2 { Sx q[0] }\n"
+            )
+        )
+        names = [compact.GATE_NAMES[opcode] for opcode in records["opcode"]]
+        self.assertEqual(names, ["prepare_all", "Sx", "measure_all"])
+
+    def test_not_native(self):
+        foo = GateDefinition("foo", [Parameter("q", ParamType.QUBIT)])
+        builder = CircuitBuilder(native_gates={"foo": foo})
+        builder.register("q", 1)
+        builder.gate("foo", ("array_item", "q", 0))
+        with self.assertRaises(ValueError):
+            compact.from_circuit(builder.build())
+
+    def test_unitaries(self):
+        tables, rows = compact.unitaries(self.records)
+        self.assertEqual(sorted(tables), [1, 2])
+        for record, row in zip(self.records, rows):
+            name = compact.GATE_NAMES[record["opcode"]]
+            fun = compact.IDEAL_ACTION.get(name)
+            if fun is None:
+                self.assertEqual(row, -1)
+                continue
+            n_qubits = compact.N_QUBITS[record["opcode"]]
+            args = record["params"][: compact.N_ARGS[record["opcode"]]]
+            np.testing.assert_allclose(tables[n_qubits][row], fun(*args), atol=1e-15)
+
+    def test_simulate(self):
+        reference = run_jaqal_string(PROGRAM, backend=UnitarySerializedEmulator())
+        state = compact.simulate(self.records)
+        np.testing.assert_allclose(
+            state.probabilities,
+            reference.subcircuits[0].probability_by_int,
+            rtol=0,
+            atol=1e-12,
+        )
+        single = compact.simulate(self.records, precision=np.float32)
+        self.assertEqual(single.vector.dtype, np.complex64)
+        np.testing.assert_allclose(
+            single.probabilities, state.probabilities, rtol=0, atol=1e-6
+        )
+
+    def test_to_circuit_runs(self):
+        result = run_jaqal_circuit(compact.to_circuit(self.records))
+        reference = run_jaqal_string(PROGRAM)
+        np.testing.assert_allclose(
+            result.subcircuits[0].probability_by_int,
+            reference.subcircuits[0].probability_by_int,
+            rtol=0,
+            atol=1e-12,
+        )
+
+    def test_superoperators(self):
+        model = SNLToy1Model(depolarization=1e-2, rotation_error=2e-2)
+        tables, rows, durations = compact.superoperators(self.records, model)
+        for record, row, duration in zip(self.records, rows, durations):
+            name = compact.GATE_NAMES[record["opcode"]]
+            if name in ("prepare_all", "measure_all"):
+                self.assertEqual(row, -1)
+                self.assertEqual(duration, 0)
+                continue
+            qubits = [None] * compact.N_QUBITS[record["opcode"]]
+            args = list(record["params"][: compact.N_ARGS[record["opcode"]]])
+            if name.endswith("_stretched"):
+                *args, stretch = args
+                name = name[: -len("_stretched")]
+            else:
+                stretch = 1
+            if name.startswith("I_"):
+                base = name[2:]
+                expected = model.idle(None, duration)
+            else:
+                base = name
+                expected = getattr(model, f"gate_{name}")(
+                    *qubits, *args, stretch=stretch
+                )
+            self.assertEqual(
+                duration,
+                getattr(model, f"gateduration_{base}")(*qubits, *args, stretch=stretch),
+            )
+            np.testing.assert_allclose(
+                tables[len(qubits)][row], expected, rtol=0, atol=1e-14
+            )
+
+    def test_repeated_gates(self):
+        """Test that every instance of a gate without arguments gets its row."""
+
+        class PerGate(SNLToy1Model):
+            # Evaluated by batch_gate, gate by gate, rather than by the spec
+            superoperators = None
+
+        circuit = parse_jaqal_string(
+            "from qscout.v1.std usepulses *\nregister q[2]\n"
+            "Sx q[0]\nSx q[1]\nSx q[0]\nRx q[0] 0.3\n"
+        )
+        records = compact.from_circuit(circuit)
+        for model in (SNLToy1Model(), PerGate()):
+            tables, rows, _ = compact.superoperators(records, model)
+            self.assertEqual(len(tables[1]), 4)
+            for row in rows[:3]:
+                np.testing.assert_allclose(
+                    tables[1][row], model.gate_Sx(None), rtol=0, atol=1e-14
+                )
+            np.testing.assert_allclose(
+                tables[1][rows[3]], model.gate_Rx(None, 0.3), rtol=0, atol=1e-14
+            )
+
+    def test_empty(self):
+        records = np.zeros(0, dtype=compact.GATE_DTYPE)
+        self.assertEqual(compact.unitaries(records)[0], {})
+        self.assertEqual(compact.count_qubits(records), 0)
+        np.testing.assert_array_equal(
+            compact.simulate(records, 1).probabilities, [1, 0]
+        )
@@ -0,0 +1,147 @@
+from unittest import TestCase
+
+import numpy as np
+
+from qscout.v1.std.cache import GateCache
+from qscout.v1.std.fusion import unitary_fuser, superoperator_fuser
+from qscout.v1.std.noisy import SNLToy1Model
+from qscout.v1.std.statevector import StateVector
+
+# Normalized Pauli basis, as used by pyGSTi
+PAULIS = [
+    np.eye(2),
+    np.array([[0, 1], [1, 0]]),
+    np.array([[0, -1j], [1j, 0]]),
+    np.diag([1, -1]),
+]
+PAULIS2 = [np.kron(P, Q) for P in PAULIS for Q in PAULIS]
+SWAP = np.eye(4)[[0, 2, 1, 3]]
+
+
+def pauli_transfer(U):
+    """The Pauli transfer matrix of a unitary, whose first qubit is the first factor."""
+    basis = PAULIS if len(U) == 2 else PAULIS2
+    return np.array(
+        [[np.trace(P @ U @ Q @ U.conj().T).real / len(U) for Q in basis] for P in basis]
+    )
+
+
+def random_gates(rng, n_qubits, count):
+    gates = []
+    for _ in range(count):
+        if rng.random() < 0.3:
+            name = str(rng.choice(["MS", "XX", "ZZ", "Sxx", "Szzd"]))
+            qubits = [int(q) for q in rng.permutation(n_qubits)[:2]]
+        else:
+            name = str(rng.choice(["R", "Rz", "Sx", "Sy", "Sz", "Px", "Ry"]))
+            qubits = [int(rng.integers(n_qubits))]
+        n_params = dict(R=2, MS=2, Rz=1, Ry=1, XX=1, ZZ=1).get(name, 0)
+        gates.append((name, qubits, list(rng.uniform(-4, 4, n_params))))
+    return gates
+
+
+class UnitaryFuserTester(TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_matches_sequence(self):
+        """Test that applying the fused gates matches applying the original gates."""
+        n = 4
+        for _ in range(10):
+            gates = random_gates(self.rng, n, 40)
+            fused = unitary_fuser().fuse(gates)
+            self.assertLess(len(fused), len(gates))
+            expected = StateVector(n)
+            actual = StateVector(n)
+            for name, qubits, args in gates:
+                expected.apply(name, qubits, *args)
+            for gate in fused:
+                actual.apply_unitary(gate.matrix, gate.qubits)
+            np.testing.assert_allclose(actual.vector, expected.vector, atol=1e-13)
+
+    def test_merging(self):
+        """Test that one-qubit runs are merged into neighboring two-qubit gates."""
+        gates = [
+            ("Rz", [0], [0.1]),
+            ("Sx", [0], []),
+            ("Sy", [2], []),
+            ("Rz", [1], [0.2]),
+            ("MS", [1, 0], [0.3, 1.2]),
+            ("Sz", [1], []),
+            ("Sx", [2], []),
+        ]
+        fused = unitary_fuser().fuse(gates)
+        self.assertEqual([gate.qubits for gate in fused], [(2,), (1, 0)])
+
+    def test_diagonal(self):
+        """Test that runs of diagonal gates are flagged as such."""
+        gates = [("Rz", [0], [0.1]), ("ZZ", [0, 1], [0.2]), ("Sz_stretched", [1], [2])]
+        (fused,) = unitary_fuser().fuse(gates)
+        self.assertTrue(fused.diagonal)
+        np.testing.assert_allclose(fused.matrix, np.diag(np.diagonal(fused.matrix)))
+        (fused,) = unitary_fuser().fuse(gates + [("Sx", [0], [])])
+        self.assertFalse(fused.diagonal)
+
+    def test_memoized(self):
+        """Test that repeated runs reuse the merged unitary."""
+        cache = GateCache()
+        fuser = unitary_fuser(cache=cache)
+        run = [("Rz", [0], [0.5]), ("Sx", [0], []), ("Rz", [0], [-0.5])]
+        first = fuser.fuse(run)[0].matrix
+        second = fuser.fuse([(name, [3], args) for name, _, args in run])[0].matrix
+        self.assertIs(first, second)
+        self.assertEqual(cache.cache_info().hits, 1)
+
+
+class SuperoperatorFuserTester(TestCase):
+    def test_noiseless_matches_unitary(self):
+        """Test that, without noise, the fused superoperators are those of the fused
+        unitaries."""
+        rng = np.random.default_rng(1)
+        model = SNLToy1Model(depolarization=0, rotation_error=0, phase_error=0)
+        gates = random_gates(rng, 3, 40)
+        unitaries = unitary_fuser().fuse(gates)
+        superoperators = superoperator_fuser(model).fuse(gates)
+        self.assertEqual(len(unitaries), len(superoperators))
+        for U, G in zip(unitaries, superoperators):
+            self.assertEqual(U.qubits, G.qubits)
+            matrix = U.matrix
+            if len(U.qubits) == 2:
+                # The first qubit is the least significant bit of the unitary.
+                matrix = SWAP @ matrix @ SWAP
+            np.testing.assert_allclose(G.matrix, pauli_transfer(matrix), atol=1e-13)
+
+    def test_noise_parameters_in_key(self):
+        """Test that changing the noise model is not masked by the cache."""
+        model = SNLToy1Model()
+        fuser = superoperator_fuser(model)
+        gates = [("Sx", [0], []), ("Sy", [0], [])]
+        first = fuser.fuse(gates)[0].matrix
+        model.depolarization = 0.1
+        second = fuser.fuse(gates)[0].matrix
+        self.assertFalse(np.allclose(first, second))
+
+    def test_idle(self):
+        """Test that idle gates are modeled by the idle behavior of the model."""
+        model = SNLToy1Model()
+        (fused,) = superoperator_fuser(model).fuse([("I_Sx", [0], [])])
+        np.testing.assert_array_equal(
+            fused.matrix, model.idle(None, model.gateduration_Sx(None))
+        )
+
+    def test_stretched(self):
+        """Test that stretched gates use their own stretch factor, rather than that of
+        the model."""
+        model = SNLToy1Model(stretched_gates=1.5)
+        fuser = superoperator_fuser(model)
+        for name, args, expected in [
+            ("Sx", [], model.gate_Sx(None, stretch=1.5)),
+            ("Sx_stretched", [2.0], model.gate_Sx(None, stretch=2.0)),
+            (
+                "I_Sx_stretched",
+                [2.0],
+                model.idle(None, model.gateduration_Sx(None, stretch=2.0)),
+            ),
+        ]:
+            (fused,) = fuser.fuse([(name, [0], args)])
+            np.testing.assert_allclose(fused.matrix, expected, rtol=0, atol=1e-15)
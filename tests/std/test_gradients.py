@@ -0,0 +1,172 @@
+from unittest import TestCase
+
+import numpy as np
+
+from jaqalpaq.parser import parse_jaqal_string
+
+from qscout.v1.std import gradients, pauli_transfer, streaming
+from qscout.v1.std.jaqal_action import IDEAL_ACTION, IDEAL_GRADIENTS
+from qscout.v1.std.noisy import SNLToy1Model
+
+ARGS = dict(R=(0.37, 1.1), Rt=(0.37, -1.1), MS=(0.2, 0.9))
+NOISE = dict(depolarization=1e-2, rotation_error=2e-2, phase_error=3e-2)
+
+PROGRAM = """
+from qscout.v1.std usepulses *
+from qscout.v1.std.stretched usepulses *
+register q[2]
+< R q[0] {a} 0.3 | R q[1] 0.1 0.3 >
+MS q[0] q[1] 0.2 {b}
+loop 2 {{ < Rx q[1] {c} | Rx q[0] {c} > }}
+Rz q[0] {d}
+R_stretched q[0] 0.5 -0.7 2.0
+ZZ q[1] q[0] {e}
+< Sx q[0] | Sy q[1] >
+"""
+VALUES = dict(a=0.4, b=0.9, c=-0.5, d=0.3, e=0.8)
+
+
+def _difference(fun, args, step=1e-6):
+    """The central differences of fun with respect to each of args."""
+    derivatives = []
+    for j in range(len(args)):
+        up = list(args)
+        down = list(args)
+        up[j] += step
+        down[j] -= step
+        derivatives.append((fun(*up) - fun(*down)) / (2 * step))
+    return np.array(derivatives)
+
+
+class GradientTester(TestCase):
+    def test_unitaries(self):
+        for name, dU in IDEAL_GRADIENTS.items():
+            args = ARGS.get(name, (0.7,))
+            expected = _difference(IDEAL_ACTION[name], args)
+            np.testing.assert_allclose(dU(*args), expected, rtol=0, atol=1e-9)
+            single = IDEAL_ACTION[name](*args, precision=np.float32)
+            self.assertEqual(dU(*args, precision=np.float32).dtype, single.dtype)
+        # Stacks of angles
+        dU = IDEAL_GRADIENTS["MS"](np.array([0.1, 0.2]), 0.3)
+        self.assertEqual(dU.shape, (2, 2, 4, 4))
+        np.testing.assert_allclose(dU[:, 1], IDEAL_GRADIENTS["MS"](0.2, 0.3))
+
+    def test_ptms(self):
+        for name in ("R", "Rz", "XX", "YY", "ZZ", "MS"):
+            args = ARGS.get(name, (0.7,))
+            PTM = getattr(pauli_transfer, f"PTM_{name}")
+            dPTM = getattr(pauli_transfer, f"dPTM_{name}")
+            expected = _difference(PTM, args)
+            np.testing.assert_allclose(dPTM(*args), expected, rtol=0, atol=1e-9)
+
+    def test_model(self):
+        model = SNLToy1Model(**NOISE)
+        for name, args in [
+            ("R", (0.3, -0.7)),
+            ("Rt", (0.3, 0.7)),
+            ("Rx", (0.4,)),
+            ("Ry", (-0.4,)),
+            ("Rz", (0.4,)),
+            ("XX", (0.5,)),
+            ("YY", (0.5,)),
+            ("ZZ", (-0.5,)),
+            ("MS", (0.1, 0.6)),
+            ("Sx", ()),
+        ]:
+            n = len(model.jaqal_gates[name].quantum_parameters)
+            for stretch in (1, 2.5):
+
+                def gate(*args):
+                    return getattr(model, f"gate_{name}")(
+                        *[None] * n, *args, stretch=stretch
+                    )
+
+                G, dG = model.gradient(name, *args, stretch=stretch)
+                np.testing.assert_allclose(G, gate(*args), rtol=0, atol=1e-14)
+                self.assertEqual(dG.shape, (len(args),) + G.shape)
+                expected = _difference(gate, args).reshape(dG.shape)
+                np.testing.assert_allclose(dG, expected, rtol=0, atol=1e-8)
+
+                def duration(*args):
+                    return getattr(model, f"gateduration_{name}")(
+                        *[None] * n, *args, stretch=stretch
+                    )
+
+                dT = model.duration_gradient(name, *args, stretch=stretch)
+                expected = _difference(duration, args)
+                np.testing.assert_allclose(dT, expected, rtol=0, atol=1e-8)
+
+        G, dG = model.idle_gradient(None, 2.5)
+        np.testing.assert_allclose(G, model.idle(None, 2.5))
+        expected = _difference(lambda T: model.idle(None, T), [2.5])
+        np.testing.assert_allclose(dG, expected, rtol=0, atol=1e-8)
+
+        with self.assertRaises(TypeError):
+            model.gradient("R", 0.1)
+
+    def test_observable(self):
+        circuit = parse_jaqal_string(PROGRAM.format(**VALUES))
+        (final,) = streaming.stream(SNLToy1Model(**NOISE), circuit, every=None)
+        P = streaming.probabilities(final.state)
+        weights = np.array([0.5, 1, -2, 3])
+        O = gradients.observable(weights, 2)
+        self.assertAlmostEqual(np.vdot(O, final.state), weights @ P)
+        with self.assertRaises(ValueError):
+            gradients.observable(weights, 3)
+
+    def test_adjoint(self):
+        model = SNLToy1Model(stretched_gates="add", **NOISE)
+        weights = np.array([0, 1, 0, 2])
+
+        def value(*values):
+            circuit = parse_jaqal_string(PROGRAM.format(**dict(zip(VALUES, values))))
+            (final,) = streaming.stream(model, circuit, every=None)
+            return weights @ streaming.probabilities(final.state)
+
+        circuit = parse_jaqal_string(PROGRAM.format(**VALUES))
+        result = gradients.adjoint_gradient(model, circuit, weights)
+        self.assertAlmostEqual(result.value, value(*VALUES.values()), delta=1e-14)
+
+        names = [gate.name for gate in result.gates]
+        self.assertEqual(
+            names,
+            ["R", "R", "MS", "Rx", "Rx", "Rx", "Rx", "Rz"]
+            + ["R_stretched", "ZZ", "Sx", "Sy"],
+        )
+        self.assertEqual(result.gates[9].qubits, (1, 0))
+        self.assertEqual(len(result.gates[8].gradient), 2)
+        self.assertEqual(len(result.gates[10].gradient), 0)
+        # The derivatives with respect to the values, summed over the gates using them
+        g = [gate.gradient for gate in result.gates]
+        derivatives = [g[0][0], g[2][1], sum(g[i][0] for i in range(3, 7)), g[7][0]]
+        derivatives.append(g[9][0])
+        expected = _difference(value, list(VALUES.values()))
+        np.testing.assert_allclose(derivatives, expected, rtol=0, atol=1e-8)
+
+    def test_idles(self):
+        """Test the derivatives through the durations of the idles the gates set."""
+        model = SNLToy1Model(**NOISE)
+        weights = np.array([0, 1, 0, 2])
+        program = """
+        from qscout.v1.std usepulses *
+        register q[2]
+        Rx q[0] {}
+        Ry q[0] 0.4
+        < Rx q[0] {} | Sy q[1] >
+        loop 2 {{ Ry q[1] {} }}
+        """
+
+        def value(*values):
+            circuit = parse_jaqal_string(program.format(*values))
+            (final,) = streaming.stream(model, circuit, every=None)
+            return weights @ streaming.probabilities(final.state)
+
+        # The idle of q[1] during the lone rotation, the idle of the shorter of the
+        # parallel gates, and the idles of q[0] during the loop
+        values = [0.3, -2.1, 0.6]
+        circuit = parse_jaqal_string(program.format(*values))
+        result = gradients.adjoint_gradient(model, circuit, weights)
+        g = [gate.gradient for gate in result.gates]
+        derivatives = [g[0][0], g[2][0], g[4][0] + g[5][0]]
+        expected = _difference(value, values)
+        np.testing.assert_allclose(derivatives, expected, rtol=0, atol=1e-8)
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+
+class ImportTester(TestCase):
+    def run_python(self, code):
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_lazy_pygsti(self):
+        """Test that pyGSTi is not imported until the emulator is needed."""
+        self.run_python(
+            "import sys\n"
+            "from qscout.v1.std import jaqal_gates, jaqal_action, noisy\n"
+            "from qscout.v1.std.stretched import jaqal_gates, jaqal_action\n"
+            "model = noisy.SNLToy1Model()\n"
+            "model.gate_MS(None, None, 0.0, 1.0)\n"
+            "model.idle(None, 1.0)\n"
+            "assert 'pygsti' not in sys.modules\n"
+            "noisy.SNLToy1\n"
+            "assert 'pygsti' in sys.modules\n"
+        )
+
+    def test_lazy_process_pool(self):
+        """Test that the process pool machinery is not imported until it is used."""
+        self.run_python(
+            "import sys\n"
+            "from qscout.v1.std import parallel\n"
+            "assert 'multiprocessing.shared_memory' not in sys.modules\n"
+            "assert 'concurrent.futures.process' not in sys.modules\n"
+        )
+
+    def test_lazy_evaluators(self):
+        """Test that the noise model does not import the evaluators of circuits."""
+        self.run_python(
+            "import sys\n"
+            "from qscout.v1.std import noisy\n"
+            "assert 'qscout.v1.std.compact' not in sys.modules\n"
+            "assert 'qscout.v1.std.parallel' not in sys.modules\n"
+            "assert 'concurrent.futures' not in sys.modules\n"
+        )
+
+    def test_pickle_emulator_class(self):
+        """Test that the lazily defined emulator class can be found by name."""
+        self.run_python(
+            "import pickle\n"
+            "from qscout.v1.std.noisy import SNLToy1\n"
+            "assert pickle.loads(pickle.dumps(SNLToy1)) is SNLToy1\n"
+            "assert SNLToy1.__qualname__ == 'SNLToy1'\n"
+        )
@@ -0,0 +1,109 @@
+from unittest import TestCase
+
+import numpy as np
+
+from jaqalpaq.parser import parse_jaqal_string
+
+from qscout.v1.std import compact
+from qscout.v1.std.cache import GateCache
+from qscout.v1.std.instrument import Instrumentation
+from qscout.v1.std.noisy import SNLToy1Model
+
+
+class InstrumentationTester(TestCase):
+    def test_uninstrumented(self):
+        """Test that models built without instrumentation are left untouched."""
+        model = SNLToy1Model()
+        self.assertNotIn("gate_R", vars(model))
+        self.assertNotIn("idle", vars(model))
+
+    def test_counts(self):
+        instrumentation = Instrumentation()
+        model = SNLToy1Model(instrumentation=instrumentation)
+        for _ in range(3):
+            model.gate_MS(None, None, 0.1, 0.2)
+        model.gateduration_MS(None, None, 0.1, 0.2)
+        model.idle(None, 1.25)
+        model.idle(None, 1.25)
+
+        report = instrumentation.report()
+        gate = report["methods"]["gate_MS"]
+        self.assertEqual(gate["calls"], 3)
+        self.assertEqual(gate["allocations"], 3)
+        self.assertEqual(gate["allocated_bytes"], 3 * 16 * 16 * 8)
+        self.assertGreater(gate["time"], 0)
+        self.assertEqual(report["methods"]["gateduration_MS"]["calls"], 1)
+        self.assertEqual(report["gates"]["MS"]["calls"], 4)
+        self.assertLessEqual(gate["self_time"], gate["time"])
+        # The idle matrix is shared, and not allocated anew.
+        self.assertEqual(report["methods"]["idle"]["allocations"], 0)
+        self.assertEqual(report["caches"]["idle_matrix"]["hits"], 1)
+        self.assertNotIn("gate_R", report["methods"])
+
+    def test_compact(self):
+        """Test that evaluating a compact circuit through the compiled spec is
+        recorded."""
+        instrumentation = Instrumentation()
+        model = SNLToy1Model(instrumentation=instrumentation)
+        circuit = parse_jaqal_string(
+            "from qscout.v1.std usepulses *\n"
+            "register q[2]\n"
+            "prepare_all\nSx q[0]\nMS q[0] q[1] 0.1 0.7\nR q[1] 0.2 0.3\nmeasure_all\n"
+        )
+        tables, rows, durations = compact.superoperators(
+            compact.from_circuit(circuit), model
+        )
+        report = instrumentation.report()
+        method = report["methods"]["superoperators"]
+        self.assertEqual(method["calls"], 1)
+        self.assertGreater(method["time"], 0)
+        # The tables of one- and two-qubit gates, the rows, and the durations
+        self.assertEqual(method["allocations"], 4)
+        self.assertEqual(
+            method["allocated_bytes"],
+            tables[1].nbytes + tables[2].nbytes + rows.nbytes + durations.nbytes,
+        )
+        self.assertNotIn("superoperators", report["gates"])
+        self.assertEqual(report["time"], method["self_time"])
+
+        model.batch_gate("R", [0.1, 0.2], 0.3)
+        method = instrumentation.report()["methods"]["batch_gate"]
+        self.assertEqual((method["calls"], method["allocations"]), (1, 1))
+        self.assertEqual(method["allocated_bytes"], 2 * 4 * 4 * 8)
+
+    def test_cache(self):
+        instrumentation = Instrumentation()
+        model = SNLToy1Model(cache=GateCache(), instrumentation=instrumentation)
+        for _ in range(4):
+            model.gate_Sx(None)
+        cache = instrumentation.report()["caches"]["gates"]
+        self.assertEqual((cache["hits"], cache["misses"]), (3, 1))
+        self.assertEqual(cache["hit_rate"], 0.75)
+        # Cached matrices are read-only, and not counted as allocations.
+        self.assertEqual(
+            instrumentation.report()["methods"]["gate_Sx"]["allocations"], 0
+        )
+
+    def test_recording(self):
+        instrumentation = Instrumentation(enabled=False)
+        model = SNLToy1Model(instrumentation=instrumentation)
+        model.gate_R(None, 0.1, 0.2)
+        self.assertEqual(instrumentation.report()["methods"], {})
+        with instrumentation.recording():
+            G = model.gate_R(None, 0.1, 0.2)
+        np.testing.assert_array_equal(G, SNLToy1Model().gate_R(None, 0.1, 0.2))
+        self.assertEqual(instrumentation.report()["methods"]["gate_R"]["calls"], 1)
+        self.assertFalse(instrumentation.enabled)
+
+    def test_sections_and_reset(self):
+        instrumentation = Instrumentation()
+        model = SNLToy1Model(instrumentation=instrumentation)
+        with instrumentation.section("build"):
+            model.gate_Sy(None)
+        report = instrumentation.report()
+        self.assertGreaterEqual(report["sections"]["build"], report["time"])
+        self.assertIn("gate_Sy", str(instrumentation))
+        instrumentation.reset()
+        report = instrumentation.report()
+        self.assertEqual(report["methods"], {})
+        self.assertEqual(report["sections"], {})
@@ -0,0 +1,156 @@
+from unittest import TestCase
+
+import numpy as np
+
+from qscout.v1.std.jaqal_action import (
+    IDEAL_ACTION,
+    DIAGONAL_ACTION,
+    STRUCTURE,
+    U_R,
+    U_MS,
+    U_XX,
+    U_YY,
+    U_ZZ,
+    U_Rx,
+    U_Ry,
+    U_Rz,
+)
+
+
+def expm_hermitian(H, t):
+    """exp(-i t H) for a Hermitian matrix H."""
+    w, v = np.linalg.eigh(H)
+    return (v * np.exp(-1j * t * w)) @ v.conj().T
+
+
+X = np.array([[0, 1], [1, 0]])
+Y = np.array([[0, -1j], [1j, 0]])
+Z = np.diag([1, -1])
+
+
+class UnitaryGeneratorTester(TestCase):
+    one_angle = dict(U_XX=U_XX, U_YY=U_YY, U_ZZ=U_ZZ, U_Rx=U_Rx, U_Ry=U_Ry, U_Rz=U_Rz)
+    two_angles = dict(U_R=U_R, U_MS=U_MS)
+
+    def test_scalar_matches_rotation(self):
+        """Test that scalar calls produce the documented rotations."""
+        phi, theta = 0.3, 1.1
+        n = np.cos(phi) * X + np.sin(phi) * Y
+        np.testing.assert_allclose(U_R(phi, theta), expm_hermitian(n, theta / 2))
+        np.testing.assert_allclose(
+            U_MS(phi, theta), expm_hermitian(np.kron(n, n), theta / 2), atol=1e-15
+        )
+        np.testing.assert_allclose(
+            U_XX(theta), expm_hermitian(np.kron(X, X), theta / 2), atol=1e-15
+        )
+        np.testing.assert_allclose(
+            U_YY(theta), expm_hermitian(np.kron(Y, Y), theta / 2), atol=1e-15
+        )
+        np.testing.assert_allclose(
+            U_ZZ(theta), expm_hermitian(np.kron(Z, Z), theta / 2), atol=1e-15
+        )
+        np.testing.assert_allclose(U_Rx(theta), expm_hermitian(X, theta / 2))
+        np.testing.assert_allclose(U_Ry(theta), expm_hermitian(Y, theta / 2))
+        np.testing.assert_allclose(
+            U_Rz(theta), np.exp(0.5j * theta) * expm_hermitian(Z, theta / 2)
+        )
+
+    def test_scalar_types(self):
+        """Test that scalar calls keep returning single matrices of the same dtype."""
+        for name, fun in self.one_angle.items():
+            U = fun(0.5)
+            dim = 4 if name in ("U_XX", "U_YY", "U_ZZ") else 2
+            self.assertEqual(U.shape, (dim, dim))
+            self.assertEqual(U.dtype, float if name == "U_Ry" else complex)
+        for fun in self.two_angles.values():
+            self.assertEqual(fun(0.5, 0.25).dtype, complex)
+
+    def test_batched_matches_scalar(self):
+        """Test that broadcast angle arrays produce stacks of the scalar results."""
+        rng = np.random.default_rng(0)
+        axis = rng.uniform(-np.pi, np.pi, size=(3, 1))
+        angles = rng.uniform(-np.pi, np.pi, size=(4,))
+        for fun in self.one_angle.values():
+            stack = fun(angles)
+            self.assertEqual(stack.shape[:1], (4,))
+            for i, angle in enumerate(angles):
+                np.testing.assert_array_equal(stack[i], fun(angle))
+        for fun in self.two_angles.values():
+            stack = fun(axis, angles)
+            self.assertEqual(stack.shape[:2], (3, 4))
+            for i in range(3):
+                for j in range(4):
+                    np.testing.assert_array_equal(
+                        stack[i, j], fun(axis[i, 0], angles[j])
+                    )
+
+    def test_batched_unitary(self):
+        """Test that every matrix in a batch is unitary."""
+        angles = np.linspace(-2 * np.pi, 2 * np.pi, 17)
+        for fun in self.one_angle.values():
+            for U in fun(angles):
+                np.testing.assert_allclose(U @ U.conj().T, np.eye(len(U)), atol=1e-14)
+        for fun in self.two_angles.values():
+            for U in fun(angles[::-1], angles):
+                np.testing.assert_allclose(U @ U.conj().T, np.eye(len(U)), atol=1e-14)
+
+
+class IdealActionTester(TestCase):
+    fixed = dict(
+        Px=(U_Rx, np.pi),
+        Py=(U_Ry, np.pi),
+        Pz=(U_Rz, np.pi),
+        Sx=(U_Rx, np.pi / 2),
+        Sy=(U_Ry, np.pi / 2),
+        Sz=(U_Rz, np.pi / 2),
+        Sxd=(U_Rx, -np.pi / 2),
+        Syd=(U_Ry, -np.pi / 2),
+        Szd=(U_Rz, -np.pi / 2),
+        Sxx=(U_XX, np.pi / 2),
+        Sxxd=(U_XX, -np.pi / 2),
+        Syy=(U_YY, np.pi / 2),
+        Syyd=(U_YY, -np.pi / 2),
+        Szz=(U_ZZ, np.pi / 2),
+        Szzd=(U_ZZ, -np.pi / 2),
+    )
+
+    def test_fixed_gates(self):
+        """Test that fixed-angle gates are shared, read-only copies of their rotation."""
+        for name, (fun, angle) in self.fixed.items():
+            U = IDEAL_ACTION[name]()
+            np.testing.assert_array_equal(U, fun(angle))
+            self.assertIs(U, IDEAL_ACTION[name]())
+            self.assertFalse(U.flags.writeable)
+            with self.assertRaises(ValueError):
+                U[0, 0] = 0
+
+
+class StructureTester(TestCase):
+    n_params = dict(R=2, Rt=2, Rx=1, Ry=1, Rz=1, XX=1, YY=1, ZZ=1, MS=2)
+
+    def test_patterns(self):
+        """Test that the unitaries vanish outside of the declared structure."""
+        rng = np.random.default_rng(0)
+        for name, structure in STRUCTURE.items():
+            for _ in range(5):
+                args = rng.uniform(-4, 4, self.n_params.get(name, 0))
+                U = IDEAL_ACTION[name](*args)
+                self.assertEqual(U.shape, structure.pattern.shape)
+                np.testing.assert_allclose(U[~structure.pattern], 0, atol=1e-15)
+                if structure.permutation is not None:
+                    columns = np.arange(len(U))
+                    P = np.abs(U[structure.permutation, columns])
+                    np.testing.assert_allclose(P, 1)
+                if structure.commutes_with_z:
+                    ZZ = np.diag([1, -1]) if len(U) == 2 else np.diag([1, -1, -1, 1])
+                    np.testing.assert_allclose(U @ ZZ, ZZ @ U, atol=1e-15)
+            self.assertEqual(structure.diagonal, name in DIAGONAL_ACTION)
+
+    def test_diagonal_action(self):
+        """Test that the diagonals generated are exactly those of the unitaries."""
+        angles = np.linspace(-2 * np.pi, 2 * np.pi, 7)
+        for name, fun in DIAGONAL_ACTION.items():
+            args = [angles] * self.n_params.get(name, 0)
+            np.testing.assert_array_equal(
+                fun(*args), np.diagonal(IDEAL_ACTION[name](*args), axis1=-2, axis2=-1)
+            )
@@ -0,0 +1,129 @@
+from unittest import TestCase
+
+import numpy as np
+
+from qscout.v1.std.noisy import SNLToy1, SNLToy1Model
+
+
+class BatchGateTester(TestCase):
+    def setUp(self):
+        self.model = SNLToy1Model()
+        rng = np.random.default_rng(0)
+        self.N = N = 10
+        self.noise = dict(
+            depolarization=rng.uniform(0, 2e-2, N),
+            rotation_error=rng.uniform(-5e-2, 5e-2, N),
+            phase_error=rng.uniform(-5e-2, 5e-2, N),
+        )
+        self.stretch = rng.uniform(0.5, 2, N)
+        self.angles = rng.uniform(-4, 4, size=(2, N))
+
+    def test_matches_gates(self):
+        """Test that every element of a batch matches the corresponding gate_* call."""
+        for name, gate in self.model.jaqal_gates.items():
+            try:
+                fun = getattr(SNLToy1Model, f"gate_{name}")
+            except AttributeError:
+                continue
+            args = self.angles[: len(gate.classical_parameters)]
+            qubits = [None] * len(gate.quantum_parameters)
+            batch = self.model.batch_gate(
+                name, *args, stretch=self.stretch, **self.noise
+            )
+            self.assertEqual(len(batch), self.N)
+            for i in range(self.N):
+                model = SNLToy1Model(**{k: v[i] for k, v in self.noise.items()})
+                G = fun(model, *qubits, *args[:, i], stretch=self.stretch[i])
+                np.testing.assert_allclose(batch[i], G, rtol=0, atol=1e-14)
+
+    def test_grid(self):
+        """Test that parameters are broadcast against each other."""
+        depolarization = np.linspace(0, 1e-2, 3)[:, None]
+        angle = np.linspace(0, np.pi, 4)
+        batch = self.model.batch_gate("MS", 0.0, angle, depolarization=depolarization)
+        self.assertEqual(batch.shape, (12, 16, 16))
+        np.testing.assert_allclose(
+            batch[5],
+            SNLToy1Model(depolarization=depolarization[1, 0]).gate_MS(
+                None, None, 0.0, angle[1]
+            ),
+            rtol=0,
+            atol=1e-14,
+        )
+
+    def test_fixed(self):
+        """Test that fixed gates are batched over the noise parameters."""
+        batch = self.model.batch_gate("Sx", **self.noise)
+        self.assertEqual(batch.shape, (self.N, 4, 4))
+        self.assertEqual(
+            self.model.batch_gate("Sz", **self.noise).shape, (self.N, 4, 4)
+        )
+
+    def test_arguments(self):
+        with self.assertRaises(TypeError):
+            self.model.batch_gate("R", 0.0)
+        with self.assertRaises(TypeError):
+            self.model.batch_gate("Sx", dephasing=0.1)
+
+
+class IdleTester(TestCase):
+    def test_matches_depolarization(self):
+        model = SNLToy1Model(depolarization=2e-2)
+        for duration in (0, 0.5, 1, 10):
+            d = (1 - 2e-2) ** duration
+            np.testing.assert_array_equal(
+                model.idle(None, duration), np.diag([1, d, d, d])
+            )
+            self.assertEqual(model.idle(None, duration).dtype, float)
+
+    def test_arrays(self):
+        """Test that arrays of durations give stacks of idle matrices."""
+        durations = np.array([[0, 0.5], [1, 10]])
+        model = SNLToy1Model(depolarization=2e-2)
+        G = model.idle(None, durations)
+        self.assertEqual(G.shape, (2, 2, 4, 4))
+        for index in np.ndindex(durations.shape):
+            np.testing.assert_array_equal(G[index], model.idle(None, durations[index]))
+        self.assertEqual(model.idle(None, np.arange(2)).dtype, float)
+        single = SNLToy1Model(precision=np.float32)
+        self.assertEqual(single.idle(None, durations).dtype, np.float32)
+
+    def test_composition(self):
+        """Test that consecutive idles compose by adding their durations."""
+        model = SNLToy1Model()
+        np.testing.assert_allclose(
+            model.idle(None, 1.5) @ model.idle(None, 2.25), model.idle(None, 3.75)
+        )
+        self.assertAlmostEqual(
+            model.idle_decay(None, 1.5) * model.idle_decay(None, 2.25),
+            model.idle_decay(None, 3.75),
+        )
+
+    def test_cached(self):
+        """Test that idle matrices are shared, but respect the noise parameters."""
+        model = SNLToy1Model()
+        G = model.idle(None, 2.0)
+        self.assertIs(G, model.idle(None, 2.0))
+        self.assertFalse(G.flags.writeable)
+        model.depolarization = 0.5
+        np.testing.assert_array_equal(
+            model.idle(None, 2.0), np.diag([1, 0.25, 0.25, 0.25])
+        )
+
+    def test_array_durations(self):
+        model = SNLToy1Model()
+        durations = np.array([0.5, 1, 2])
+        np.testing.assert_array_equal(
+            model.idle_decay(None, durations), (1 - model.depolarization) ** durations
+        )
+
+
+class StretchedGatesTester(TestCase):
+    def test_kept(self):
+        """Test that the emulator keeps stretched_gates after building its model."""
+        for stretched_gates in (None, "add", 1.5):
+            backend = SNLToy1(2, stretched_gates=stretched_gates)
+            self.assertEqual(backend.stretched_gates, stretched_gates)
+            self.assertEqual(
+                "MS_stretched" in backend.gate_durations, stretched_gates == "add"
+            )
@@ -0,0 +1,130 @@
+import sys
+from unittest import TestCase, mock
+
+import numpy as np
+
+from jaqalpaq.parser import parse_jaqal_string
+
+from qscout.v1.std.noisy import SNLToy1Model
+from qscout.v1.std.parallel import build_superoperator_table, gate_instances
+
+PROGRAMS = [
+    """
+from qscout.v1.std usepulses *
+from qscout.v1.std.stretched usepulses *
+
+let a 0.5
+register q[2]
+
+macro foo x y { R q[0] x y }
+
+prepare_all
+foo a 0.25
+< Sx q[0] | Rz q[1] a >
+loop 2 { MS q[0] q[1] a 1 }
+I_Sy q[1]
+measure_all
+""",
+    """
+from qscout.v1.std usepulses *
+from qscout.v1.std.stretched usepulses *
+
+register q[3]
+
+prepare_all
+R q[2] 0.5 0.25
+Sx_stretched q[0] 1.5
+I_MS_stretched q[0] q[2] 0.1 0.4 2
+Szz q[1] q[2]
+XX q[0] q[1] 0.7
+measure_all
+""",
+]
+
+
+class GateInstanceTester(TestCase):
+    def test_instances(self):
+        circuit = parse_jaqal_string(PROGRAMS[0])
+        self.assertEqual(
+            gate_instances(circuit),
+            {
+                ("prepare_all", ()),
+                ("R", (0.5, 0.25)),
+                ("Sx", ()),
+                ("Rz", (0.5,)),
+                ("MS", (0.5, 1.0)),
+                ("I_Sy", ()),
+                ("measure_all", ()),
+            },
+        )
+
+
+class SuperoperatorTableTester(TestCase):
+    def setUp(self):
+        self.model = SNLToy1Model(depolarization=2e-2)
+        self.circuits = [parse_jaqal_string(program) for program in PROGRAMS]
+
+    def expected(self, name, args):
+        model = self.model
+        n_qubits = len(model.jaqal_gates[name].quantum_parameters)
+        qubits = [None] * n_qubits
+        base = name.replace("_stretched", "")
+        if base.startswith("I_"):
+            duration = getattr(model, f"gateduration_{base[2:]}")(*qubits, *args)
+            G = model.idle(None, duration)
+            return (G if n_qubits == 1 else np.kron(G, G)), duration
+        return (
+            getattr(model, f"gate_{base}")(*qubits, *args),
+            getattr(model, f"gateduration_{base}")(*qubits, *args),
+        )
+
+    def check(self, table):
+        self.assertEqual(len(table), 9)
+        for name, args in table.instances:
+            G, duration = self.expected(name, args)
+            np.testing.assert_allclose(
+                table.superoperator(name, args), G, rtol=0, atol=1e-14
+            )
+            self.assertAlmostEqual(table.duration(name, args), duration)
+
+    def test_serial(self):
+        self.check(build_superoperator_table(self.model, self.circuits, max_workers=1))
+
+    def test_pool(self):
+        """Test that the process pool (with shared memory) produces the same table."""
+        table = build_superoperator_table(
+            self.model, self.circuits, max_workers=2, chunksize=1
+        )
+        self.check(table)
+        serial = build_superoperator_table(self.model, self.circuits, max_workers=1)
+        for name, args in table.instances:
+            np.testing.assert_array_equal(
+                table.superoperator(name, args), serial.superoperator(name, args)
+            )
+
+    def test_without_shared_memory(self):
+        """Test that, without shared memory (before Python 3.8), only the process pool
+        is unavailable."""
+        with mock.patch.dict(sys.modules, {"multiprocessing.shared_memory": None}):
+            with self.assertRaises(RuntimeError):
+                build_superoperator_table(self.model, self.circuits, max_workers=2)
+            self.check(
+                build_superoperator_table(self.model, self.circuits, max_workers=1)
+            )
+
+    def test_circuit_model(self):
+        table = build_superoperator_table(self.model, self.circuits, max_workers=1)
+        model = table.circuit_model(1)
+        self.assertEqual(
+            set(model),
+            {
+                ("R", (0.5, 0.25)),
+                ("Sx_stretched", (1.5,)),
+                ("I_MS_stretched", (0.1, 0.4, 2.0)),
+                ("Szz", ()),
+                ("XX", (0.7,)),
+            },
+        )
+        G, duration = model["XX", (0.7,)]
+        self.assertEqual(G.shape, (16, 16))
+        self.assertAlmostEqual(duration, 10 * 0.7 / (np.pi / 2))
@@ -0,0 +1,109 @@
+from unittest import TestCase
+
+import numpy as np
+import pygsti
+
+from qscout.v1.std.jaqal_action import U_R, U_MS, U_XX, U_YY, U_ZZ, U_Rz
+from qscout.v1.std.pauli_transfer import (
+    PTM_R,
+    PTM_MS,
+    PTM_XX,
+    PTM_YY,
+    PTM_ZZ,
+    PTM_Rz,
+    depolarized,
+)
+from qscout.v1.std.noisy import SNLToy1
+
+
+class PauliTransferTester(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.angles = rng.uniform(-2 * np.pi, 2 * np.pi, size=(20, 2))
+
+    def test_matches_pygsti(self):
+        """Test that the closed forms agree with pyGSTi's generic conversion."""
+        for axis, angle in self.angles:
+            for U, G in [
+                (U_R(axis, angle), PTM_R(axis, angle)),
+                (U_MS(axis, angle), PTM_MS(axis, angle)),
+                (U_XX(angle), PTM_XX(angle)),
+                (U_YY(angle), PTM_YY(angle)),
+                (U_ZZ(angle), PTM_ZZ(angle)),
+                (U_Rz(angle), PTM_Rz(angle)),
+            ]:
+                np.testing.assert_allclose(
+                    G, pygsti.unitary_to_pauligate(U), rtol=0, atol=1e-12
+                )
+
+    def test_batched(self):
+        """Test that arrays of angles produce stacks of the scalar results."""
+        axis, angle = self.angles.T
+        for i, G in enumerate(PTM_MS(axis, angle)):
+            np.testing.assert_array_equal(G, PTM_MS(axis[i], angle[i]))
+        for i, G in enumerate(PTM_R(axis, angle)):
+            np.testing.assert_array_equal(G, PTM_R(axis[i], angle[i]))
+        self.assertEqual(PTM_ZZ(angle.reshape(4, 5)).shape, (4, 5, 16, 16))
+
+    def test_depolarized(self):
+        """Test that depolarization is applied before the gate."""
+        d = 0.9
+        D = np.diag([1, d, d, d])
+        G = PTM_R(0.2, 0.3)
+        np.testing.assert_allclose(depolarized(G, d), G @ D, rtol=0, atol=1e-15)
+        G = PTM_MS(0.2, 0.3)
+        np.testing.assert_allclose(
+            depolarized(G, d), G @ np.kron(D, D), rtol=0, atol=1e-15
+        )
+
+
+class SNLToy1PauliTransferTester(TestCase):
+    """Compares SNLToy1 to its original construction through pyGSTi."""
+
+    def setUp(self):
+        self.emulator = SNLToy1(2, depolarization=1e-2, rotation_error=3e-2)
+
+    def reference(self, U, duration, n_qubits):
+        d = (1 - self.emulator.depolarization) ** duration
+        D = np.diag([1, d, d, d])
+        if n_qubits == 2:
+            D = np.kron(D, D)
+        return pygsti.unitary_to_pauligate(U) @ D
+
+    def test_gates(self):
+        emu = self.emulator
+        eps, phi = emu.rotation_error, emu.phase_error
+        for axis, angle, stretch in [(0.1, 0.7, 1), (-2.0, np.pi / 2, 2.5)]:
+            dur = stretch * abs(angle) / (np.pi / 2)
+            np.testing.assert_allclose(
+                emu.gate_R(None, axis, angle, stretch=stretch),
+                self.reference(U_R(axis + phi, angle + eps * dur), dur, 1),
+                rtol=0,
+                atol=1e-12,
+            )
+            dur *= 10
+            for gate, U in [(emu.gate_XX, U_XX), (emu.gate_YY, U_YY)]:
+                np.testing.assert_allclose(
+                    gate(None, None, angle, stretch=stretch),
+                    self.reference(U(angle + eps * dur), dur, 2),
+                    rtol=0,
+                    atol=1e-12,
+                )
+            np.testing.assert_allclose(
+                emu.gate_ZZ(None, None, angle, stretch=stretch),
+                self.reference(U_ZZ(angle + eps * dur), dur, 2),
+                rtol=0,
+                atol=1e-12,
+            )
+            np.testing.assert_allclose(
+                emu.gate_MS(None, None, axis, angle, stretch=stretch),
+                self.reference(U_MS(axis + phi, angle + eps * dur), dur, 2),
+                rtol=0,
+                atol=1e-12,
+            )
+            np.testing.assert_allclose(
+                emu.gate_Rz(None, angle),
+                pygsti.unitary_to_pauligate(U_Rz(angle)),
+                rtol=0,
+                atol=1e-12,
+            )
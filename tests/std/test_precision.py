@@ -0,0 +1,185 @@
+from unittest import TestCase
+
+import numpy as np
+
+from jaqalpaq.parser import parse_jaqal_string
+from jaqalpaq.run import run_jaqal_string
+from jaqalpaq.emulator.unitary import UnitarySerializedEmulator
+
+from qscout.v1.std import jaqal_action, pauli_transfer
+from qscout.v1.std.cache import GateCache
+from qscout.v1.std.fusion import unitary_fuser
+from qscout.v1.std.noisy import SNLToy1, SNLToy1Model
+from qscout.v1.std.parallel import build_superoperator_table
+from qscout.v1.std.statevector import StateVector, StatevectorEmulator
+
+# The accuracy expected of single precision
+ATOL = 1e-6
+
+PROGRAM = """
+from qscout.v1.std usepulses *
+from qscout.v1.std.stretched usepulses *
+
+register q[3]
+
+prepare_all
+Sx q[0]
+< Sy q[1] | Pz q[2] >
+Sxx q[0] q[1]
+MS q[1] q[2] 0.3 0.7
+Szzd q[0] q[2]
+R_stretched q[2] 0.1 0.4 1.5
+Szd q[1]
+Px q[0]
+measure_all
+"""
+
+
+class GeneratorPrecisionTester(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.angles = rng.uniform(-4, 4, (2, 50))
+
+    def check(self, generator, n_args, real=False):
+        args = self.angles[:n_args]
+        double = generator(*args)
+        single = generator(*args, precision=np.float32)
+        self.assertEqual(single.dtype, np.float32 if real else np.complex64)
+        np.testing.assert_allclose(single, double, rtol=0, atol=ATOL)
+        np.testing.assert_array_equal(generator(*args, precision=np.float64), double)
+
+    def test_unitaries(self):
+        self.check(jaqal_action.U_R, 2)
+        self.check(jaqal_action.U_MS, 2)
+        self.check(jaqal_action.U_Ry, 1, real=True)
+        for generator in ("U_XX", "U_YY", "U_ZZ", "U_Rx", "U_Rz", "D_Rz", "D_ZZ"):
+            self.check(getattr(jaqal_action, generator), 1)
+
+    def test_ptms(self):
+        self.check(pauli_transfer.PTM_R, 2, real=True)
+        self.check(pauli_transfer.PTM_MS, 2, real=True)
+        for generator in ("PTM_Rz", "PTM_XX", "PTM_YY", "PTM_ZZ"):
+            self.check(getattr(pauli_transfer, generator), 1, real=True)
+
+    def test_with_precision(self):
+        action = jaqal_action.with_precision(jaqal_action.IDEAL_ACTION, np.float32)
+        self.assertEqual(set(action), set(jaqal_action.IDEAL_ACTION))
+        for name, fun in action.items():
+            if fun is None:
+                self.assertIsNone(jaqal_action.IDEAL_ACTION[name])
+                continue
+            n_args = len(jaqal_action.ALL_GATES[name].classical_parameters)
+            args = self.angles[:n_args, 0]
+            U = fun(*args)
+            self.assertIn(U.dtype, (np.float32, np.complex64))
+            np.testing.assert_allclose(
+                U, jaqal_action.IDEAL_ACTION[name](*args), rtol=0, atol=ATOL
+            )
+        # Constants are still generated only once.
+        self.assertIs(action["Sx"](), action["Sx"]())
+
+
+class ModelPrecisionTester(TestCase):
+    def setUp(self):
+        self.double = SNLToy1Model(depolarization=1e-2)
+        self.single = SNLToy1Model(depolarization=1e-2, precision=np.float32)
+
+    def test_gates(self):
+        for name, gate in SNLToy1Model.jaqal_gates.items():
+            fun = getattr(self.single, f"gate_{name}", None)
+            if fun is None:
+                continue
+            qubits = [None] * len(gate.quantum_parameters)
+            args = [0.3, 1.2][: len(gate.classical_parameters)]
+            G = fun(*qubits, *args)
+            self.assertEqual(G.dtype, np.float32)
+            np.testing.assert_allclose(
+                G,
+                getattr(self.double, f"gate_{name}")(*qubits, *args),
+                rtol=0,
+                atol=ATOL,
+            )
+
+    def test_idle(self):
+        G = self.single.idle(None, 2.5)
+        self.assertEqual(G.dtype, np.float32)
+        np.testing.assert_allclose(G, self.double.idle(None, 2.5), rtol=0, atol=ATOL)
+        self.assertEqual(self.double.idle(None, 2.5).dtype, np.float64)
+
+    def test_batch_gate(self):
+        G = self.single.batch_gate("MS", np.linspace(0, 1, 5), 0.5, stretch=2)
+        self.assertEqual(G.dtype, np.float32)
+        np.testing.assert_allclose(
+            G,
+            self.double.batch_gate("MS", np.linspace(0, 1, 5), 0.5, stretch=2),
+            rtol=0,
+            atol=ATOL,
+        )
+
+    def test_shared_cache(self):
+        """Test that models of different precisions can share a cache."""
+        cache = GateCache()
+        double = SNLToy1Model(cache=cache)
+        single = SNLToy1Model(cache=cache, precision=np.float32)
+        self.assertEqual(double.gate_Sx(None).dtype, np.float64)
+        self.assertEqual(single.gate_Sx(None).dtype, np.float32)
+
+    def test_superoperator_table(self):
+        circuit = parse_jaqal_string(PROGRAM)
+        double = build_superoperator_table(self.double, [circuit], max_workers=1)
+        single = build_superoperator_table(self.single, [circuit], max_workers=1)
+        self.assertEqual(single.tables[2].dtype, np.float32)
+        for name, args in double.instances:
+            np.testing.assert_allclose(
+                single.superoperator(name, args),
+                double.superoperator(name, args),
+                rtol=0,
+                atol=ATOL,
+            )
+
+
+class SimulatorPrecisionTester(TestCase):
+    def test_state_vector(self):
+        rng = np.random.default_rng(1)
+        double = StateVector(6)
+        single = StateVector(6, precision=np.float32)
+        self.assertEqual(single.vector.nbytes, double.vector.nbytes // 2)
+        for _ in range(100):
+            qubits = [int(q) for q in rng.permutation(6)[:2]]
+            args = rng.uniform(-4, 4, 2)
+            for state in (double, single):
+                state.apply("MS", qubits, *args)
+                state.apply("R", qubits[:1], *args)
+                state.apply("Rz", qubits[1:], args[0])
+        self.assertEqual(single.vector.dtype, np.complex64)
+        np.testing.assert_allclose(single.vector, double.vector, rtol=0, atol=1e-5)
+
+    def test_emulators(self):
+        reference = run_jaqal_string(PROGRAM, backend=UnitarySerializedEmulator())
+        reference = reference.subcircuits[0].probability_by_int
+        for backend in [
+            # Single precision
+            StatevectorEmulator(
+                precision=np.float32, fuser=unitary_fuser(precision=np.float32)
+            ),
+            # Mixed precision: single-precision unitaries, double-precision state
+            StatevectorEmulator(fuser=unitary_fuser(precision=np.float32)),
+        ]:
+            result = run_jaqal_string(PROGRAM, backend=backend)
+            np.testing.assert_allclose(
+                result.subcircuits[0].probability_by_int, reference, rtol=0, atol=ATOL
+            )
+
+    def test_noisy_emulator(self):
+        """Test that the superoperators are handed to pyGSTi in double precision."""
+        reference = run_jaqal_string(PROGRAM, backend=SNLToy1(3, stretched_gates="add"))
+        result = run_jaqal_string(
+            PROGRAM,
+            backend=SNLToy1(3, stretched_gates="add", precision=np.float32),
+        )
+        np.testing.assert_allclose(
+            result.subcircuits[0].probability_by_int,
+            reference.subcircuits[0].probability_by_int,
+            rtol=0,
+            atol=ATOL,
+        )
@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+import numpy as np
+
+from jaqalpaq.run import run_jaqal_string
+
+from qscout.v1.std import sampling
+
+PROGRAM = """
+from qscout.v1.std usepulses *
+register q[2]
+prepare_all
+R q[0] 0.3 0.7
+MS q[0] q[1] 0.2 0.9
+measure_all
+prepare_all
+Sx q[1]
+measure_all
+"""
+
+
+class SamplingTester(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        P = rng.random((3, 16)) ** 4
+        P[1, 5:] = 0
+        P[2] = 0
+        P[2, 7] = 1
+        self.P = P / P.sum(axis=1, keepdims=True)
+
+    def test_alias_table(self):
+        table = sampling.AliasTable(self.P)
+        n = table.n_outcomes
+        # Every column contributes its threshold to itself, and the rest to its alias.
+        recovered = np.zeros_like(self.P)
+        for row in range(len(self.P)):
+            np.add.at(recovered[row], np.arange(n), table.threshold[row])
+            np.add.at(recovered[row], table.alias[row], 1 - table.threshold[row])
+        np.testing.assert_allclose(recovered / n, self.P, rtol=0, atol=1e-12)
+        self.assertTrue(np.all((table.threshold >= 0) & (table.threshold <= 1)))
+
+    def test_distribution(self):
+        shots = 200000
+        for method in ("alias", "cdf"):
+            outcomes = sampling.sample_shots(self.P, shots, seed=1, method=method)
+            self.assertEqual(outcomes.shape, (3, shots))
+            self.assertEqual(outcomes.dtype, np.uint8)
+            frequencies = np.array([np.bincount(o, minlength=16) for o in outcomes])
+            np.testing.assert_allclose(frequencies / shots, self.P, rtol=0, atol=5e-3)
+            self.assertTrue(np.all(outcomes[1] < 5))
+            self.assertTrue(np.all(outcomes[2] == 7))
+        counts = sampling.sample_counts(self.P, shots, seed=1)
+        self.assertEqual(counts.shape, self.P.shape)
+        np.testing.assert_array_equal(counts.sum(axis=1), shots)
+        np.testing.assert_allclose(counts / shots, self.P, rtol=0, atol=5e-3)
+
+    def test_seed(self):
+        first = sampling.sample_shots(self.P, 100, seed=2)
+        np.testing.assert_array_equal(first, sampling.sample_shots(self.P, 100, seed=2))
+        chunks = list(sampling.iter_shots(self.P, 100, 30, seed=3))
+        self.assertEqual([chunk.shape for chunk in chunks], [(3, 30)] * 3 + [(3, 10)])
+        again = np.concatenate(list(sampling.iter_shots(self.P, 100, 30, seed=3)), 1)
+        np.testing.assert_array_equal(np.concatenate(chunks, axis=1), again)
+
+    def test_vector(self):
+        outcomes = sampling.sample_shots(self.P[0], 10, seed=4, method="cdf")
+        self.assertEqual(outcomes.shape, (10,))
+        self.assertEqual(sampling.sample_counts(self.P[0], 10).shape, (16,))
+        with self.assertRaises(ValueError):
+            sampling.sample_shots(self.P, 10, method="foo")
+        with self.assertRaises(ValueError):
+            sampling.sample_shots(np.zeros(4), 10)
+
+    def test_results(self):
+        result = run_jaqal_string(PROGRAM)
+        P = sampling.subcircuit_probabilities(result)
+        self.assertEqual(P.shape, (2, 4))
+        np.testing.assert_allclose(
+            P[1], result.subcircuits[1].probability_by_int, rtol=0, atol=0
+        )
+        outcomes = sampling.sample_shots(P, 5000, seed=5)
+        # Only q[1] is rotated in the second subcircuit.
+        bits = sampling.to_bits(outcomes[1], 2)
+        self.assertEqual(bits.shape, (5000, 2))
+        self.assertTrue(np.all(bits[:, 0] == 0))
+        self.assertAlmostEqual(bits[:, 1].mean(), 0.5, delta=0.05)
+
+    def test_dtype(self):
+        self.assertEqual(sampling.outcome_dtype(256), np.uint8)
+        self.assertEqual(sampling.outcome_dtype(257), np.uint16)
+        self.assertEqual(sampling.outcome_dtype(2**20), np.uint32)
+        self.assertEqual(sampling.outcome_dtype(2**40), np.uint64)
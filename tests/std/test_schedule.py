@@ -0,0 +1,58 @@
+from unittest import TestCase
+
+import numpy as np
+
+from jaqalpaq.parser import parse_jaqal_string
+
+from qscout.v1.std.noisy import SNLToy1Model
+from qscout.v1.std.schedule import Scheduler
+
+PROGRAM = """
+from qscout.v1.std usepulses *
+from qscout.v1.std.stretched usepulses *
+
+let theta 0.7853981633974483
+register q[3]
+
+macro pair a b { MS a b 0 theta }
+
+prepare_all
+< I_Sx q[0] | pair q[1] q[2] >
+loop 3 { < Sx q[0] | { Sy q[1] ; Sy_stretched q[1] 0.5 } > }
+Rz q[2] 1
+measure_all
+"""
+
+
+class SchedulerTester(TestCase):
+    def setUp(self):
+        self.circuit = parse_jaqal_string(PROGRAM)
+
+    def test_schedule(self):
+        schedule = Scheduler().schedule(self.circuit)
+        # MS by pi/4 lasts 5; the loop body lasts 1.5, and Rz is instantaneous.
+        np.testing.assert_allclose(schedule.layer_durations, [5, 4.5, 0])
+        self.assertAlmostEqual(schedule.total_duration, 9.5)
+        np.testing.assert_allclose(schedule.busy_times, [3, 9.5, 5])
+        np.testing.assert_allclose(schedule.idle_times, [6.5, 0, 4.5])
+
+    def test_uniform_stretch(self):
+        """Test that a numerical stretched_gates stretches every unstretched gate."""
+        model = SNLToy1Model(stretched_gates=2)
+        schedule = Scheduler(model).schedule(self.circuit)
+        np.testing.assert_allclose(schedule.layer_durations, [10, 7.5, 0])
+
+    def test_cached(self):
+        scheduler = Scheduler(maxsize=1)
+        schedule = scheduler.schedule(self.circuit)
+        self.assertIs(scheduler.schedule(self.circuit), schedule)
+        other = parse_jaqal_string(PROGRAM)
+        self.assertIsNot(scheduler.schedule(other), schedule)
+        self.assertIsNot(scheduler.schedule(self.circuit), schedule)
+
+    def test_total_durations(self):
+        circuits = [
+            self.circuit,
+            parse_jaqal_string(PROGRAM.replace("loop 3", "loop 1")),
+        ]
+        np.testing.assert_allclose(Scheduler().total_durations(circuits), [9.5, 6.5])
@@ -0,0 +1,111 @@
+import warnings
+from unittest import TestCase
+
+import numpy as np
+
+from jaqalpaq.core.algorithm import fill_in_let
+from jaqalpaq.parser import parse_jaqal_string
+
+from qscout.v1.std import streaming
+from qscout.v1.std.instrument import Instrumentation
+from qscout.v1.std.noisy import SNLToy1Model
+from qscout.v1.std.session import EmulationSession
+
+from ._programs import NOISE, circuit, emulate
+
+
+def _final_state(program, lets, noise, stretched_gates=None):
+    model = SNLToy1Model(stretched_gates=stretched_gates, **noise)
+    (final,) = streaming.stream(model, fill_in_let(program, lets), every=None)
+    return final.state
+
+
+class SessionTester(TestCase):
+    def test_updates(self):
+        program = circuit()
+        for stretched_gates in (None, 1.5):
+            model = SNLToy1Model(stretched_gates=stretched_gates, **NOISE)
+            session = EmulationSession(model, program)
+            lets = {}
+            noise = dict(NOISE)
+            for update in [
+                {},
+                dict(lets=dict(a=0.7)),
+                dict(noise=dict(rotation_error=5e-2)),
+                dict(lets=dict(b=-0.4, n=3), noise=dict(depolarization=3e-2)),
+                dict(lets=dict(a=0.7), noise=dict(phase_error=3e-2)),
+                dict(lets=dict(n=0)),
+            ]:
+                session.update(**update)
+                lets.update(update.get("lets", {}))
+                noise.update(update.get("noise", {}))
+                np.testing.assert_allclose(
+                    session.probabilities(),
+                    emulate(program, lets, stretched_gates, **noise),
+                    rtol=0,
+                    atol=1e-14,
+                )
+                np.testing.assert_allclose(
+                    session.state(),
+                    _final_state(program, lets, noise, stretched_gates),
+                    atol=1e-14,
+                )
+            self.assertEqual(session.lets, dict(a=0.7, b=-0.4, n=0))
+
+    def test_recomputation(self):
+        instrumentation = Instrumentation()
+        model = SNLToy1Model(instrumentation=instrumentation, **NOISE)
+        session = EmulationSession(model, circuit())
+        session.probabilities()
+
+        def calls():
+            methods = instrumentation.report()["methods"]
+            instrumentation.reset()
+            return {
+                name: method["calls"]
+                for name, method in methods.items()
+                if not name.startswith("gateduration_")
+            }
+
+        calls()
+        # Only the gate using a, and the idles of the other qubits during it, are
+        # generated anew.
+        session.update(lets=dict(a=0.5))
+        session.probabilities()
+        # (gate_R evaluates the spec through batch_gate.)
+        self.assertEqual(calls(), dict(gate_R=1, batch_gate=1, idle=2))
+        # Unchanged values invalidate nothing.
+        session.update(lets=dict(a=0.5), noise=dict(depolarization=1e-2))
+        session.probabilities()
+        self.assertEqual(calls(), {})
+        # Idling does not depend on the rotation errors.
+        session.update(noise=dict(rotation_error=0))
+        session.probabilities()
+        self.assertNotIn("idle", calls())
+        session.update(noise=dict(depolarization=0))
+        session.probabilities()
+        self.assertIn("idle", calls())
+
+    def test_deprecations(self):
+        """Test that laying out and updating a session uses no deprecated API."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            session = EmulationSession(SNLToy1Model(**NOISE), circuit())
+            session.update(lets=dict(a=0.5, n=3))
+            session.probabilities()
+
+    def test_invalid(self):
+        program = parse_jaqal_string(
+            "from qscout.v1.std usepulses *\nlet k 2\nregister q[2]\n"
+            "prepare_all\nSx q[1]\nmeasure_all\n"
+        )
+        session = EmulationSession(SNLToy1Model(), program)
+        with self.assertRaises(ValueError):
+            session.update(lets=dict(c=3))
+        with self.assertRaises(ValueError):
+            session.update(noise=dict(leakage=0.1))
+        np.testing.assert_allclose(
+            session.probabilities(),
+            emulate(program),
+            atol=1e-14,
+        )
@@ -0,0 +1,287 @@
+from unittest import TestCase
+
+import numpy as np
+
+from jaqalpaq.parser import parse_jaqal_string
+
+from qscout.v1.std import compact, streaming
+from qscout.v1.std.cache import GateCache
+from qscout.v1.std.noisy import SNLTOY1_SPEC, SNLToy1Model
+from qscout.v1.std.parallel import build_superoperator_table
+from qscout.v1.std.pauli_transfer import PTM_MS, PTM_R, PTM_Rz, depolarized
+from qscout.v1.std.pauli_transfer import PTM_XX, PTM_YY, PTM_ZZ
+from qscout.v1.std.schedule import Scheduler
+from qscout.v1.std.spec import GateLaw, NoiseSpec, SpecifiedModel
+
+PROGRAM = """
+from qscout.v1.std usepulses *
+from qscout.v1.std.stretched usepulses *
+
+register q[2]
+
+prepare_all
+Sx q[0]
+Sx q[1]
+< R q[0] 0.3 0.4 | Sy q[1] >
+MS q[0] q[1] 0.1 0.7
+I_MS_stretched q[1] q[0] 0.1 0.7 2
+Sx_stretched q[1] 1.5
+Sx q[0]
+measure_all
+"""
+
+
+class Declared(SpecifiedModel):
+    """SNLToy1, as generated from its spec alone."""
+
+    noise_spec = SNLTOY1_SPEC
+
+
+class Toy(SpecifiedModel):
+    noise_spec = NoiseSpec(
+        dict(
+            R=GateLaw("R", duration=2, duration_offset=0.5, axis_error="drift"),
+            Sx=GateLaw("R", (0.0, np.pi / 2), duration=2, duration_offset=0.5),
+            MS=GateLaw("MS", duration=5, rotation_error=None, noise_factor=2),
+        ),
+        dict(depolarization=1e-2, rotation_error=3e-2, phase_error=0, drift=0.1),
+        idle="depolarization",
+    )
+
+
+class SpecTester(TestCase):
+    def test_declared(self):
+        """Test that the methods generated from SNLToy1's spec match SNLToy1Model."""
+        noise = dict(depolarization=2e-2, rotation_error=3e-2, phase_error=-4e-2)
+        declared = Declared(**noise)
+        reference = SNLToy1Model(**noise)
+        self.assertEqual(declared.noise_parameters(), reference.noise_parameters())
+        for name in SNLTOY1_SPEC.gates:
+            gate = compact.GATES[name]
+            qubits = [None] * len(gate.quantum_parameters)
+            args = [0.7, -1.2][: len(gate.classical_parameters)]
+            for stretch in (1, 2.5):
+                self.assertAlmostEqual(
+                    getattr(declared, f"gateduration_{name}")(
+                        *qubits, *args, stretch=stretch
+                    ),
+                    getattr(reference, f"gateduration_{name}")(
+                        *qubits, *args, stretch=stretch
+                    ),
+                    delta=1e-15,
+                )
+                np.testing.assert_allclose(
+                    getattr(declared, f"gate_{name}")(*qubits, *args, stretch=stretch),
+                    getattr(reference, f"gate_{name}")(*qubits, *args, stretch=stretch),
+                    rtol=0,
+                    atol=1e-14,
+                )
+        np.testing.assert_allclose(declared.idle(None, 3), reference.idle(None, 3))
+
+    def test_arrays(self):
+        """Test that the methods generated from a spec evaluate arrays of arguments, as
+        the scheduler and build_superoperator_table pass them."""
+        circuit = parse_jaqal_string(
+            "from qscout.v1.std usepulses *\n"
+            "from qscout.v1.std.stretched usepulses *\n"
+            "register q[2]\n"
+            "R q[0] 0.1 0.5\nR q[0] 0.1 1.5\nR q[0] 0.1 3.0\n"
+            "MS q[0] q[1] 0.1 1.0\nR_stretched q[1] 0.2 -0.5 2.0\n"
+            "I_R_stretched q[1] 0.2 0.7 1.5\n"
+        )
+        noise = dict(depolarization=2e-2, rotation_error=3e-2, phase_error=-4e-2)
+        declared = Declared(**noise)
+        reference = SNLToy1Model(**noise)
+        np.testing.assert_allclose(
+            Scheduler(declared).schedule(circuit).layer_durations,
+            Scheduler(reference).schedule(circuit).layer_durations,
+            rtol=1e-15,
+        )
+        table = build_superoperator_table(declared, [circuit], max_workers=1)
+        expected = build_superoperator_table(reference, [circuit], max_workers=1)
+        self.assertEqual(table.instances, expected.instances)
+        np.testing.assert_allclose(table.durations, expected.durations, rtol=1e-15)
+        for name, args in table.instances:
+            np.testing.assert_allclose(
+                table.superoperator(name, args),
+                expected.superoperator(name, args),
+                rtol=0,
+                atol=1e-14,
+            )
+
+        angles = np.array([[0.5], [-1.5]])
+        np.testing.assert_allclose(
+            declared.gateduration_R(None, 0.1, angles, stretch=[1, 2]),
+            np.abs(angles) / (np.pi / 2) * [1, 2],
+        )
+        G = declared.gate_MS(None, None, [0.1, 0.2], 1.0)
+        self.assertEqual(G.shape, (2, 16, 16))
+        np.testing.assert_allclose(G[1], reference.gate_MS(None, None, 0.2, 1.0))
+        G = declared.idle(None, [[0.5, 1.0, 3.0]])
+        self.assertEqual(G.shape, (1, 3, 4, 4))
+        np.testing.assert_allclose(G[0, 2], reference.idle(None, 3.0))
+
+    def test_rotations(self):
+        """Test the gates of SNLToy1Model (including the stretched ones) against the
+        rotations, durations, and noise of the version 1 model, written out by hand."""
+        eps, p, phase = 3e-2, 2e-2, -4e-2
+        model = SNLToy1Model(depolarization=p, rotation_error=eps, phase_error=phase)
+        a, b = 0.7, -1.2
+        h = np.pi / 2
+        # The Pauli transfer matrix of the rotation (given the over-rotation), the
+        # duration of the gate, and the factor of its noise, for the arguments a, b
+        gates = dict(
+            R=(lambda e: PTM_R(a + phase, b + e), abs(b) / h, 1),
+            Rt=(lambda e: PTM_R(a + phase, b + e), abs(b) / h, 3),
+            Rx=(lambda e: PTM_R(phase, a + e), abs(a) / h, 1),
+            Ry=(lambda e: PTM_R(h + phase, a + e), abs(a) / h, 1),
+            Px=(lambda e: PTM_R(phase, np.pi + e), 2, 1),
+            Py=(lambda e: PTM_R(h + phase, np.pi + e), 2, 1),
+            Sx=(lambda e: PTM_R(phase, h + e), 1, 1),
+            Sy=(lambda e: PTM_R(h + phase, h + e), 1, 1),
+            Sxd=(lambda e: PTM_R(phase, -h + e), 1, 1),
+            Syd=(lambda e: PTM_R(h + phase, -h + e), 1, 1),
+            Rz=(lambda e: PTM_Rz(a), 0, 1),
+            Pz=(lambda e: PTM_Rz(np.pi), 0, 1),
+            Sz=(lambda e: PTM_Rz(h), 0, 1),
+            Szd=(lambda e: PTM_Rz(-h), 0, 1),
+            XX=(lambda e: PTM_XX(a + e), 10 * abs(a) / h, 1),
+            Sxx=(lambda e: PTM_XX(h + e), 10, 1),
+            Sxxd=(lambda e: PTM_XX(-h + e), 10, 1),
+            YY=(lambda e: PTM_YY(a + e), 10 * abs(a) / h, 1),
+            Syy=(lambda e: PTM_YY(h + e), 10, 1),
+            Syyd=(lambda e: PTM_YY(-h + e), 10, 1),
+            ZZ=(lambda e: PTM_ZZ(a + e), 10 * abs(a) / h, 1),
+            Szz=(lambda e: PTM_ZZ(h + e), 10, 1),
+            Szzd=(lambda e: PTM_ZZ(-h + e), 10, 1),
+            MS=(lambda e: PTM_MS(a + phase, b + e), 10 * abs(b) / h, 1),
+        )
+        self.assertEqual(set(gates), set(SNLTOY1_SPEC.gates))
+        for name, (ptm, duration, factor) in gates.items():
+            gate = compact.GATES[name]
+            qubits = [None] * len(gate.quantum_parameters)
+            args = [a, b][: len(gate.classical_parameters)]
+            for stretch in (1, 2.5):
+                T = stretch * duration
+                expected = depolarized(ptm(eps * factor * T), (1 - p) ** (factor * T))
+                self.assertAlmostEqual(
+                    getattr(model, f"gateduration_{name}")(
+                        *qubits, *args, stretch=stretch
+                    ),
+                    T,
+                    delta=1e-14,
+                )
+                for G in (
+                    getattr(model, f"gate_{name}")(*qubits, *args, stretch=stretch),
+                    # The stretch factor of a stretched gate is its last argument.
+                    model.batch_gate(f"{name}_stretched", *args, stretch)[0],
+                    model.batch_gate(name, *args, stretch=stretch)[0],
+                ):
+                    np.testing.assert_allclose(
+                        G, expected, rtol=0, atol=1e-14, err_msg=name
+                    )
+
+    def test_custom(self):
+        model = Toy(drift=0.2)
+        self.assertEqual(
+            model.noise_parameter_names,
+            ("depolarization", "rotation_error", "phase_error", "drift"),
+        )
+        duration = 2 * (0.5 + 2 * 0.4 / (np.pi / 2))
+        self.assertAlmostEqual(
+            model.gateduration_R(None, 0.3, 0.4, stretch=2), duration
+        )
+        np.testing.assert_allclose(
+            model.gate_R(None, 0.3, 0.4, stretch=2),
+            depolarized(PTM_R(0.5, 0.4 + 3e-2 * duration), 0.99**duration),
+            rtol=0,
+            atol=1e-15,
+        )
+        # MS has no over-rotation, and twice the depolarization
+        duration = 5 * 0.7 / (np.pi / 2)
+        np.testing.assert_allclose(
+            model.gate_MS(None, None, 0.1, 0.7),
+            depolarized(PTM_MS(0.1, 0.7), 0.99 ** (2 * duration)),
+            rtol=0,
+            atol=1e-15,
+        )
+        self.assertFalse(hasattr(model, "gate_Sy"))
+
+        batch = model.batch_gate("R", np.linspace(0, 1, 3), 0.4, drift=[0, 0.1, 0.2])
+        self.assertEqual(batch.shape, (3, 4, 4))
+        np.testing.assert_allclose(batch[2], model.gate_R(None, 1, 0.4), atol=1e-15)
+        with self.assertRaises(TypeError):
+            model.batch_gate("R", 0.1, dephasing=0.1)
+
+        single = Toy(precision=np.float32)
+        self.assertEqual(single.gate_Sx(None).dtype, np.float32)
+        self.assertEqual(single.idle(None, 1).dtype, np.float32)
+
+    def test_cache(self):
+        cache = GateCache()
+        model = Toy(cache=cache)
+        first = model.gate_R(None, 0.1, 0.2)
+        self.assertIs(model.gate_R(None, 0.1, 0.2), first)
+        self.assertEqual(cache.cache_info().hits, 1)
+        model.drift = 0.3
+        self.assertIsNot(model.gate_R(None, 0.1, 0.2), first)
+
+    def test_compact(self):
+        """Test that compact circuits are evaluated by the compiled spec, matching the
+        gates one by one."""
+        circuit = parse_jaqal_string(PROGRAM)
+        records = compact.from_circuit(circuit)
+        for model in (SNLToy1Model(depolarization=1e-2), Declared(stretched_gates=1.5)):
+            tables, rows, durations = compact.superoperators(records, model)
+            self.assertEqual(len(tables[1]), 6)
+            self.assertEqual(len(tables[2]), 2)
+            self.assertEqual(rows[0], -1)
+            np.testing.assert_allclose(
+                tables[1][rows[1]],
+                model.gate_Sx(None, stretch=model.stretched_gates or 1),
+            )
+            np.testing.assert_allclose(tables[1][rows[1]], tables[1][rows[8]])
+            d = model.idle(None, durations[6])
+            np.testing.assert_allclose(tables[2][rows[6]], np.kron(d, d), atol=1e-15)
+            self.assertEqual(
+                durations[6], model.gateduration_MS(None, None, 0.1, 0.7, 2)
+            )
+            np.testing.assert_allclose(
+                tables[1][rows[7]], model.gate_Sx(None, stretch=1.5), atol=1e-15
+            )
+
+        # Models generated from the spec can be streamed like SNLToy1.
+        reference = streaming.stream(SNLToy1Model(), circuit, every=None)
+        declared = streaming.stream(Declared(), circuit, every=None)
+        np.testing.assert_allclose(
+            next(declared).state, next(reference).state, rtol=0, atol=1e-14
+        )
+
+    def test_overridden(self):
+        """Test that gates overridden by subclasses are evaluated by calling them."""
+
+        class Model(SNLToy1Model):
+            def gate_R(self, q, axis_angle, rotation_angle, stretch=1):
+                return np.eye(4) * np.asarray(rotation_angle)[..., None, None]
+
+        model = Model()
+        self.assertIsNone(model.superoperators([compact.OPCODES["R"]], [[0.1, 0.2]]))
+        self.assertIsNotNone(model.superoperators([compact.OPCODES["Sx"]], [[0]]))
+        np.testing.assert_allclose(model.batch_gate("R", 0.1, [1, 2])[1], 2 * np.eye(4))
+        records = compact.from_circuit(parse_jaqal_string(PROGRAM))
+        tables, rows, _ = compact.superoperators(records, model)
+        np.testing.assert_allclose(tables[1][rows[3]], 0.4 * np.eye(4))
+
+    def test_invalid(self):
+        parameters = dict(depolarization=0)
+        for gates in [
+            dict(I_Sx=GateLaw("R")),
+            dict(R=GateLaw("Q")),
+            dict(Rx=GateLaw("R")),
+            dict(MS=GateLaw("R")),
+            dict(R=GateLaw("R", axis_error="phase_error")),
+        ]:
+            with self.assertRaises(ValueError):
+                NoiseSpec(gates, parameters)
+        with self.assertRaises(ValueError):
+            NoiseSpec({}, parameters, idle="dephasing")
@@ -0,0 +1,90 @@
+from unittest import TestCase
+
+import numpy as np
+
+from jaqalpaq.run import run_jaqal_string
+from jaqalpaq.emulator.unitary import UnitarySerializedEmulator
+
+from qscout.v1.std.jaqal_action import IDEAL_ACTION
+from qscout.v1.std.statevector import StateVector, StatevectorEmulator
+
+
+def dense(n_qubits, matrix, qubits):
+    """Embeds a one- or two-qubit unitary into the full register, the slow way."""
+    dim = 2**n_qubits
+    U = np.zeros((dim, dim), dtype=complex)
+    k = len(qubits)
+    for col in range(dim):
+        sub = sum(((col >> q) & 1) << i for i, q in enumerate(qubits))
+        for row_sub in range(2**k):
+            row = col
+            for i, q in enumerate(qubits):
+                row = (row & ~(1 << q)) | (((row_sub >> i) & 1) << q)
+            U[row, col] += matrix[row_sub, sub]
+    return U
+
+
+class StateVectorTester(TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def random_gate(self, n_qubits):
+        names = ["R", "Rz", "Sy", "Px", "MS", "XX", "ZZ", "Szz", "Syyd"]
+        name = self.rng.choice(names)
+        n_params = {"R": 2, "MS": 2, "Rz": 1, "XX": 1, "ZZ": 1}.get(name, 0)
+        n_gate_qubits = 2 if name in ("MS", "XX", "ZZ", "Szz", "Syyd") else 1
+        qubits = [int(q) for q in self.rng.permutation(n_qubits)[:n_gate_qubits]]
+        args = self.rng.uniform(-4, 4, n_params)
+        return name, qubits, args
+
+    def test_dense(self):
+        """Test that applying gates matches multiplying by the full unitaries."""
+        n = 4
+        state = StateVector(n)
+        expected = np.zeros(2**n, dtype=complex)
+        expected[0] = 1
+        for _ in range(100):
+            name, qubits, args = self.random_gate(n)
+            state.apply(name, qubits, *args)
+            matrix = IDEAL_ACTION[name](*args)
+            expected = dense(n, matrix, qubits) @ expected
+        np.testing.assert_allclose(state.vector, expected, rtol=0, atol=1e-12)
+
+    def test_reset(self):
+        state = StateVector(3)
+        state.apply("Sx", [1])
+        state.reset()
+        np.testing.assert_array_equal(state.probabilities, np.eye(8)[0])
+
+    def test_distinct_qubits(self):
+        state = StateVector(2)
+        with self.assertRaises(ValueError):
+            state.apply("MS", [1, 1], 0.0, np.pi / 2)
+
+
+class StatevectorEmulatorTester(TestCase):
+    def test_matches_unitary_emulator(self):
+        """Test that the emulator agrees with jaqalpaq's UnitarySerializedEmulator."""
+        prog = """
+from qscout.v1.std usepulses *
+from qscout.v1.std.stretched usepulses *
+
+register q[3]
+
+prepare_all
+Sx q[0]
+MS q[2] q[0] 0.3 1.2
+< Sy q[1] | Rz q[2] 0.7 >
+loop 2 { ZZ q[1] q[2] 0.4 }
+R_stretched q[1] 0.2 1.1 1.5
+Szz q[0] q[1]
+measure_all
+"""
+        ideal = run_jaqal_string(prog, backend=UnitarySerializedEmulator())
+        sim = run_jaqal_string(prog, backend=StatevectorEmulator())
+        np.testing.assert_allclose(
+            sim.subcircuits[0].probability_by_int,
+            ideal.subcircuits[0].probability_by_int,
+            rtol=0,
+            atol=1e-14,
+        )
@@ -0,0 +1,93 @@
+from unittest import TestCase
+
+import numpy as np
+
+from jaqalpaq.parser import parse_jaqal_string
+
+from qscout.v1.std import streaming
+from qscout.v1.std.instrument import Instrumentation
+from qscout.v1.std.noisy import SNLToy1, SNLToy1Model
+
+from ._programs import NOISE, circuit, emulate
+
+
+class StreamTester(TestCase):
+    def test_matches_emulator(self):
+        for stretched_gates, extra in [
+            (None, ""),
+            ("add", "R_stretched q[1] 0.3 0.5 2.0"),
+            (1.5, "MS q[1] q[2] 0.2 0.4"),
+        ]:
+            program = circuit(extra)
+            reference = emulate(program, stretched_gates=stretched_gates, **NOISE)
+            for model in (
+                SNLToy1(3, stretched_gates=stretched_gates, **NOISE),
+                SNLToy1Model(stretched_gates=stretched_gates, **NOISE),
+            ):
+                *_, final = streaming.stream(model, program, every=None)
+                np.testing.assert_allclose(
+                    streaming.probabilities(final.state), reference, rtol=0, atol=1e-14
+                )
+
+    def test_checkpoints(self):
+        program = circuit()
+        checkpoints = list(streaming.stream(SNLToy1Model(**NOISE), program))
+        # Every top-level statement (including the loop) is a layer.
+        self.assertEqual([c.layer for c in checkpoints], list(range(1, 8)))
+        self.assertEqual(checkpoints[0].state.shape, (4, 4, 4))
+        # The state after Sx q[0], which was not modified as the stream proceeded
+        np.testing.assert_allclose(
+            streaming.probabilities(checkpoints[0].state)[:2], [0.5, 0.5], atol=2e-2
+        )
+
+        every = list(streaming.stream(SNLToy1Model(**NOISE), program, every=3))
+        self.assertEqual([c.layer for c in every], [3, 6, 7])
+        np.testing.assert_array_equal(every[-1].state, checkpoints[-1].state)
+        (final,) = streaming.stream(SNLToy1Model(**NOISE), program, every=None)
+        np.testing.assert_array_equal(final.state, checkpoints[-1].state)
+
+    def test_fidelity_decay(self):
+        program = parse_jaqal_string(
+            "from qscout.v1.std usepulses *\n"
+            "register q[2]\n"
+            + "Sx q[0]\nSxd q[0]\nMS q[0] q[1] 0 1.5707963267948966\n" * 20
+        )
+        # Without coherent errors, which may partially cancel out
+        model = SNLToy1Model(depolarization=1e-3, rotation_error=0, phase_error=0)
+        noisy = streaming.stream(model, program, every=15)
+        ideal = streaming.stream(
+            SNLToy1Model(depolarization=0, rotation_error=0, phase_error=0),
+            program,
+            every=15,
+        )
+        fidelities = [
+            streaming.fidelity(state.state, reference.state)
+            for state, reference in zip(noisy, ideal)
+        ]
+        self.assertEqual(len(fidelities), 4)
+        self.assertTrue(np.all(np.diff(fidelities) < 0))
+        self.assertGreater(fidelities[-1], 0.25)
+
+    def test_initial_state(self):
+        state = streaming.initial_state(2)
+        np.testing.assert_allclose(streaming.probabilities(state), [1, 0, 0, 0])
+        self.assertAlmostEqual(streaming.fidelity(state, state), 1)
+
+    def test_merged_idles(self):
+        """Test that idles are applied as decay factors, without generating matrices."""
+        program = circuit()
+        instrumentation = Instrumentation()
+        model = SNLToy1Model(instrumentation=instrumentation, **NOISE)
+        *_, final = streaming.stream(model, program)
+        self.assertNotIn("idle", instrumentation.report()["methods"])
+
+        class Unmerged(SNLToy1Model):
+            idle_decay = None
+
+            def idle(self, q, duration):
+                d = (1 - self.depolarization) ** duration
+                return np.diag([1, d, d, d])
+
+        # Applying every idle matrix in turn
+        (reference,) = streaming.stream(Unmerged(**NOISE), program, every=None)
+        np.testing.assert_allclose(final.state, reference.state, rtol=0, atol=1e-15)
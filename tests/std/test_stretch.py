@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+import numpy as np
+
+from qscout.v1.std.noisy import SNLToy1Model
+from qscout.v1.std.pauli_transfer import (
+    PTM_MS,
+    PTM_R,
+    depolarizing_masks,
+    depolarizing_weights,
+    rotation_terms,
+)
+
+
+class TermsTester(TestCase):
+    def test_rotation_terms(self):
+        angles = np.linspace(-4, 4, 9)
+        for builder, axis in ((PTM_R, (0.3,)), (PTM_MS, (0.3,))):
+            terms = rotation_terms(builder, *axis)
+            self.assertFalse(terms.flags.writeable)
+            np.testing.assert_allclose(
+                terms[0]
+                + np.cos(angles)[:, None, None] * terms[1]
+                + np.sin(angles)[:, None, None] * terms[2],
+                builder(*axis, angles),
+                rtol=0,
+                atol=1e-15,
+            )
+
+    def test_depolarizing_masks(self):
+        for n_qubits in (1, 2):
+            masks = depolarizing_masks(n_qubits)
+            d = 0.9
+            np.testing.assert_allclose(
+                (d ** np.arange(n_qubits + 1)) @ masks,
+                depolarizing_weights(d, n_qubits),
+            )
+
+
+class StretchFamilyTester(TestCase):
+    def setUp(self):
+        self.model = SNLToy1Model(depolarization=2e-2, rotation_error=3e-2)
+        self.stretches = np.array([0, 0.5, 1, 2.5])
+
+    def test_matches_gates(self):
+        model = self.model
+        for name, gate in model.jaqal_gates.items():
+            if not hasattr(model, f"gate_{name}"):
+                continue
+            qubits = [None] * len(gate.quantum_parameters)
+            args = [0.3, -1.2][: len(gate.classical_parameters)]
+            family = model.stretch_family(name, *args)
+            G = getattr(model, f"gate_{name}")
+            np.testing.assert_allclose(
+                family(self.stretches),
+                [G(*qubits, *args, stretch=s) for s in self.stretches],
+                rtol=0,
+                atol=1e-14,
+            )
+            np.testing.assert_allclose(family(), G(*qubits, *args), rtol=0, atol=1e-14)
+
+    def test_noise_factor(self):
+        family = self.model.stretch_family("MS", 0.3, 1.1)
+        N = family.noise_factor(1.5)
+        np.testing.assert_allclose(family.base @ N, family(1.5), rtol=0, atol=1e-15)
+        self.assertIs(family.noise_factor(1.5), N)
+        self.assertFalse(N.flags.writeable)
+        np.testing.assert_allclose(
+            family.base @ family.noise_factor(self.stretches),
+            family(self.stretches),
+            rtol=0,
+            atol=1e-15,
+        )
+        # Without noise, the base is the whole gate.
+        np.testing.assert_allclose(family.noise_factor(0), np.eye(16), atol=1e-15)
+
+    def test_precision(self):
+        model = SNLToy1Model(precision=np.float32)
+        family = model.stretch_family("Sx")
+        self.assertEqual(family(self.stretches).dtype, np.float32)
+        np.testing.assert_allclose(
+            family(2), SNLToy1Model().gate_Sx(None, stretch=2), rtol=0, atol=1e-6
+        )
+
+    def test_unsupported(self):
+        with self.assertRaises(NotImplementedError):
+            self.model.stretch_family("I_Sx")
+        with self.assertRaises(TypeError):
+            self.model.stretch_family("R", 0.1)
+
+        class Model(SNLToy1Model):
+            def gate_R(self, q, axis_angle, rotation_angle, stretch=1):
+                return np.eye(4)
+
+        with self.assertRaises(NotImplementedError):
+            Model().stretch_family("R", 0.1, 0.2)
@@ -0,0 +1,134 @@
+import importlib.util
+import os
+import sys
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+from jaqalpaq.parser import parse_jaqal_string
+
+from qscout.v1.std.noisy import SNLToy1Model
+from qscout.v1.std.parallel import build_superoperator_table
+from qscout.v1.std.table_cache import TableCache
+
+PROGRAM = """
+from qscout.v1.std usepulses *
+from qscout.v1.std.stretched usepulses *
+
+register q[2]
+
+prepare_all
+R q[0] 0.5 0.25
+Sx_stretched q[1] 1.5
+MS q[0] q[1] 0.1 0.4
+I_Sy q[1]
+measure_all
+"""
+
+MODULE = """
+from qscout.v1.std.noisy import SNLToy1Model
+
+
+class EditedModel(SNLToy1Model):
+    pass
+"""
+
+
+class TableCacheTester(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.cache = TableCache(self.directory.name)
+        self.circuits = [parse_jaqal_string(PROGRAM)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def build(self, model, **kwargs):
+        return build_superoperator_table(
+            model, self.circuits, max_workers=1, disk_cache=self.cache, **kwargs
+        )
+
+    def test_round_trip(self):
+        model = SNLToy1Model(depolarization=1e-2)
+        built = self.build(model)
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+        loaded = self.build(model)
+        self.assertIsInstance(loaded.tables[2], np.memmap)
+        self.assertFalse(loaded.tables[2].flags.writeable)
+        self.assertEqual(loaded.instances, built.instances)
+        self.assertEqual(loaded.circuit_instances, built.circuit_instances)
+        for n_qubits, table in built.tables.items():
+            np.testing.assert_array_equal(loaded.tables[n_qubits], table)
+        np.testing.assert_array_equal(loaded.durations, built.durations)
+
+    def test_directory(self):
+        """Test that a directory can be passed instead of a TableCache."""
+        model = SNLToy1Model()
+        build_superoperator_table(
+            model, self.circuits, max_workers=1, disk_cache=self.directory.name
+        )
+        loaded = self.build(model)
+        self.assertIsInstance(loaded.tables[1], np.memmap)
+
+    def test_keys(self):
+        self.build(SNLToy1Model(depolarization=1e-2))
+        self.build(SNLToy1Model(depolarization=2e-2))
+        self.build(SNLToy1Model(depolarization=2e-2, stretched_gates="add"))
+        self.build(SNLToy1Model(depolarization=2e-2, precision=np.float32))
+        self.assertEqual(len(os.listdir(self.directory.name)), 4)
+        loaded = self.build(SNLToy1Model(depolarization=2e-2, precision=np.float32))
+        self.assertEqual(loaded.tables[1].dtype, np.float32)
+
+    def test_code_change(self):
+        """Test that editing the source of a model invalidates its tables."""
+        path = os.path.join(self.directory.name, "edited_model.py")
+        self.addCleanup(sys.modules.pop, "edited_model", None)
+
+        def load(source):
+            with open(path, "w") as f:
+                f.write(source)
+            spec = importlib.util.spec_from_file_location("edited_model", path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules["edited_model"] = module
+            spec.loader.exec_module(module)
+            model = module.EditedModel()
+            return self.cache.key(type(model), {}, [])
+
+        key = load(MODULE)
+        self.assertEqual(
+            self.cache.key(sys.modules["edited_model"].EditedModel, {}, []), key
+        )
+        edited = load(MODULE + "\n# Edited\n")
+        self.assertNotEqual(edited, key)
+
+        # The contents of the source are keyed on, not its size and modification time.
+        stat = os.stat(path)
+        self.assertNotEqual(load(MODULE + "\n# Edits!\n"), edited)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(os.path.getsize(path), stat.st_size)
+        self.assertNotEqual(
+            self.cache.key(sys.modules["edited_model"].EditedModel, {}, []), edited
+        )
+        key = load(MODULE)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(
+            self.cache.key(sys.modules["edited_model"].EditedModel, {}, []), key
+        )
+
+    def test_corrupt(self):
+        model = SNLToy1Model()
+        built = self.build(model)
+        (entry,) = os.listdir(self.directory.name)
+        with open(os.path.join(self.directory.name, entry, "table2.npy"), "wb") as f:
+            f.write(b"truncated")
+        rebuilt = self.build(model)
+        self.assertNotIsInstance(rebuilt.tables[2], np.memmap)
+        np.testing.assert_array_equal(rebuilt.tables[2], built.tables[2])
+        # The corrupt table was replaced.
+        self.assertIsInstance(self.build(model).tables[2], np.memmap)
+
+    def test_clear(self):
+        self.build(SNLToy1Model())
+        self.cache.clear()
+        self.assertEqual(os.listdir(self.directory.name), [])
@@ -0,0 +1,107 @@
+from itertools import product
+from unittest import TestCase
+
+import numpy as np
+
+from qscout.v1.std import trajectories
+from qscout.v1.std.noisy import SNLToy1, SNLToy1Model
+
+from ._programs import NOISE, circuit, emulate
+
+PAULIS = [
+    np.eye(2),
+    np.array([[0, 1], [1, 0]]),
+    np.array([[0, -1j], [1j, 0]]),
+    np.diag([1, -1]),
+]
+
+
+def _ptm(U):
+    """The Pauli transfer matrix of U, the first qubit being the least significant."""
+    n = int(np.log2(len(U)))
+    basis = []
+    for indices in product(range(4), repeat=n):
+        P = np.ones((1, 1))
+        for i in indices:
+            P = np.kron(P, PAULIS[i])
+        basis.append(P)
+    return np.array(
+        [[np.trace(P @ U @ Q @ U.conj().T).real / 2**n for Q in basis] for P in basis]
+    )
+
+
+class TrajectoryTester(TestCase):
+    def setUp(self):
+        self.circuit = circuit("R_stretched q[1] 0.3 0.5 2.0")
+
+    def test_coherent_gate(self):
+        model = SNLToy1Model(**NOISE)
+        for name, args in [
+            ("R", (0.3, 0.7)),
+            ("Sy", ()),
+            ("Rz", (0.4,)),
+            ("MS", (0.1, 0.2)),
+            ("ZZ", (0.5,)),
+            ("Sxx", ()),
+        ]:
+            n = len(model.jaqal_gates[name].quantum_parameters)
+            for stretch in (1, 2.5):
+                U, decay = model.coherent_gate(name, *args, stretch=stretch)
+                # Pauli components other than the identity are contracted by decay.
+                weights = np.array(
+                    [
+                        decay ** np.count_nonzero(indices)
+                        for indices in product(range(4), repeat=n)
+                    ]
+                )
+                expected = getattr(model, f"gate_{name}")(
+                    *[None] * n, *args, stretch=stretch
+                )
+                np.testing.assert_allclose(
+                    _ptm(U) * weights, expected, rtol=0, atol=1e-14
+                )
+
+    def test_noiseless(self):
+        noise = dict(depolarization=0, rotation_error=2e-2, phase_error=3e-2)
+        reference = emulate(self.circuit, stretched_gates="add", **noise)
+        model = SNLToy1(3, stretched_gates="add", **noise)
+        result = trajectories.sample_trajectories(
+            model, self.circuit, 5, shots=200, batch_size=2, seed=1
+        )
+        # Without depolarization, every trajectory is the same pure state.
+        np.testing.assert_allclose(result.probabilities, reference, rtol=0, atol=1e-13)
+        self.assertEqual(result.counts.sum(), 1000)
+        self.assertEqual(result.trajectories, 5)
+        single = trajectories.sample_trajectories(
+            model, self.circuit, 1, precision=np.float32
+        )
+        np.testing.assert_allclose(single.probabilities, reference, rtol=0, atol=1e-5)
+
+    def test_noisy(self):
+        noise = dict(NOISE, depolarization=2e-2)
+        reference = emulate(self.circuit, stretched_gates="add", **noise)
+        result = trajectories.sample_trajectories(
+            SNLToy1Model(stretched_gates="add", **noise),
+            self.circuit,
+            4000,
+            shots=4,
+            batch_size=500,
+            seed=2,
+            n_qubits=3,
+        )
+        # Well within the sampling error, which is about 0.005 here
+        np.testing.assert_allclose(result.probabilities, reference, rtol=0, atol=0.02)
+        np.testing.assert_allclose(
+            result.counts / result.counts.sum(), reference, rtol=0, atol=0.03
+        )
+
+    def test_seed(self):
+        model = SNLToy1Model(stretched_gates="add", depolarization=5e-2)
+        first, second = (
+            trajectories.sample_trajectories(
+                model, self.circuit, 50, shots=3, batch_size=16, seed=3, n_qubits=3
+            )
+            for _ in range(2)
+        )
+        np.testing.assert_array_equal(first.counts, second.counts)
+        np.testing.assert_array_equal(first.probabilities, second.probabilities)